@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+"""
+AddressArray holds many addresses packed into one buffer of fixed-width
+records in network order, 4 bytes each for IPv4 or 16 for IPv6, instead of
+one Python string per address.
+
+Addresses are formatted only when accessed, as dot-decimal, colon-hex or
+a fixed-width base 4, 32 or 64 identifier depending on the array's
+`style`. Slicing with a step of 1 returns a view over the same buffer
+without copying. Any buffer, e.g. bytes, a bytearray or a memory-mapped
+file, may back an array; only a bytearray can grow, and only a writable
+buffer can be sorted in place. While a view of a bytearray-backed array
+exists the array cannot grow.
+
+save() writes the packed records as they are, and load() maps such a file
+read-only, so a large file of addresses is used in place from the page
+cache without being read or decoded up front:
+
+    a = AddressArray.load("v6.bin", 16, "hex")
+    a[10:20]                            # a view, nothing is copied
+    a.close()
+"""
+
+import functools
+import mmap
+import os
+
+import address_converter
+import exp_notation
+
+
+# Styles that write the whole address as one number, as (display_base,
+# alphabet name in exp_notation.alphabets), with leading zero digits so that
+# every address of a width has the same length
+radix_styles = {
+        "base4": (4, "digits"),
+        "base32": (32, "base32"),
+        "base32hex": (32, "base32hex"),
+        "base64": (64, "base64"),
+        "base64url": (64, "base64url")
+        }
+
+# Formatting used for each style of array
+_styles = {
+        "dd": address_converter.bytes_to_dd,
+        "hex": address_converter.bytes_to_token
+        }
+for _name, (_radix, _alphabet) in radix_styles.items():
+    _styles[_name] = functools.partial(exp_notation.radix_encode,
+            display_base = _radix, alphabet = _alphabet)
+
+
+def parse_address(address, width = 16, style = "dd"):
+    """
+    Parses a text address in `style` and returns its octets as bytes. A
+    radix style gives exactly `width` octets; the others give as many as
+    the address has. Raises TokenError if it cannot be parsed or does not
+    fit.
+    """
+    if style == "dd":
+        return address_converter.parse_dd(address)
+    if style == "hex":
+        return address_converter.parse_token(address)
+    radix, alphabet = radix_styles[style]
+    try:
+        return exp_notation.parse_radix_int(address, radix, alphabet).to_bytes(width, 'big')
+    except (ValueError, OverflowError):
+        raise address_converter.TokenError("Bad {} address {!r} for width {:d}.".format(
+                style, address, width)) from None
+
+
+class AddressArray:
+    """
+    A sequence of addresses stored as `width`-byte records in `buffer`,
+    formatted with `style` ("dd" for dot-decimal, "hex" for colon-hex, or a
+    name in `radix_styles`) when accessed.
+    """
+
+    def __init__(self, buffer = None, width = 16, style = "dd"):
+        if width < 1:
+            raise ValueError("Record width must be at least 1.")
+        if style not in _styles:
+            raise ValueError("Style must be one of: " + ", ".join(sorted(_styles)) + ".")
+        if buffer is None:
+            buffer = bytearray()
+        if len(buffer) % width:
+            raise ValueError("Buffer length is not a multiple of {:d}.".format(width))
+
+        self._buf = buffer
+        self.width = width
+        self.style = style
+        self._format = _styles[style]
+        self._mmap = None
+
+    @classmethod
+    def from_tokens(cls, tokens, width = 16, style = "hex"):
+        """
+        Builds an array from colon-hex tokens. Tokens shorter than `width`
+        octets are right-aligned, e.g. "dead:beef" in a 16-byte array is
+        stored as ::dead:beef.
+        """
+        a = cls(bytearray(), width, style)
+        a.extend(address_converter.parse_token(t) for t in tokens)
+        return a
+
+    @classmethod
+    def from_dd(cls, addresses, width = 4, style = "dd"):
+        """Builds an array from dot-decimal addresses."""
+        a = cls(bytearray(), width, style)
+        a.extend(address_converter.parse_dd(s) for s in addresses)
+        return a
+
+    def save(self, path):
+        """Writes the packed records to `path`, in the layout load() reads."""
+        with open(path, 'wb') as f:
+            f.write(self._buf)
+
+    @classmethod
+    def load(cls, path, width = 16, style = "dd"):
+        """
+        Maps a file of packed `width`-byte records into memory, read-only.
+        The records are used in place from the mapped file; call close() to
+        release it. Raises ValueError if the file size is not a multiple of
+        `width`.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # An empty file cannot be mapped
+                return cls(b'', width, style)
+            mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            self = cls(view, width, style)
+        except ValueError:
+            view.release()
+            mm.close()
+            raise
+        self._mmap = (mm, view)
+        return self
+
+    def close(self):
+        """
+        Releases the mapped file of an array returned by load(). Raises
+        BufferError while a slice of the array is still in use.
+        """
+        if self._mmap is not None:
+            mm, view = self._mmap
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                # A slice still holds the mapping; keep the array usable
+                view = memoryview(mm)
+                self._buf = view
+                self._mmap = (mm, view)
+                raise
+            self._buf = b''
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._buf) // self.width
+
+    def _index(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("AddressArray index out of range.")
+        return i * self.width
+
+    def record(self, i):
+        """Returns record `i` as bytes."""
+        start = self._index(i)
+        return bytes(self._buf[start:start + self.width])
+
+    def records(self):
+        """Yields each record as bytes, in order."""
+        buf, w = self._buf, self.width
+        for start in range(0, len(buf), w):
+            yield bytes(buf[start:start + w])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            w = self.width
+            if step == 1:
+                view = memoryview(self._buf)[start * w:max(start, stop) * w]
+                return AddressArray(view, w, self.style)
+            data = b''.join(self.record(j) for j in range(start, stop, step))
+            return AddressArray(bytearray(data), w, self.style)
+        return self._format(self.record(i))
+
+    def __iter__(self):
+        fmt = self._format
+        for r in self.records():
+            yield fmt(r)
+
+    def dd(self, i):
+        """Returns address `i` in dot-decimal form."""
+        return address_converter.bytes_to_dd(self.record(i))
+
+    def token(self, i, compress = True):
+        """Returns address `i` in colon-hex form."""
+        return address_converter.bytes_to_token(self.record(i), compress)
+
+    def append(self, address):
+        """
+        Appends an address given as a record of up to `width` bytes, or as a
+        string parsed according to the array's style.
+        """
+        if isinstance(address, str):
+            address = parse_address(address, self.width, self.style)
+        self.extend((address,))
+
+    def extend(self, records):
+        """
+        Appends records of up to `width` bytes each, right-aligned. Raises
+        TokenError for a record longer than `width`.
+        """
+        w = self.width
+        buf = self._buf
+        if not isinstance(buf, bytearray):
+            raise TypeError("Only an array backed by a bytearray can grow.")
+        for r in records:
+            n = len(r)
+            if n > w:
+                raise address_converter.TokenError(
+                        "Address of {:d} octets does not fit in {:d}.".format(n, w))
+            if n < w:
+                buf += bytes(w - n)
+            buf += r
+
+    def view(self):
+        """Returns a read-only memoryview of the packed records, without copying."""
+        return memoryview(self._buf).toreadonly()
+
+    def tobytes(self):
+        """Returns a copy of the packed records."""
+        return bytes(self._buf)
+
+    @property
+    def nbytes(self):
+        return len(self._buf)
+
+    def sort(self):
+        """
+        Sorts the addresses in place in numeric order. Records are in network
+        order, so this is the order of the raw bytes. The buffer must be
+        writable, so an array from load() or backed by bytes cannot be sorted;
+        use unique() or sort a copy instead.
+        """
+        view = memoryview(self._buf)
+        if view.readonly:
+            raise TypeError("Only an array backed by a writable buffer can be sorted in place.")
+        view[:] = b''.join(sorted(self.records()))
+
+    def unique(self):
+        """Returns a new array of the distinct addresses in numeric order."""
+        data = b''.join(sorted(set(self.records())))
+        return AddressArray(bytearray(data), self.width, self.style)
+
+    def __eq__(self, other):
+        if not isinstance(other, AddressArray):
+            return NotImplemented
+        return self.width == other.width and self._buf == other._buf
+
+    def __repr__(self):
+        return "AddressArray({:d} addresses, width={:d}, style={!r})".format(
+                len(self), self.width, self.style)
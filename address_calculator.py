@@ -1,14 +1,257 @@
 #!/usr/bin/env python3
 
+"""
+Prefix arithmetic for IPv4 and IPv6.
+
+Addresses are handled as integers together with their version, 4 or 6.
+CIDR strings such as "10.0.0.0/8" or "2001:db8::/32" are parsed with the
+dot-decimal and colon-hex parsers of address_converter.
+"""
+
+import address_converter
+
 _v4_len = 32
 _v6_len = 128
 
+# Lookup table maps an IP version to its address length in bits
+_address_lengths = {4: _v4_len, 6: _v6_len}
+
+
+class PrefixError(ValueError):
+    """Raised for an address or CIDR prefix that cannot be parsed."""
+
+
 def eng_exponent(n):
-    return len(("{:,d}".format(n)).split(",")) - 1
+    """
+    Returns the exponent of the largest power of 1000 not above |n| for an
+    integer n, i.e. the number of thousands separators in n, or 0 for 0.
+    """
+    n = abs(n)
+    if n < 1000:
+        return 0
+    # bit_length() - 1 is floor(log2(n)). Divided by a slight overestimate
+    # of log2(1000) it gives the exponent or one less, corrected below.
+    e = (n.bit_length() - 1) * 100000 // 996579
+    while 1000 ** (e + 1) <= n:
+        e += 1
+    return e
+
+
+def iec_exponent(n):
+    """
+    Returns the exponent of the largest power of 1024 not above |n| for an
+    integer n, or 0 for 0.
+    """
+    return (abs(n).bit_length() - 1) // 10 if n else 0
+
 
 def num_addresses(prefix_length, address_length):
     return 2 ** (address_length - prefix_length)
 
+
+# eng_exponent(2**h) for each count of host bits h in an IPv6 address
+_host_exponents = tuple(eng_exponent(1 << h) for h in range(_v6_len + 1))
+
+
+def address_counts(prefix_lengths, address_length, binary = False):
+    """
+    Returns a list of (num_addresses, exponent) for each prefix length in
+    `prefix_lengths`, where `exponent` is the eng_exponent() of the count,
+    or its iec_exponent() if `binary` is True.
+    """
+    out = []
+    for prefix_length in prefix_lengths:
+        h = address_length - prefix_length
+        if not 0 <= h <= address_length:
+            raise PrefixError("Bad prefix length {!r} for {:d}-bit addresses.".format(
+                    prefix_length, address_length))
+        if binary:
+            e = h // 10
+        elif h <= _v6_len:
+            e = _host_exponents[h]
+        else:
+            e = eng_exponent(1 << h)
+        out.append((1 << h, e))
+    return out
+
+
+def parse_address(s):
+    """
+    Parses an IPv4 address in dot-decimal form or an IPv6 address in
+    colon-hex form and returns a pair (n, version), where n is an integer.
+    """
+    try:
+        if ':' in s:
+            b = address_converter.parse_token(s)
+            version = 6
+        else:
+            b = address_converter.parse_dd(s)
+            version = 4
+    except address_converter.TokenError as e:
+        raise PrefixError(str(e)) from None
+
+    if len(b) * 8 != _address_lengths[version]:
+        raise PrefixError("Not a full IPv{:d} address: {!r}.".format(version, s))
+    return int.from_bytes(b, 'big'), version
+
+
+def format_address(n, version):
+    """
+    Formats the integer address `n` as dot-decimal for IPv4 or as RFC 5952
+    colon-hex for IPv6.
+    """
+    b = n.to_bytes(_address_lengths[version] // 8, 'big')
+    if version == 4:
+        return address_converter.bytes_to_dd(b)
+    return address_converter.bytes_to_token(b)
+
+
+def netmask(prefix_length, address_length):
+    """Returns the network mask of a prefix as an integer."""
+    return ((1 << address_length) - 1) ^ ((1 << (address_length - prefix_length)) - 1)
+
+
+def parse_prefix(cidr, strict = True):
+    """
+    Parses a CIDR string, e.g. "10.0.0.0/8", and returns a tuple
+    (network, prefix_length, version) with `network` as an integer. A bare
+    address is taken as a prefix of full length.
+
+    If `strict` is True, a prefix with host bits set raises PrefixError;
+    otherwise the host bits are cleared.
+    """
+    address, sep, length = cidr.partition('/')
+    n, version = parse_address(address)
+    address_length = _address_lengths[version]
+    if not sep:
+        return n, address_length, version
+
+    if not (length.isascii() and length.isdigit()) or int(length) > address_length:
+        raise PrefixError("Bad prefix length in {!r}.".format(cidr))
+    prefix_length = int(length)
+
+    network = n & netmask(prefix_length, address_length)
+    if network != n and strict:
+        raise PrefixError("Host bits set in {!r}.".format(cidr))
+    return network, prefix_length, version
+
+
+def format_prefix(network, prefix_length, version):
+    """Formats a prefix as a CIDR string."""
+    return "{}/{:d}".format(format_address(network, version), prefix_length)
+
+
+def prefix_info(cidr, strict = True):
+    """
+    Returns a dict describing the prefix `cidr`:
+
+        `network`, `netmask`, `first`, `last` and `broadcast` as strings
+        `prefix_length`, `version` and `num_addresses` as integers
+
+    `first` and `last` are the usable host addresses. For IPv4 these
+    exclude the network and broadcast addresses, except in a /31 (RFC 3021)
+    or /32. IPv6 has no broadcast address, so `broadcast` is None and every
+    address in the prefix is usable.
+    """
+    network, prefix_length, version = parse_prefix(cidr, strict)
+    address_length = _address_lengths[version]
+    total = num_addresses(prefix_length, address_length)
+    last = network + total - 1
+
+    if version == 4:
+        broadcast = format_address(last, version)
+        if total > 2:
+            first_host, last_host = network + 1, last - 1
+        else:
+            first_host, last_host = network, last
+    else:
+        broadcast = None
+        first_host, last_host = network, last
+
+    return {
+            "network": format_address(network, version),
+            "netmask": format_address(netmask(prefix_length, address_length), version),
+            "broadcast": broadcast,
+            "first": format_address(first_host, version),
+            "last": format_address(last_host, version),
+            "prefix_length": prefix_length,
+            "version": version,
+            "num_addresses": total
+            }
+
+
+def subnet_range(network, prefix_length, new_prefix_length, address_length):
+    """
+    Returns the networks of the subnets of length `new_prefix_length` of a
+    prefix, as a range of integers. The range is lazy, so splitting a large
+    prefix into very long ones costs nothing until it is iterated.
+    """
+    if not prefix_length <= new_prefix_length <= address_length:
+        raise PrefixError("New prefix length must be between {:d} and {:d}.".format(
+                prefix_length, address_length))
+    step = 1 << (address_length - new_prefix_length)
+    return range(network, network + num_addresses(prefix_length, address_length), step)
+
+
+def subnets(cidr, new_prefix_length):
+    """
+    Yields the subnets of length `new_prefix_length` of the prefix `cidr`
+    as CIDR strings, in order, e.g. subnets("10.0.0.0/8", 10) yields
+    "10.0.0.0/10", "10.64.0.0/10", "10.128.0.0/10" and "10.192.0.0/10".
+    """
+    network, prefix_length, version = parse_prefix(cidr)
+    address_length = _address_lengths[version]
+    for n in subnet_range(network, prefix_length, new_prefix_length, address_length):
+        yield format_prefix(n, new_prefix_length, version)
+
+
+def range_to_prefixes(first, last, address_length):
+    """
+    Yields the fewest prefixes (network, prefix_length) that exactly cover
+    the integer addresses from `first` to `last` inclusive.
+    """
+    while first <= last:
+        # The largest block that starts at `first` and fits before `last`
+        size = first & -first if first else 1 << address_length
+        span = 1 << ((last - first + 1).bit_length() - 1)
+        size = min(size, span)
+        yield first, address_length - size.bit_length() + 1
+        first += size
+
+
+def summarize(prefixes, strict = True):
+    """
+    Aggregates CIDR strings into the smallest list of prefixes covering
+    exactly the same addresses, sorted with IPv4 before IPv6.
+
+    The prefixes are sorted as address ranges, overlapping and adjacent
+    ranges are merged in one pass, and each merged range is cut back into
+    prefixes, so the cost is O(n log n) in the number of prefixes.
+    """
+    ranges = []
+    for cidr in prefixes:
+        network, prefix_length, version = parse_prefix(cidr, strict)
+        size = num_addresses(prefix_length, _address_lengths[version])
+        ranges.append((version, network, network + size - 1))
+    ranges.sort()
+
+    out = []
+    merged = None
+    for version, first, last in ranges:
+        if merged and merged[0] == version and first <= merged[2] + 1:
+            if last > merged[2]:
+                merged[2] = last
+            continue
+        if merged:
+            out.append(merged)
+        merged = [version, first, last]
+    if merged:
+        out.append(merged)
+
+    return [format_prefix(n, length, version)
+            for version, first, last in out
+            for n, length in range_to_prefixes(first, last, _address_lengths[version])]
+
 if __name__ == "__main__":
     prefix = int(input("Network prefix length: "), 10)
     network = input("IP version (4 or 6): ")
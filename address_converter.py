@@ -5,13 +5,49 @@ ip token list/get returns a token in dot-decimal form.
 This script will convert a standard hex token to dot-decimal
 for comparison to the ip output.
 
-TODO:
-Replace input() with argparse
-Add conversion from dot-decimal to colon-hex
-Add exception handling for bad input strings
+With -r the conversion runs the other way, from dot-decimal to colon-hex,
+with 16-octet addresses compressed to RFC 5952 canonical form.
+
+Tokens may be given on the command line, or read in bulk from a file or
+stdin with -f, one token per line. Results are streamed to stdout and bad
+lines are reported on stderr (or the file given with -e) without stopping
+the run. With --follow, the file given with -f is followed as a live log
+and only appended lines are converted (see log_follow.py).
 """
 
-#import argparse
+import os
+import struct
+import sys
+
+# argparse and re are imported where they are first needed, so that
+# importing this module as a library stays cheap.
+
+
+# Compiled patterns for a valid token, keyed by (fill, delim)
+_token_res = {}
+# Lookup table maps an octet as an index to its decimal string
+_octet_str = tuple(str(i) for i in range(256))
+# ...and the reverse, from a decimal string without leading zeroes to an octet
+_octet_val = dict((s, i) for i, s in enumerate(_octet_str))
+# Number of groups a '::' in a token expands to
+_v6_groups = 8
+# Pattern for one dot-decimal address, and for a batch of them with a fixed
+# octet count, keyed by that count, all compiled on first use
+_dd_pattern = None
+_dd_batch_res = {}
+# Runs of zero groups in a full-form address, longest first, framed with
+# the delimiter on both sides so they only match whole groups
+_zero_runs = tuple(':' + ':'.join('0' * n) + ':' for n in range(_v6_groups, 1, -1))
+# Format for a full-form address unpacked to 16-bit groups
+_v6_format = ':'.join(('%x',) * _v6_groups)
+# Lines read per chunk in bulk mode are capped at roughly this many bytes
+_chunk_size = 1 << 20
+# Report for a line that failed to convert in bulk mode
+_error_format = "line {:d}: {!r}: {}\n"
+
+
+class TokenError(ValueError):
+    """Raised when a hex token or dot-decimal address cannot be converted."""
 
 
 def split_and_fill(s, fill = 4, delim = ':'):
@@ -54,18 +90,343 @@ def hex_to_int(t):
 def int_to_dd(t):
     """
     Takes an iterable of integers and returns a dot-decimal string.
+
+    A bytes-like `t` is formatted through the octet lookup table.
     """
+    if isinstance(t, (bytes, bytearray)):
+        return bytes_to_dd(t)
     return '.'.join((str(x) for x in t))
 
 
-if __name__ == "__main__":
-    token = input("Hex token, e.g. dead:beef : ")
-    token_p = split_and_fill(token)
-    token_s = "".join(token_p)
-    #print(token_s)
-    token_r = split_in_pairs(token_s)
-    token_d = hex_to_int(token_r)
+def _token_re(fill, delim):
     try:
-        print(int_to_dd(token_d))
+        return _token_res[fill, delim]
+    except KeyError:
+        import re
+        group = "[0-9A-Fa-f]{{0,{:d}}}".format(fill)
+        r = re.compile("{0}(?:{1}{0})*".format(group, re.escape(delim)))
+        _token_res[fill, delim] = r
+        return r
+
+
+def parse_token(token, fill = 4, delim = ':'):
+    """
+    Parses a hex token in a single step and returns its octets as bytes, e.g.
+    parse_token("de:ad:be:ef") returns b'\\x00\\xde\\x00\\xad\\x00\\xbe\\x00\\xef'.
+
+    Gives the same octets as split_and_fill -> split_in_pairs -> hex_to_int,
+    without building the intermediate strings and generators. A doubled
+    delimiter is expanded as in IPv6, filling the token out to 8 groups,
+    e.g. "::1a:2b:3c:4d" gives 16 octets.
+
+    Raises TokenError if a group is longer than `fill` or contains anything
+    other than hex digits, or if a '::' cannot be expanded.
+    """
+    if _token_re(fill, delim).fullmatch(token) is None:
+        raise TokenError("Bad hex token {!r}.".format(token))
+
+    groups = token.split(delim)
+    if delim * 2 in token:
+        head, _, tail = token.partition(delim * 2)
+        head = head.split(delim) if head else []
+        tail = tail.split(delim) if tail else []
+        missing = _v6_groups - len(head) - len(tail)
+        if missing < 1 or '' in head or '' in tail:
+            raise TokenError("Cannot expand '{}' in token {!r}.".format(delim * 2, token))
+        groups = head + ['0'] * missing + tail
+
+    token_s = ''.join([g.zfill(fill) for g in groups])
+    if len(token_s) % 2:
+        token_s = '0' + token_s
+    return bytes.fromhex(token_s)
+
+
+def token_to_int(token, fill = 4, delim = ':'):
+    """
+    Parses a hex token and returns its value as a single integer.
+    """
+    return int.from_bytes(parse_token(token, fill, delim), 'big')
+
+
+def bytes_to_dd(b):
+    """
+    Takes a bytes-like sequence of octets and returns a dot-decimal string.
+    """
+    return '.'.join([_octet_str[x] for x in b])
+
+
+def convert_token(token, fill = 4, delim = ':'):
+    """
+    Converts a single hex token to a dot-decimal string, e.g.
+    convert_token("dead:beef") returns "222.173.190.239".
+
+    Raises TokenError if a group is longer than `fill` or contains anything
+    other than hex digits.
+    """
+    return bytes_to_dd(parse_token(token, fill, delim))
+
+
+def _dd_re():
+    global _dd_pattern
+    if _dd_pattern is None:
+        import re
+        _dd_pattern = re.compile("[0-9]{1,3}(?:\\.[0-9]{1,3})*")
+    return _dd_pattern
+
+
+def parse_dd(address):
+    """
+    Parses a dot-decimal address and returns its octets as bytes, e.g.
+    parse_dd("222.173.190.239") returns b'\\xde\\xad\\xbe\\xef'.
+
+    Raises TokenError if a part is not a decimal number from 0 to 255.
+    """
+    if _dd_re().fullmatch(address) is None:
+        raise TokenError("Bad dot-decimal address {!r}.".format(address))
+    try:
+        return bytes(map(int, address.split('.')))
     except ValueError:
-        raise ValueError("Ooops") from ValueError
+        raise TokenError("Octet out of range in address {!r}.".format(address)) from None
+
+
+def _compress(s):
+    """
+    Replaces the longest run of two or more zero groups in a full-form
+    address with '::', taking the first run on a tie (RFC 5952, 4.2).
+    """
+    t = ':' + s + ':'
+    for run in _zero_runs:
+        i = t.find(run)
+        if i >= 0:
+            return t[1:i] + '::' + t[i + len(run):-1]
+    return s
+
+
+def bytes_to_token(b, compress = True):
+    """
+    Takes a bytes-like sequence of octets and returns a colon-hex token of
+    16-bit groups without leading zeroes, e.g. b'\\xde\\xad\\xbe\\xef' gives
+    "dead:beef". An odd number of octets is padded with a zero in front.
+
+    If `compress` is True, a 16-octet address is given in RFC 5952 canonical
+    form, e.g. "::1a:2b:3c:4d" rather than "0:0:0:0:1a:2b:3c:4d". Shorter
+    tokens are never compressed, since parse_token() expands '::' to 8 groups.
+    """
+    if len(b) % 2:
+        b = b'\x00' + bytes(b)
+    n = len(b) // 2
+    if n == _v6_groups:
+        s = _v6_format % struct.unpack('>8H', b)
+        return _compress(s) if compress else s
+    return ':'.join(('%x',) * n) % struct.unpack('>{:d}H'.format(n), b)
+
+
+def dd_to_token(address, compress = True):
+    """
+    Converts a single dot-decimal address to a colon-hex token, e.g.
+    dd_to_token("222.173.190.239") returns "dead:beef".
+
+    Raises TokenError if the address cannot be parsed.
+    """
+    return bytes_to_token(parse_dd(address), compress)
+
+
+def _dd_batch_re(count):
+    try:
+        return _dd_batch_res[count]
+    except KeyError:
+        import re
+        r = re.compile("(?:[0-9]{{1,3}}(?:\\.[0-9]{{1,3}}){{{:d}}}\n)*".format(count - 1))
+        _dd_batch_res[count] = r
+        return r
+
+
+def pack_dd(addresses):
+    """
+    Packs a non-empty list of dot-decimal addresses with the same number of
+    octets into one bytes object, validating the whole batch with one
+    pattern match. Returns (octets per address, data), with data None if
+    the addresses differ in length or any of them cannot be parsed.
+    """
+    count = addresses[0].count('.') + 1
+    text = '\n'.join(addresses) + '\n'
+    if _dd_batch_re(count).fullmatch(text) is None:
+        return count, None
+    try:
+        return count, bytes(map(_octet_val.__getitem__, text[:-1].replace('\n', '.').split('.')))
+    except KeyError:
+        # Leading zeroes or an octet out of range
+        return count, None
+
+
+def dd_to_tokens(addresses, compress = True):
+    """
+    Converts a list of dot-decimal addresses to a list of colon-hex tokens.
+
+    When every address has the same number of octets, as with a list of IPv4
+    or IPv6 addresses, the whole batch is validated with one pattern match,
+    split once, and unpacked record by record with struct, rather than
+    parsing each address on its own. Mixed lists fall back to dd_to_token().
+
+    Raises TokenError for the first address that cannot be parsed.
+    """
+    if not addresses:
+        return []
+
+    count, data = pack_dd(addresses)
+    if data is None or count % 2:
+        return [dd_to_token(a, compress) for a in addresses]
+
+    n = count // 2
+    records = struct.iter_unpack('>{:d}H'.format(n), data)
+    if n == _v6_groups:
+        if compress:
+            return [_compress(_v6_format % g) for g in records]
+        return [_v6_format % g for g in records]
+    fmt = ':'.join(('%x',) * n)
+    return [fmt % g for g in records]
+
+
+def convert_lines(lines, convert = convert_token):
+    """
+    Converts each non-blank line in the list `lines` with `convert`.
+
+    Returns a pair (out, bad), where `out` is the list of results and `bad`
+    lists a tuple (index, token, error) for each line that raised TokenError.
+    """
+    out = []
+    bad = []
+    append = out.append
+    for i, line in enumerate(lines):
+        token = line.strip()
+        if not token:
+            continue
+        try:
+            append(convert(token))
+        except TokenError as e:
+            bad.append((i, token, e))
+    return out, bad
+
+
+def convert_stream(infile, outfile, errfile = None, chunk_size = _chunk_size,
+        convert = convert_token):
+    """
+    Converts newline-delimited hex tokens from the text file `infile` and
+    writes one dot-decimal address per line to `outfile`. Any other
+    single-argument function raising TokenError, e.g. dd_to_token, may be
+    given as `convert`.
+
+    Lines are read in chunks of about `chunk_size` bytes and each chunk is
+    written out before the next is read, so memory use does not grow with
+    the size of the input. Blank lines are skipped. Lines that fail to
+    convert are reported to `errfile` (stderr by default) as
+    "line N: 'token': reason" and the run continues.
+
+    Returns a pair (converted, errors) of line counts.
+    """
+    if errfile is None:
+        errfile = sys.stderr
+
+    converted = errors = 0
+    lineno = 0
+    while True:
+        lines = infile.readlines(chunk_size)
+        if not lines:
+            break
+
+        out, bad = convert_lines(lines, convert)
+        for i, token, e in bad:
+            errfile.write(_error_format.format(lineno + i + 1, token, e))
+        lineno += len(lines)
+        errors += len(bad)
+
+        if out:
+            converted += len(out)
+            out.append('')
+            outfile.write('\n'.join(out))
+
+    return converted, errors
+
+
+def _parse_args(argv = None):
+    import argparse
+    parser = argparse.ArgumentParser(
+            description = "Convert colon-hex tokens to dot-decimal, or back with -r.")
+    parser.add_argument("tokens", nargs = '*', metavar = "token",
+            help = "hex token, e.g. dead:beef")
+    parser.add_argument("-r", "--reverse", action = 'store_true',
+            help = "convert dot-decimal addresses to colon-hex")
+    parser.add_argument("--no-compress", dest = 'compress', action = 'store_false',
+            help = "with -r, do not compress zero runs to '::'")
+    parser.add_argument("-f", "--file",
+            help = "read newline-delimited tokens from FILE ('-' for stdin)")
+    parser.add_argument("-o", "--output",
+            help = "write results to OUTPUT instead of stdout")
+    parser.add_argument("-e", "--errors",
+            help = "write bad lines to ERRORS instead of stderr")
+    parser.add_argument("--follow", action = 'store_true',
+            help = "keep converting lines as they are appended to FILE")
+    parser.add_argument("--checkpoint",
+            help = "with --follow, resume from and record the position in CHECKPOINT")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = _parse_args(argv)
+    if os.environ.get("CONVERTER_INSTRUMENT"):
+        import instrumentation
+        instrumentation.install_from_env()
+    if args.reverse:
+        compress = args.compress
+        convert = lambda a: dd_to_token(a, compress)
+    else:
+        convert = convert_token
+
+    outfile = open(args.output, 'w') if args.output else sys.stdout
+    errfile = open(args.errors, 'w') if args.errors else sys.stderr
+    try:
+        if args.follow:
+            if not args.file or args.file == '-':
+                errfile.write("--follow needs a log file given with -f.\n")
+                return 2
+            import log_follow
+            try:
+                log_follow.follow(args.file, outfile, args.checkpoint, errfile, convert)
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        if args.file:
+            if args.file == '-':
+                _, errors = convert_stream(sys.stdin, outfile, errfile, convert = convert)
+            else:
+                with open(args.file, encoding = 'ascii', errors = 'replace') as infile:
+                    _, errors = convert_stream(infile, outfile, errfile, convert = convert)
+            return 1 if errors else 0
+
+        if args.reverse:
+            prompt = "Dot-decimal address, e.g. 222.173.190.239 : "
+        else:
+            prompt = "Hex token, e.g. dead:beef : "
+        tokens = args.tokens or [input(prompt)]
+        status = 0
+        for token in tokens:
+            try:
+                outfile.write(convert(token) + '\n')
+            except TokenError as e:
+                errfile.write(str(e) + '\n')
+                status = 1
+        return status
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if errfile is not sys.stderr:
+            errfile.close()
+
+
+if __name__ == "__main__":
+    # Run main() of the module as imported, so that there is one copy of
+    # its functions and TokenError, shared with the modules that import
+    # it, e.g. log_follow, rather than a second copy in __main__
+    import address_converter
+    sys.exit(address_converter.main())
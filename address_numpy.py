@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""
+NumPy backend for converting many hex tokens at once.
+
+parse_tokens() turns N colon-hex tokens into an (N, 16) uint8 matrix of
+octets in one vectorized pass, right-aligned so that a short token such as
+"dead:beef" fills the last four columns. format_matrix() turns such a
+matrix back into dot-decimal strings without a Python-level loop per
+octet. tokens_to_dd() chains the two, and falls back to
+address_converter.convert_token() when NumPy is not installed.
+
+Tokens follow the rules of address_converter.parse_token() with the
+default fill of 4 and ':' as the delimiter, limited to at most 8 groups,
+and a '::' is expanded to 8 groups in the same way. tokens_to_dd() passes
+the tokens parse_tokens() rejects to convert_token(), so it accepts and
+rejects exactly what convert_token() does, longer tokens included.
+"""
+
+import address_converter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Longest valid token: 8 groups of 4 digits and 7 delimiters
+_max_len = 39
+_max_groups = 8
+# Smallest batch of tokens worth handing to the backend, for the modules
+# that choose between it and a loop per token
+_numpy_min = 64
+
+# Lookup tables, built on first use
+_hex_vals = None
+_octet_txt = None
+_octet_len = None
+
+
+def _tables():
+    global _hex_vals, _octet_txt, _octet_len
+    if _hex_vals is None:
+        # Maps a character code to its hex digit value, -1 for ':' and -2
+        # for anything else, including a NUL within a token
+        hex_vals = np.full(256, -2, dtype = np.int8)
+        for c in "0123456789abcdefABCDEF":
+            hex_vals[ord(c)] = int(c, 16)
+        hex_vals[ord(':')] = -1
+
+        # Maps an octet to its decimal digits followed by '.', zero padded
+        # to 4 bytes, and to a mask of the bytes used. Both are packed into
+        # one uint32 per octet so a row of octets can be looked up with take().
+        octet_txt = np.zeros((256, 4), dtype = np.uint8)
+        octet_len = np.zeros((256, 4), dtype = np.uint8)
+        for i, s in enumerate(address_converter._octet_str):
+            b = (s + '.').encode('ascii')
+            octet_txt[i, :len(b)] = tuple(b)
+            octet_len[i, :len(b)] = 1
+        octet_txt = octet_txt.view(np.uint32)[:, 0]
+        octet_len = octet_len.view(np.uint32)[:, 0]
+
+        _hex_vals, _octet_txt, _octet_len = hex_vals, octet_txt, octet_len
+    return _hex_vals, _octet_txt, _octet_len
+
+
+def _require_numpy(purpose = "the vectorized backend"):
+    """Raises ImportError, naming `purpose`, if NumPy is not installed."""
+    if np is None:
+        raise ImportError("NumPy is required for {}.".format(purpose))
+
+
+def _char_codes(tokens):
+    """
+    Returns a pair (codes, lengths): an (N, W) array of character codes for
+    a sequence of str or bytes tokens, zero padded on the right, and an (N,)
+    array of the length of each token. The lengths are taken from the tokens
+    themselves, since NumPy drops trailing NULs, so that padding is told
+    apart from a NUL in a token.
+    """
+    lengths = np.fromiter(map(len, tokens), dtype = np.intp, count = len(tokens))
+    a = np.asarray(tokens)
+    if a.ndim != 1:
+        a = a.reshape(-1)
+    if a.dtype.kind == 'U':
+        width = a.dtype.itemsize // 4
+        codes = a.view(np.uint32)
+    elif a.dtype.kind == 'S':
+        width = a.dtype.itemsize
+        codes = a.view(np.uint8)
+    else:
+        a = a.astype(str)
+        width = a.dtype.itemsize // 4
+        codes = a.view(np.uint32)
+    return codes.reshape(len(a), width), lengths
+
+
+def parse_tokens(tokens, strict = True):
+    """
+    Parses a sequence of N hex tokens and returns a pair (matrix, nbytes):
+
+        `matrix` is an (N, 16) uint8 array of octets, right-aligned
+        `nbytes` is an (N,) uint8 array with the number of octets in each token
+
+    so that matrix[i, 16 - nbytes[i]:] holds the same octets as
+    address_converter.parse_token(tokens[i]).
+
+    If `strict` is True, the first bad token raises TokenError. Otherwise
+    bad tokens get a row of zeroes and an `nbytes` of 0.
+    """
+    _require_numpy()
+    hex_vals, _, _ = _tables()
+
+    codes, lengths = _char_codes(tokens)
+    n = len(codes)
+    bad = lengths > _max_len
+    if codes.shape[1] > _max_len:
+        codes = codes[:, :_max_len]
+    position = np.arange(codes.shape[1])
+    padding = position >= lengths[:, None]
+
+    # Any code outside ASCII marks the row bad before narrowing to one byte
+    if codes.dtype != np.uint8:
+        bad |= (codes > 127).any(axis = 1)
+        codes = codes.astype(np.uint8)
+    # Padding is -3, so that it is neither a digit, a delimiter nor bad
+    vals = np.where(padding, np.int8(-3), hex_vals.take(codes))
+    is_digit = vals >= 0
+    is_colon = vals == -1
+    bad |= (vals == -2).any(axis = 1)
+
+    # Count the delimiters and digits to the right of each character. For
+    # each digit, its rank from the right within its group is the number of
+    # digits after it less the number of digits after the next delimiter.
+    n_colons = is_colon.sum(axis = 1, keepdims = True, dtype = np.int8)
+    colons_after = n_colons - np.cumsum(is_colon, axis = 1, dtype = np.int8)
+    n_digits = is_digit.sum(axis = 1, keepdims = True, dtype = np.int8)
+    digits_after = n_digits - np.cumsum(is_digit, axis = 1, dtype = np.int8)
+    # Digits after a delimiter never increase from left to right, so a
+    # running maximum from the right picks out the nearest delimiter.
+    at_colon = np.where(is_colon, digits_after, np.int8(0))
+    group_end = np.maximum.accumulate(at_colon[:, ::-1], axis = 1)[:, ::-1]
+    rank = digits_after - group_end
+    bad |= (is_digit & (rank >= 4)).any(axis = 1)
+
+    # Groups right of a '::' (or of every group, without one) are aligned
+    # to the end of the token; groups left of it to the start of 8 groups.
+    doubled = is_colon[:, :-1] & is_colon[:, 1:]
+    n_doubled = doubled.sum(axis = 1)
+    expand = n_doubled == 1
+    bad |= n_doubled > 1
+    bad |= ~expand & (n_colons[:, 0] >= _max_groups)
+
+    nibble = 4 * colons_after.astype(np.intp) + rank
+    if expand.any():
+        at = np.argmax(doubled, axis = 1)[:, None]
+        length = np.minimum(lengths, codes.shape[1])[:, None]
+        colons_before = n_colons - colons_after - is_colon
+        head = np.where(at > 0, np.take_along_axis(colons_before, at, axis = 1) + 1, 0)
+        tail = np.where(at + 2 < length, np.take_along_axis(colons_after, at + 1, axis = 1) + 1, 0)
+        last = np.take_along_axis(is_colon, length - 1, axis = 1)
+        bad |= expand & ((head + tail)[:, 0] >= _max_groups)
+        # A single delimiter may not start or end a token around a '::'
+        bad |= expand & is_colon[:, 0] & (at[:, 0] > 0)
+        bad |= expand & last[:, 0] & (at[:, 0] + 2 < length[:, 0])
+
+        in_head = expand[:, None] & (position < at)
+        from_start = 4 * (_max_groups - 1 - colons_before.astype(np.intp)) + rank
+        nibble = np.where(in_head, from_start, nibble)
+
+    if strict and bad.any():
+        i = int(np.argmax(bad))
+        raise address_converter.TokenError("Bad hex token {!r}.".format(tokens[i]))
+
+    # Scatter each digit into a row of 32 nibbles, most significant first,
+    # using its position counted from the least significant end. Everything
+    # else goes to a spare column 32 that is dropped afterwards.
+    target = np.where(is_digit & ~bad[:, None], 31 - nibble, 32)
+    nibbles = np.zeros((n, 33), dtype = np.uint8)
+    np.put_along_axis(nibbles, target, vals.view(np.uint8), axis = 1)
+    matrix = (nibbles[:, 0:32:2] << 4) | nibbles[:, 1:32:2]
+
+    groups = n_colons[:, 0].astype(np.intp) + 1
+    nbytes = np.where(expand, 16, 2 * groups)
+    nbytes = np.where(bad, 0, nbytes).astype(np.uint8)
+    return matrix, nbytes
+
+
+def format_matrix(matrix, nbytes = None):
+    """
+    Formats an (N, 16) uint8 matrix of right-aligned octets as a list of N
+    dot-decimal strings, using the last nbytes[i] octets of each row
+    (all 16 if `nbytes` is None). Rows with an `nbytes` of 0 give ''.
+    """
+    _require_numpy()
+    _, octet_txt, octet_len = _tables()
+
+    matrix = np.asarray(matrix, dtype = np.uint8)
+    n = len(matrix)
+    # Only the columns used by the widest row need formatting
+    if nbytes is not None and n:
+        nbytes = np.asarray(nbytes, dtype = np.intp)
+        width = max(int(nbytes.max()), 1)
+    else:
+        width = 16
+    matrix = matrix[:, 16 - width:]
+
+    chars = octet_txt.take(matrix).view(np.uint8).reshape(n, width, 4)
+    keep = octet_len.take(matrix).view(np.bool_).reshape(n, width, 4)
+    if nbytes is not None:
+        keep &= (np.arange(width) >= width - nbytes[:, None])[..., None]
+
+    # The '.' after the last octet of each row becomes the row separator
+    rows = np.arange(n)
+    last = keep[:, -1].sum(axis = 1) - 1
+    chars[rows, -1, last] = ord('\n')
+    keep[rows, -1, last] = True
+
+    text = chars[keep].tobytes().decode('ascii')
+    return text.split('\n')[:-1]
+
+
+def tokens_to_dd(tokens, strict = True):
+    """
+    Converts a sequence of hex tokens to a list of dot-decimal strings.
+
+    Uses the vectorized backend when NumPy is installed, and
+    address_converter.convert_token() for each token otherwise, and for the
+    tokens the backend rejects. If `strict` is False, bad tokens give ''
+    instead of raising TokenError.
+    """
+    if np is not None:
+        matrix, nbytes = parse_tokens(tokens, False)
+        out = format_matrix(matrix, nbytes)
+        rejected = np.flatnonzero(nbytes == 0)
+        if not len(rejected):
+            return out
+        # Bad tokens fail with convert_token()'s own message, and tokens of
+        # more than 8 groups, which do not fit a row, are converted by it
+        for i in rejected:
+            token = tokens[i]
+            if isinstance(token, bytes):
+                token = token.decode('ascii', 'replace')
+            try:
+                out[i] = address_converter.convert_token(token)
+            except address_converter.TokenError:
+                if strict:
+                    raise
+        return out
+
+    out = []
+    for token in tokens:
+        try:
+            out.append(address_converter.convert_token(token))
+        except address_converter.TokenError:
+            if strict:
+                raise
+            out.append('')
+    return out
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""
+Converts a large token file with a pool of worker processes.
+
+The input is memory-mapped and cut into byte ranges of about `chunk_size`
+bytes, each ending on a newline. Workers convert whole ranges and the
+results are written out in input order, with at most a few ranges per
+worker in flight so memory use stays bounded however large the file is.
+
+    python3 address_parallel.py FILE [-j WORKERS] [-c CHUNK_SIZE] [-r]
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import address_converter
+
+
+# Default bytes per range handed to a worker
+_chunk_size = 4 << 20
+# Ranges in flight per worker
+_ahead = 2
+
+
+def split_ranges(mm, chunk_size = _chunk_size):
+    """
+    Yields (start, end) byte ranges covering the buffer `mm`, each about
+    `chunk_size` bytes long and ending just after a newline (or at the end).
+    """
+    size = len(mm)
+    start = 0
+    while start < size:
+        end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end < 0 else end + 1
+        yield start, end
+        start = end
+
+
+def _converter(reverse, compress):
+    if not reverse:
+        return address_converter.convert_token
+    return lambda a: address_converter.dd_to_token(a, compress)
+
+
+def _convert_range(path, start, end, reverse = False, compress = True):
+    """
+    Worker: converts the lines in bytes [start, end) of the file at `path`.
+
+    Returns (text, count, converted, bad), where `text` is the output for
+    the range, `count` the number of lines read, `converted` the number of
+    results and `bad` the list from convert_lines().
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            lines = mm[start:end].decode('ascii', 'replace').split('\n')
+    if not lines[-1]:
+        lines.pop()
+
+    out, bad = address_converter.convert_lines(lines, _converter(reverse, compress))
+    converted = len(out)
+    if out:
+        out.append('')
+    return '\n'.join(out), len(lines), converted, bad
+
+
+def convert_file(path, outfile, errfile = None, workers = None,
+        chunk_size = _chunk_size, reverse = False, compress = True):
+    """
+    Converts the newline-delimited tokens in the file at `path` and writes
+    the results to the text file `outfile` in input order, reporting bad
+    lines to `errfile` (stderr by default) as convert_stream() does.
+
+    `workers` is the number of processes (os.cpu_count() by default). With
+    a single worker the ranges are converted in this process. If `reverse`
+    is True, dot-decimal addresses are converted to colon-hex instead.
+
+    Returns a pair (converted, errors) of line counts.
+    """
+    if errfile is None:
+        errfile = sys.stderr
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    converted = errors = 0
+    lineno = 0
+
+    def write(result):
+        nonlocal converted, errors, lineno
+        text, count, n, bad = result
+        for i, token, e in bad:
+            errfile.write(address_converter._error_format.format(lineno + i + 1, token, e))
+        outfile.write(text)
+        converted += n
+        errors += len(bad)
+        lineno += count
+
+    if os.path.getsize(path) == 0:
+        return 0, 0
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            ranges = split_ranges(mm, chunk_size)
+
+            if workers == 1:
+                for start, end in ranges:
+                    write(_convert_range(path, start, end, reverse, compress))
+                return converted, errors
+
+            with ProcessPoolExecutor(workers) as pool:
+                pending = deque()
+                for start, end in ranges:
+                    pending.append(pool.submit(_convert_range, path, start, end, reverse, compress))
+                    if len(pending) >= workers * _ahead:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    return converted, errors
+
+
+def _parse_args(argv = None):
+    parser = argparse.ArgumentParser(
+            description = "Convert a large token file with a pool of worker processes.")
+    parser.add_argument("file", help = "newline-delimited tokens")
+    parser.add_argument("-j", "--workers", type = int, default = None,
+            help = "number of worker processes (default: all CPUs)")
+    parser.add_argument("-c", "--chunk-size", type = int, default = _chunk_size,
+            help = "bytes per range handed to a worker (default: %(default)d)")
+    parser.add_argument("-r", "--reverse", action = 'store_true',
+            help = "convert dot-decimal addresses to colon-hex")
+    parser.add_argument("--no-compress", dest = 'compress', action = 'store_false',
+            help = "with -r, do not compress zero runs to '::'")
+    parser.add_argument("-o", "--output",
+            help = "write results to OUTPUT instead of stdout")
+    parser.add_argument("-e", "--errors",
+            help = "write bad lines to ERRORS instead of stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = _parse_args(argv)
+
+    outfile = open(args.output, 'w') if args.output else sys.stdout
+    errfile = open(args.errors, 'w') if args.errors else sys.stderr
+    try:
+        _, errors = convert_file(args.file, outfile, errfile, args.workers,
+                args.chunk_size, args.reverse, args.compress)
+        return 1 if errors else 0
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if errfile is not sys.stderr:
+            errfile.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
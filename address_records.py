@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+"""
+Files of packed binary addresses, and conversion to and from text.
+
+A record file is a flat run of fixed-width records in network order, 4
+bytes per IPv4 address or 16 per IPv6 address, with no header or
+delimiters, as written by AddressArray.save(). Reading maps the file with
+AddressArray.load(), so records are iterated, sliced and counted in place
+without reading or decoding the whole file. Text is produced or parsed only
+at the edges: unpack() formats the records a chunk at a time, and pack()
+and RecordWriter parse text addresses as they are written.
+
+    python3 address_records.py pack -w 4 addresses.txt addresses.bin
+    python3 address_records.py unpack -w 4 -s dd addresses.bin
+    python3 address_records.py count -w 16 addresses.bin
+"""
+
+import struct
+import sys
+
+import address_converter
+import address_numpy
+import exp_notation
+from address_array import AddressArray, parse_address, radix_styles
+
+
+# Records formatted at a time by unpack()
+_chunk_records = 65536
+# Text forms of addresses
+styles = ("dd", "hex") + tuple(radix_styles)
+
+
+def format_records(buf, width = 16, style = "dd", compress = True):
+    """
+    Formats each `width`-byte record of the bytes-like `buf` as dot-decimal,
+    colon-hex or a radix identifier, according to `style`, and returns a
+    list of strings.
+
+    Records are unpacked straight from the buffer with one struct format for
+    the whole run, so a memoryview of a mapped file is read without copying.
+    Radix styles encode the whole run with exp_notation.radix_encode_many().
+    """
+    if len(buf) % width:
+        raise ValueError("Buffer length is not a multiple of {:d}.".format(width))
+    if style in radix_styles:
+        return exp_notation.radix_encode_many(buf, width, *radix_styles[style])
+    if style == "dd":
+        fmt = '.'.join(('%d',) * width)
+        return [fmt % r for r in struct.iter_unpack('{:d}B'.format(width), buf)]
+    if style != "hex":
+        raise ValueError("Style must be one of: " + ", ".join(styles) + ".")
+    if width % 2:
+        view = memoryview(buf)
+        return [address_converter.bytes_to_token(view[i:i + width], compress)
+                for i in range(0, len(view), width)]
+
+    n = width // 2
+    records = struct.iter_unpack('>{:d}H'.format(n), buf)
+    fmt = ':'.join(('%x',) * n)
+    if n == 8 and compress:
+        return [address_converter._compress(fmt % g) for g in records]
+    return [fmt % g for g in records]
+
+
+def _fit(record, width):
+    n = len(record)
+    if n > width:
+        raise address_converter.TokenError(
+                "Address of {:d} octets does not fit in {:d}.".format(n, width))
+    return bytes(width - n) + record if n < width else record
+
+
+def pack_address(address, width = 16, style = "dd"):
+    """
+    Parses one text address according to `style` and returns it as a
+    `width`-byte record, right-aligned. Raises TokenError if it cannot be
+    parsed or does not fit.
+    """
+    return _fit(parse_address(address, width, style), width)
+
+
+def pack_addresses(addresses, width = 16, style = "dd"):
+    """
+    Parses a list of text addresses and returns their records as one bytes
+    object. A batch of dot-decimal addresses of exactly `width` octets is
+    validated and packed in one step, and a large batch of colon-hex tokens
+    goes through the NumPy parser when it is installed; anything else is
+    packed address by address. Raises TokenError for a bad address.
+    """
+    if not addresses:
+        return b''
+    if style == "dd":
+        count, data = address_converter.pack_dd(addresses)
+        if data is not None and count == width:
+            return data
+    elif (style == "hex" and address_numpy.np is not None and width <= 16
+            and len(addresses) >= address_numpy._numpy_min):
+        matrix, nbytes = address_numpy.parse_tokens(addresses)
+        if int(nbytes.max()) > width:
+            i = int(nbytes.argmax())
+            raise address_converter.TokenError("Address of {:d} octets does not fit in {:d}.".format(
+                    int(nbytes[i]), width))
+        return matrix[:, 16 - width:].tobytes()
+    return b''.join([pack_address(a, width, style) for a in addresses])
+
+
+class RecordWriter:
+    """
+    Writes records of `width` bytes to a new file at `path`, or appends to
+    an existing one if `append` is True. Text addresses are parsed
+    according to `style`; bytes records shorter than `width` are
+    right-aligned. `count` is the number of records written so far.
+    """
+
+    def __init__(self, path, width = 16, style = "dd", append = False):
+        if width < 1:
+            raise ValueError("Record width must be at least 1.")
+        self.width = width
+        self.style = style
+        self.count = 0
+        self._f = open(path, 'ab' if append else 'wb')
+
+    def write(self, address):
+        """Writes one address, given as text or as a record of up to `width` bytes."""
+        if isinstance(address, str):
+            record = pack_address(address, self.width, self.style)
+        else:
+            record = _fit(bytes(address), self.width)
+        self._write(record, 1)
+
+    def write_many(self, addresses):
+        """Writes a list of text addresses, parsed together with pack_addresses()."""
+        self._write(pack_addresses(addresses, self.width, self.style), len(addresses))
+
+    def _write(self, data, count):
+        self._f.write(data)
+        self.count += count
+
+    def write_array(self, array):
+        """Writes the records of an AddressArray of the same width, without copying them."""
+        if array.width != self.width:
+            raise ValueError("Array width {:d} does not match {:d}.".format(array.width, self.width))
+        with array.view() as view:
+            self._write(view, len(array))
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pack_chunks(infile, width = 16, style = "dd", errfile = None,
+        chunk_size = address_converter._chunk_size):
+    """
+    Reads newline-delimited text addresses from `infile`, about `chunk_size`
+    bytes of text at a time, and yields (records, count, errors) for each
+    chunk, where `records` is the packed bytes of its `count` addresses.
+    Blank lines are skipped. The `errors` lines that cannot be packed are
+    reported to `errfile` (stderr by default) as in
+    address_converter.convert_stream(), and left out.
+    """
+    if errfile is None:
+        errfile = sys.stderr
+
+    lineno = 0
+    convert = lambda a: pack_address(a, width, style)
+    while True:
+        lines = infile.readlines(chunk_size)
+        if not lines:
+            break
+        addresses = [s for s in (line.strip() for line in lines) if s]
+        try:
+            yield pack_addresses(addresses, width, style), len(addresses), 0
+        except address_converter.TokenError:
+            out, bad = address_converter.convert_lines(lines, convert)
+            for i, token, e in bad:
+                errfile.write(address_converter._error_format.format(lineno + i + 1, token, e))
+            yield b''.join(out), len(out), len(bad)
+        lineno += len(lines)
+
+
+def pack(infile, path, width = 16, style = "dd", errfile = None,
+        chunk_size = address_converter._chunk_size):
+    """
+    Reads newline-delimited text addresses from `infile` and writes them as
+    records to `path` with pack_chunks(), a chunk at a time.
+
+    Returns a pair (packed, errors) of line counts.
+    """
+    errors = 0
+    with RecordWriter(path, width, style) as writer:
+        for data, count, bad in pack_chunks(infile, width, style, errfile, chunk_size):
+            writer._write(data, count)
+            errors += bad
+        return writer.count, errors
+
+
+def unpack(path, outfile, width = 16, style = "dd", compress = True,
+        chunk_records = _chunk_records):
+    """
+    Writes each record of the file at `path` to the text file `outfile`, one
+    address per line, formatting `chunk_records` records at a time from the
+    mapped file. Returns the number of records written.
+    """
+    with AddressArray.load(path, width, style) as a:
+        n = len(a)
+        with a.view() as view:
+            for start in range(0, n, chunk_records):
+                stop = min(n, start + chunk_records)
+                with view[start * width:stop * width] as chunk:
+                    out = format_records(chunk, width, style, compress)
+                out.append('')
+                outfile.write('\n'.join(out))
+    return n
+
+
+def _parse_args(argv = None):
+    import argparse
+    parser = argparse.ArgumentParser(description = "Convert addresses between text and packed binary records.")
+    sub = parser.add_subparsers(dest = 'command', metavar = 'command', prog = parser.prog)
+    sub.required = True
+    for name, help_text in (("pack", "write text addresses as binary records"),
+            ("unpack", "write binary records as text addresses"),
+            ("count", "count the records in a file")):
+        p = sub.add_parser(name, help = help_text)
+        p.add_argument("input", help = "input file ('-' for stdin when packing)")
+        if name == "pack":
+            p.add_argument("output", help = "record file to write")
+        elif name == "unpack":
+            p.add_argument("-o", "--output", help = "write to OUTPUT instead of stdout")
+            p.add_argument("--no-compress", dest = 'compress', action = 'store_false',
+                    help = "do not compress zero runs to '::'")
+        p.add_argument("-w", "--width", type = int, default = 16,
+                help = "bytes per record, 4 or 16 (default: %(default)s)")
+        p.add_argument("-s", "--style", choices = styles, default = "dd",
+                help = "text form of the addresses (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = _parse_args(argv)
+    try:
+        if args.command == "pack":
+            infile = sys.stdin if args.input == '-' else open(args.input)
+            try:
+                packed, errors = pack(infile, args.output, args.width, args.style)
+            finally:
+                if infile is not sys.stdin:
+                    infile.close()
+            print("{:d} records written, {:d} bad lines".format(packed, errors), file = sys.stderr)
+            return 1 if errors else 0
+        if args.command == "count":
+            with AddressArray.load(args.input, args.width, args.style) as a:
+                print(len(a))
+            return 0
+        outfile = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            unpack(args.input, outfile, args.width, args.style, args.compress)
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+    except (ValueError, OSError) as e:
+        print(e, file = sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Throughput of bulk token conversion compared with the original per-token
+path of address_converter, in tokens per second. The NumPy backend is
+included when NumPy is installed, after checking that it gives the same
+results as the pure-Python path. The reverse direction, dot-decimal back
+to colon-hex, is timed per address and in bulk on the same tokens.
+
+    python3 bench_converter.py [-n COUNT] [-r REPEAT]
+"""
+
+import argparse
+import io
+import random
+import time
+
+import address_converter as ac
+import address_numpy
+
+
+def make_tokens(count, seed = 0):
+    """Returns `count` random four-group interface tokens, e.g. "1a:2b:3c:4d"."""
+    rng = random.Random(seed)
+    return [":".join("{:x}".format(rng.getrandbits(16)) for _ in range(4))
+            for _ in range(count)]
+
+
+def per_token(tokens):
+    # The pipeline formerly run by address_converter's __main__ for one token
+    for token in tokens:
+        token_s = "".join(ac.split_and_fill(token))
+        ac.int_to_dd(ac.hex_to_int(ac.split_in_pairs(token_s)))
+
+
+def bulk(tokens):
+    infile = io.StringIO("\n".join(tokens) + "\n")
+    ac.convert_stream(infile, io.StringIO())
+
+
+def vectorized(tokens):
+    address_numpy.tokens_to_dd(tokens)
+
+
+def check_backends(tokens):
+    expected = [ac.convert_token(t) for t in tokens]
+    if address_numpy.tokens_to_dd(tokens) != expected:
+        raise AssertionError("NumPy backend disagrees with convert_token().")
+
+
+def reverse(addresses):
+    for a in addresses:
+        ac.dd_to_token(a)
+
+
+def reverse_bulk(addresses):
+    ac.dd_to_tokens(addresses)
+
+
+def best_of(func, tokens, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(tokens)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type = int, default = 200000)
+    parser.add_argument("-r", "--repeat", type = int, default = 3)
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.count)
+    runs = [("per-token", per_token), ("bulk", bulk)]
+    if address_numpy.np is not None:
+        check_backends(tokens)
+        runs.append(("numpy", vectorized))
+
+    for name, func in runs:
+        t = best_of(func, tokens, args.repeat)
+        print("{:<14s}{:>14,.0f} tokens/s".format(name, len(tokens) / t))
+
+    addresses = [ac.convert_token(t) for t in tokens]
+    if ac.dd_to_tokens(addresses) != tokens:
+        raise AssertionError("Reverse conversion does not round-trip.")
+    for name, func in (("reverse", reverse), ("reverse bulk", reverse_bulk)):
+        t = best_of(func, addresses, args.repeat)
+        print("{:<14s}{:>14,.0f} tokens/s".format(name, len(addresses) / t))
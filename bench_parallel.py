@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""
+Scaling of address_parallel.convert_file() with the number of workers,
+in tokens per second, for 1, 2, 4, ... up to the number of CPUs.
+
+    python3 bench_parallel.py [-n COUNT] [-c CHUNK_SIZE] [-j MAX_WORKERS]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import address_parallel
+from bench_converter import make_tokens
+
+
+def worker_counts(limit):
+    n = 1
+    while n < limit:
+        yield n
+        n *= 2
+    yield limit
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type = int, default = 1000000)
+    parser.add_argument("-c", "--chunk-size", type = int, default = 1 << 20)
+    parser.add_argument("-j", "--max-workers", type = int, default = os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "tokens.txt")
+        with open(path, 'w') as f:
+            f.write("\n".join(make_tokens(args.count)) + "\n")
+
+        base = None
+        for workers in worker_counts(args.max_workers):
+            with open(os.devnull, 'w') as out:
+                start = time.perf_counter()
+                address_parallel.convert_file(path, out, workers = workers,
+                        chunk_size = args.chunk_size)
+                t = time.perf_counter() - start
+            base = base or t
+            print("{:>4d} workers{:>14,.0f} tokens/s{:>8.2f}x".format(
+                    workers, args.count / t, base / t))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""
+Latency of conversion_server.py at a fixed request rate.
+
+Starts a server process on a temporary Unix socket, then sends requests
+from CLIENTS connections at RATE requests per second for SECONDS, spread
+evenly in time whether or not earlier requests have been answered. Each
+request's latency is measured from when it was due to be sent, so a
+stalled server shows up in the percentiles instead of slowing the load.
+The mix of operations cycles through tokens, addresses and floats.
+
+    python3 bench_server.py [-r RATE] [-s SECONDS] [-c CLIENTS] [-b MAX_BATCH]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import address_converter
+from bench_converter import make_tokens
+from conversion_server import Client, percentiles
+
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_requests(count, seed = 0):
+    """Returns `count` (op, args) pairs of a fixed mix of operations."""
+    rng = random.Random(seed)
+    tokens = make_tokens(count, seed)
+    out = []
+    for i, token in enumerate(tokens):
+        k = i % 4
+        if k == 0:
+            out.append(("convert_token", (token,)))
+        elif k == 1:
+            out.append(("dd_to_token", (address_converter.convert_token(token),)))
+        elif k == 2:
+            out.append(("exp_tuple", (rng.random() * 10.0 ** rng.randrange(-6, 7), 10)))
+        else:
+            out.append(("hex_manip", (1 + rng.random(), 16, True)))
+    return out
+
+
+async def _wait_for_socket(path, proc, timeout = 10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Server did not start.")
+        await asyncio.sleep(0.01)
+
+
+async def run_load(path, requests, rate, clients):
+    """
+    Sends `requests` at `rate` per second over `clients` connections and
+    returns (latencies in seconds, errors, elapsed seconds).
+    """
+    conns = [await Client.open_unix(path) for _ in range(clients)]
+    latencies = []
+    errors = 0
+
+    async def one(conn, op, args, due):
+        nonlocal errors
+        try:
+            await conn.call(op, *args)
+        except ValueError:
+            errors += 1
+        latencies.append(time.perf_counter() - due)
+
+    tasks = []
+    start = time.perf_counter()
+    for i, (op, args) in enumerate(requests):
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(conns[i % clients], op, args, due)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    for conn in conns:
+        await conn.close()
+    return latencies, errors, elapsed
+
+
+async def main(args):
+    requests = make_requests(int(args.rate * args.seconds))
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "server.sock")
+        proc = subprocess.Popen([sys.executable, os.path.join(_here, "conversion_server.py"),
+                "--unix", path, "--max-batch", str(args.max_batch)], stderr = subprocess.DEVNULL)
+        try:
+            await _wait_for_socket(path, proc)
+            latencies, errors, elapsed = await run_load(path, requests, args.rate, args.clients)
+            conn = await Client.open_unix(path)
+            stats = await conn.call("stats")
+            await conn.close()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    ps = percentiles(latencies, (50, 90, 99, 99.9))
+    print("{:,d} requests in {:.2f} s ({:,.0f}/s target {:,.0f}/s), {:d} errors".format(
+            len(latencies), elapsed, len(latencies) / elapsed, args.rate, errors))
+    print("client latency   " + "  ".join("p{:g} {:.3f} ms".format(p, v * 1000)
+            for p, v in ps.items()))
+    print("server latency   " + "  ".join("{} {:.3f} ms".format(p, v)
+            for p, v in stats["latency_ms"].items()))
+    print("batches {:,d}, mean batch {:.1f}".format(stats["batches"], stats["mean_batch"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("-r", "--rate", type = float, default = 2000)
+    parser.add_argument("-s", "--seconds", type = float, default = 5)
+    parser.add_argument("-c", "--clients", type = int, default = 8)
+    parser.add_argument("-b", "--max-batch", type = int, default = 512)
+    asyncio.run(main(parser.parse_args()))
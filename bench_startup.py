@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+Startup cost of the command line entry points, per process and per query.
+
+For each command, one run under `python3 -X importtime` gives the time
+spent importing modules, and the slowest imports by cumulative time. Then
+the wall time of COUNT separate processes is compared with the time per
+query of QUERIES queries answered by one `cli.py serve` process.
+
+    python3 bench_startup.py [-n COUNT] [-q QUERIES] [-k TOP]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+# Commands to time, as arguments to the interpreter, with the equivalent
+# query for serve mode
+_commands = [
+        (["cli.py", "token", "dead:beef"], "token dead:beef"),
+        (["cli.py", "token", "-r", "222.173.190.239"], "token -r 222.173.190.239"),
+        (["cli.py", "eng", "12345678"], "eng 12345678"),
+        (["cli.py", "count", "48", "-6"], "count 48 -6"),
+        (["address_converter.py", "dead:beef"], None)
+        ]
+
+
+def parse_importtime(text):
+    """
+    Takes the stderr of `python3 -X importtime` and returns a list of
+    (module, self_us, cumulative_us, depth), in the order imports finished.
+    """
+    out = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        out.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return out
+
+
+def import_profile(argv):
+    """Returns parse_importtime() of one run of the interpreter with `argv`."""
+    p = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd = _here,
+            stdin = subprocess.DEVNULL, stdout = subprocess.DEVNULL,
+            stderr = subprocess.PIPE, text = True)
+    return parse_importtime(p.stderr)
+
+
+def time_processes(argv, count):
+    """Returns the mean wall time in seconds of `count` runs of `argv`."""
+    start = time.perf_counter()
+    for _ in range(count):
+        subprocess.run([sys.executable] + argv, cwd = _here, stdin = subprocess.DEVNULL,
+                stdout = subprocess.DEVNULL, check = True)
+    return (time.perf_counter() - start) / count
+
+
+def time_serve(query, count):
+    """Returns the wall time in seconds per query of `count` queries to one server."""
+    data = (query + "\n") * count
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "cli.py", "serve"], cwd = _here, input = data,
+            stdout = subprocess.DEVNULL, text = True, check = True)
+    return (time.perf_counter() - start) / count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type = int, default = 20)
+    parser.add_argument("-q", "--queries", type = int, default = 2000)
+    parser.add_argument("-k", "--top", type = int, default = 5,
+            help = "slowest imports to list per command")
+    args = parser.parse_args()
+
+    for argv, q in _commands:
+        profile = import_profile(argv)
+        total = sum(p[1] for p in profile)
+        print("{}\n    {:d} modules imported in {:,.1f} ms".format(
+                " ".join(argv), len(profile), total / 1000))
+        top = sorted((p for p in profile if p[3] == 0), key = lambda p: -p[2])
+        for name, _, cumulative_us, _ in top[:args.top]:
+            print("    {:<28s}{:>10,.1f} ms".format(name, cumulative_us / 1000))
+
+        per_process = time_processes(argv, args.count)
+        line = "    {:d} processes{:>18,.1f} ms each".format(args.count, per_process * 1000)
+        if q:
+            per_query = time_serve(q, args.queries)
+            line += ", serve{:>10,.3f} ms per query ({:,.0f}x)".format(
+                    per_query * 1000, per_process / per_query)
+        print(line)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite for the public conversion functions.
+
+Each case times one function over a fixed, seeded set of inputs drawn from
+one distribution (e.g. normal, subnormal or huge floats, IPv4 or IPv6
+tokens) and reports the best time per call in nanoseconds. Results can be
+written as JSON and compared against a stored baseline:
+
+    python3 benchmark.py -o baseline.json
+    python3 benchmark.py -b baseline.json -t 0.10
+
+The number of inputs each case kept is recorded with its time. With -b
+the exit status is 1 if any case got slower than the baseline by more than
+the threshold fraction, now keeps a different number of inputs (a function
+that starts rejecting inputs would otherwise look faster), or is missing
+from the run.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import address_calculator
+import address_converter
+import exp_notation
+
+
+# Inputs per case and default repeats; the best repeat is reported
+_count = 2000
+_repeat = 5
+_threshold = 0.10
+
+
+def _floats(rng, lo, hi, count = _count):
+    """Floats with exponents uniform in [lo, hi) and random signs."""
+    return [rng.choice((-1, 1)) * rng.random() * 10.0 ** rng.randrange(lo, hi)
+            for _ in range(count)]
+
+
+def _subnormals(rng, count = _count):
+    return [rng.choice((-1, 1)) * rng.randrange(1, 1 << 52) * 5e-324 for _ in range(count)]
+
+
+def _tokens(rng, groups, count = _count):
+    return [":".join("{:x}".format(rng.getrandbits(16)) for _ in range(groups))
+            for _ in range(count)]
+
+
+def _works(func, args):
+    try:
+        func(*args)
+    except (ValueError, OverflowError, IndexError):
+        return False
+    return True
+
+
+def make_cases(seed = 0):
+    """
+    Returns a list of (name, func, inputs), where `func` is called as
+    func(*args) for each tuple `args` in `inputs`. Inputs that make `func`
+    raise are left out.
+    """
+    rng = random.Random(seed)
+    ac, calc, en = address_converter, address_calculator, exp_notation
+
+    floats = {
+            "normal": _floats(rng, -6, 7),
+            "subnormal": _subnormals(rng),
+            "huge": _floats(rng, 250, 308)
+            }
+    tokens = {"ipv4": _tokens(rng, 2), "ipv6": _tokens(rng, 8)}
+    filled = dict((k, ["".join(ac.split_and_fill(t)) for t in v]) for k, v in tokens.items())
+    pairs = dict((k, [list(ac.split_in_pairs(s)) for s in v]) for k, v in filled.items())
+    octets = dict((k, [list(ac.hex_to_int(p)) for p in v]) for k, v in pairs.items())
+    prefixes = {
+            "ipv4": [(rng.randrange(33), calc._v4_len) for _ in range(_count)],
+            "ipv6": [(rng.randrange(129), calc._v6_len) for _ in range(_count)]
+            }
+
+    cases = []
+    for k in tokens:
+        cases += [
+                ("split_and_fill[{}]".format(k), lambda t: list(ac.split_and_fill(t)),
+                    [(t,) for t in tokens[k]]),
+                ("split_in_pairs[{}]".format(k), lambda s: list(ac.split_in_pairs(s)),
+                    [(s,) for s in filled[k]]),
+                ("hex_to_int[{}]".format(k), lambda p: list(ac.hex_to_int(p)),
+                    [(p,) for p in pairs[k]]),
+                ("int_to_dd[{}]".format(k), ac.int_to_dd, [(o,) for o in octets[k]]),
+                ("num_addresses[{}]".format(k), calc.num_addresses, prefixes[k]),
+                ("eng_exponent[{}]".format(k), calc.eng_exponent,
+                    [(calc.num_addresses(*p),) for p in prefixes[k]])
+                ]
+
+    for k, xs in floats.items():
+        cases += [
+                ("exp_tuple[{}]".format(k), en.exp_tuple, [(x, 10) for x in xs]),
+                ("exp_tuple_normalized[{}]".format(k), en.exp_tuple, [(x, 10, True) for x in xs]),
+                ("normalize[{}]".format(k), en.normalize, [(x,) for x in xs]),
+                ("split_float[{}]".format(k), en.split_float, [(x,) for x in xs]),
+                ("eng_format[{}]".format(k), en.eng_format, [(x,) for x in xs]),
+                ("eng_format_binary[{}]".format(k), en.eng_format, [(x, 3, True) for x in xs])
+                ]
+        for base in (2, 8, 16):
+            cases.append(("hex_manip_{:d}[{}]".format(base, k), en.hex_manip,
+                    [(x, base, True) for x in xs]))
+
+    # Inputs a function rejects, e.g. subnormals in exp_tuple, are dropped
+    return [(name, func, [a for a in inputs if _works(func, a)])
+            for name, func, inputs in cases]
+
+
+def time_case(func, inputs, repeat = _repeat):
+    """Returns the best time per call over `repeat` passes, in nanoseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in inputs:
+            func(*args)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / max(len(inputs), 1)
+
+
+def run(pattern = None, repeat = _repeat, seed = 0):
+    """
+    Runs every case whose name contains `pattern` and returns a result dict,
+    with the time of each case under "results" and its number of inputs
+    under "counts".
+    """
+    results = {}
+    counts = {}
+    for name, func, inputs in make_cases(seed):
+        if pattern and pattern not in name:
+            continue
+        results[name] = round(time_case(func, inputs, repeat), 1)
+        counts[name] = len(inputs)
+    return {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "unit": "ns/call",
+            "filter": pattern,
+            "results": results,
+            "counts": counts
+            }
+
+
+def compare(current, baseline, threshold = _threshold):
+    """
+    Returns a list of (name, baseline, current, change) for the cases that
+    got slower than `baseline` by more than `threshold`, a fraction.
+    """
+    slower = []
+    for name, t in current["results"].items():
+        base = baseline["results"].get(name)
+        if base:
+            change = t / base - 1
+            if change > threshold:
+                slower.append((name, base, t, change))
+    return slower
+
+
+def mismatches(current, baseline):
+    """
+    Returns a list of (name, problem) for the cases of `baseline` that
+    `current` does not time on the same inputs: cases that kept a different
+    number of inputs, and cases missing from `current` although its filter
+    selects them. Baselines without counts are only checked for missing
+    cases.
+    """
+    pattern = current.get("filter")
+    counts = current.get("counts", {})
+    problems = []
+    for name in baseline["results"]:
+        if name not in current["results"]:
+            if not pattern or pattern in name:
+                problems.append((name, "missing from this run"))
+            continue
+        base = baseline.get("counts", {}).get(name)
+        if base is not None and counts.get(name) != base:
+            problems.append((name, "{:d} inputs, baseline had {:d}".format(counts.get(name, 0), base)))
+    return problems
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the conversion functions.")
+    parser.add_argument("-k", "--filter", help = "only run cases whose name contains FILTER")
+    parser.add_argument("-r", "--repeat", type = int, default = _repeat)
+    parser.add_argument("-o", "--output", help = "write results as JSON to OUTPUT")
+    parser.add_argument("-b", "--baseline", help = "compare against a JSON file from -o")
+    parser.add_argument("-t", "--threshold", type = float, default = _threshold,
+            help = "slowdown fraction counted as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    current = run(args.filter, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for name, t in current["results"].items():
+        line = "{:<36s}{:>12,.1f} ns".format(name, t)
+        if baseline and baseline["results"].get(name):
+            line += "{:>+10.1%}".format(t / baseline["results"][name] - 1)
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent = 2, sort_keys = True)
+            f.write('\n')
+
+    if baseline:
+        slower = compare(current, baseline, args.threshold)
+        for name, base, t, change in slower:
+            print("REGRESSION {}: {:,.1f} -> {:,.1f} ns ({:+.1%})".format(name, base, t, change),
+                    file = sys.stderr)
+        problems = mismatches(current, baseline)
+        for name, problem in problems:
+            print("MISMATCH {}: {}".format(name, problem), file = sys.stderr)
+        return 1 if slower or problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
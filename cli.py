@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+"""
+One command line for the converters, with a subcommand per query:
+
+    python3 cli.py token dead:beef           222.173.190.239
+    python3 cli.py token -r 222.173.190.239  dead:beef
+    python3 cli.py prefix 10.0.0.0/30        network, netmask, broadcast, hosts, count
+    python3 cli.py count 48 -6               addresses in a /48, and the power of 1000
+    python3 cli.py normalize 0.00123         1.23 -3 10
+    python3 cli.py eng 12345678              12.3 M
+    python3 cli.py hex 0.1 -d 8              hex_manip() tuple
+    python3 cli.py unhex 0x1.8p+1            3.0
+    python3 cli.py sort tokens.txt -o sorted.txt
+    python3 cli.py diff old.txt new.txt -a added.txt -R removed.txt
+
+Each subcommand imports only the modules it needs, when it runs, so a
+one-off query does not pay for loading every converter (or NumPy).
+
+To answer many queries without starting Python for each, `serve` reads
+one query per line from stdin, in the same form as the arguments above
+without the script name, e.g. "token -r 10.0.0.1". It writes exactly one
+line per query, flushed at once, with "error: ..." in place of an answer
+that failed. Since stdin holds the queries, sort and diff must be given
+files rather than '-':
+
+    printf 'token dead:beef\\neng 1500 -u Hz\\n' | python3 cli.py serve
+"""
+
+import argparse
+import os
+import sys
+
+
+# Text forms of addresses, as address_records.styles, listed here so that
+# building the parser imports nothing
+_address_styles = ("dd", "hex", "base4", "base32", "base32hex", "base64", "base64url")
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed."""
+
+
+class _HelpFormatter(argparse.HelpFormatter):
+    """
+    A help formatter that looks up the terminal width only when help is
+    written. argparse builds a formatter for every argument added, and
+    the default one imports shutil to size itself, which costs more than
+    the rest of a query.
+    """
+
+    def __init__(self, prog):
+        super().__init__(prog, width = 80)
+
+    def format_help(self):
+        import shutil
+        self._width = shutil.get_terminal_size().columns - 2
+        self._max_help_position = min(24, max(self._width - 20, 4))
+        return super().format_help()
+
+
+class _Parser(argparse.ArgumentParser):
+    """An argument parser, and subparsers, using _HelpFormatter."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('formatter_class', _HelpFormatter)
+        super().__init__(*args, **kwargs)
+
+
+class _QueryParser(_Parser):
+    """
+    An argument parser that raises QueryError instead of exiting or
+    writing to stdout, so that -h in a query is answered by its usage on
+    one line.
+    """
+
+    def error(self, message):
+        raise QueryError(message)
+
+    def exit(self, status = 0, message = None):
+        raise QueryError((message or "").strip() or "Query exited.")
+
+    def print_usage(self, file = None):
+        raise QueryError(' '.join(self.format_usage().split()))
+
+    def print_help(self, file = None):
+        self.print_usage(file)
+
+
+def _token(args):
+    if args.numpy:
+        import address_numpy
+        if args.reverse:
+            raise QueryError("--numpy only converts hex tokens to dot-decimal.")
+        return address_numpy.tokens_to_dd(args.values)
+
+    import address_converter
+    if args.reverse:
+        return [address_converter.dd_to_token(a, args.compress) for a in args.values]
+    return [address_converter.convert_token(t) for t in args.values]
+
+
+def _prefix(args):
+    import address_calculator
+    out = []
+    for cidr in args.values:
+        info = address_calculator.prefix_info(cidr, args.strict)
+        out.append("{}/{:d} {} {} {}-{} {:d}".format(info["network"], info["prefix_length"],
+                info["netmask"], info["broadcast"] or '-', info["first"], info["last"],
+                info["num_addresses"]))
+    return out
+
+
+def _count(args):
+    import address_calculator
+    address_length = address_calculator._address_lengths[args.version]
+    out = []
+    for t, e in address_calculator.address_counts(args.values, address_length, args.binary):
+        out.append("{:,d} ({:g}) {:d}^{:d}".format(t, t, 1024 if args.binary else 1000, e))
+    return out
+
+
+def _normalize(args):
+    import exp_notation
+    return ["{!r} {!r} {!r}".format(*exp_notation.normalize(x, args.base)) for x in args.values]
+
+
+def _eng(args):
+    import exp_notation
+    return exp_notation.eng_format_many(args.values, args.precision, args.binary, args.unit)
+
+
+def _hex(args):
+    import exp_notation
+    return [str(exp_notation.hex_manip(f, args.display_base, args.normalize, args.alphabet))
+            for f in args.values]
+
+
+def _unhex(args):
+    import exp_notation
+    if args.display_base:
+        return [repr(exp_notation.parse_radix_float(s, args.display_base, args.alphabet))
+                for s in args.values]
+    return [repr(f) for f in exp_notation.from_hex_many(args.values)]
+
+
+def _open_input(path):
+    return sys.stdin if path == '-' else open(path)
+
+
+def _sort(args):
+    import inventory
+    import tempfile
+    infile = _open_input(args.input)
+    try:
+        with tempfile.TemporaryDirectory(dir = args.tmpdir) as d:
+            path = os.path.join(d, "sorted")
+            count, errors = inventory.sort_file(infile, path, args.width, args.style,
+                    args.memory << 20, d)
+            if args.output:
+                import address_records
+                with open(args.output, 'w') as outfile:
+                    address_records.unpack(path, outfile, args.width, args.out_style or args.style)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+    return ["{:d} distinct, {:d} bad lines".format(count, errors)]
+
+
+def _diff(args):
+    import inventory
+    files = []
+    try:
+        for path in (args.old, args.new):
+            files.append(_open_input(path))
+        old, new = files
+        outputs = []
+        for path in (args.added, args.removed, args.unchanged):
+            outputs.append(open(path, 'w') if path else None)
+            files.append(outputs[-1])
+        counts = inventory.diff_files(old, new, *outputs, width = args.width, style = args.style,
+                out_style = args.out_style, memory = args.memory << 20, tmpdir = args.tmpdir)
+    finally:
+        for f in files:
+            if f is not None and f is not sys.stdin:
+                f.close()
+    return ["added {added:d}, removed {removed:d}, unchanged {unchanged:d}, "
+            "{errors:d} bad lines".format(**counts)]
+
+
+def _add_inventory_options(p):
+    p.add_argument("-w", "--width", type = int, default = 16,
+            help = "bytes per address, 4 or 16 (default: %(default)s)")
+    p.add_argument("-s", "--style", choices = _address_styles, default = "hex",
+            help = "text form of the input addresses (default: %(default)s)")
+    p.add_argument("-f", "--format", dest = 'out_style', choices = _address_styles,
+            help = "text form of the output addresses (default: as the input)")
+    p.add_argument("-m", "--memory", type = int, default = 64,
+            help = "MiB of addresses held in memory while sorting (default: %(default)s)")
+    p.add_argument("-T", "--tmpdir", help = "directory for spill files")
+
+
+def _serve(args):
+    return serve(sys.stdin, sys.stdout)
+
+
+def _build_parser(parser_class = _Parser):
+    parser = parser_class(description = __doc__.strip().splitlines()[0])
+    # Without `prog`, add_subparsers() formats the usage line to make one
+    sub = parser.add_subparsers(dest = 'command', metavar = 'command', prog = parser.prog)
+    sub.required = True
+
+    p = sub.add_parser("token", help = "convert colon-hex tokens to dot-decimal, or back")
+    p.add_argument("values", nargs = '+', metavar = "address")
+    p.add_argument("-r", "--reverse", action = 'store_true',
+            help = "convert dot-decimal addresses to colon-hex")
+    p.add_argument("--no-compress", dest = 'compress', action = 'store_false',
+            help = "with -r, do not compress zero runs to '::'")
+    p.add_argument("--numpy", action = 'store_true', help = "use the NumPy backend")
+    p.set_defaults(func = _token)
+
+    p = sub.add_parser("prefix", help = "describe CIDR prefixes")
+    p.add_argument("values", nargs = '+', metavar = "cidr")
+    p.add_argument("--no-strict", dest = 'strict', action = 'store_false',
+            help = "clear host bits instead of rejecting the prefix")
+    p.set_defaults(func = _prefix)
+
+    p = sub.add_parser("count", help = "count the addresses in prefixes of given lengths")
+    p.add_argument("values", nargs = '+', type = int, metavar = "prefix_length")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("-4", dest = 'version', action = 'store_const', const = 4, default = 4)
+    group.add_argument("-6", dest = 'version', action = 'store_const', const = 6)
+    p.add_argument("-b", "--binary", action = 'store_true', help = "use powers of 1024")
+    p.set_defaults(func = _count)
+
+    p = sub.add_parser("normalize", help = "normalize numbers to one digit before the point")
+    p.add_argument("values", nargs = '+', type = float, metavar = "x")
+    p.add_argument("-b", "--base", type = int, default = 10)
+    p.set_defaults(func = _normalize)
+
+    p = sub.add_parser("eng", help = "format numbers in engineering notation")
+    p.add_argument("values", nargs = '+', type = float, metavar = "x")
+    p.add_argument("-p", "--precision", type = int, default = 3,
+            help = "significant digits (default: %(default)s)")
+    p.add_argument("-b", "--binary", action = 'store_true', help = "use IEC prefixes")
+    p.add_argument("-u", "--unit", default = '')
+    p.set_defaults(func = _eng)
+
+    p = sub.add_parser("hex", help = "write floats in a power-of-two base with hex_manip()")
+    p.add_argument("values", nargs = '+', type = float, metavar = "f")
+    p.add_argument("-d", "--display-base", type = int, default = 16,
+            help = "2, 4, 8, 16, 32 or 64 (default: %(default)s)")
+    p.add_argument("-a", "--alphabet", help = "digits to use, e.g. base32 or base32hex")
+    p.add_argument("--no-normalize", dest = 'normalize', action = 'store_false')
+    p.set_defaults(func = _hex)
+
+    p = sub.add_parser("unhex", help = "parse float.hex() strings back to floats")
+    p.add_argument("values", nargs = '+', metavar = "s")
+    p.add_argument("-d", "--display-base", type = int,
+            help = "parse radix_float() strings of this base instead")
+    p.add_argument("-a", "--alphabet", help = "with -d, the digits used")
+    p.set_defaults(func = _unhex)
+
+    p = sub.add_parser("sort", help = "sort an inventory of addresses and drop duplicates")
+    p.add_argument("input", help = "text file of addresses ('-' for stdin)")
+    p.add_argument("-o", "--output", help = "write the sorted addresses to OUTPUT")
+    _add_inventory_options(p)
+    p.set_defaults(func = _sort)
+
+    p = sub.add_parser("diff", help = "compare two inventories of addresses")
+    p.add_argument("old", help = "text file of addresses ('-' for stdin)")
+    p.add_argument("new", help = "text file of addresses ('-' for stdin)")
+    p.add_argument("-a", "--added", help = "write the added addresses to ADDED")
+    p.add_argument("-R", "--removed", help = "write the removed addresses to REMOVED")
+    p.add_argument("-u", "--unchanged", help = "write the unchanged addresses to UNCHANGED")
+    _add_inventory_options(p)
+    p.set_defaults(func = _diff)
+
+    p = sub.add_parser("serve", help = "answer queries read one per line from stdin")
+    p.set_defaults(func = _serve)
+    return parser
+
+
+# Parser for queries, built on first use and reused for every query
+_query_parser = None
+
+
+def query(line):
+    """
+    Answers one query in the form of the command line arguments, e.g.
+    "eng 1500 -u Hz", and returns its lines of output.
+
+    Raises QueryError for a query that cannot be parsed, asks for help or
+    would read stdin, which holds the queries, and ValueError (including
+    TokenError, PrefixError and RadixError) for one that cannot be answered.
+    """
+    global _query_parser
+    if _query_parser is None:
+        _query_parser = _build_parser(_QueryParser)
+    args = _query_parser.parse_args(line.split())
+    if args.func is _serve:
+        raise QueryError("Cannot serve from within serve mode.")
+    if '-' in (getattr(args, name, None) for name in ('input', 'old', 'new')):
+        raise QueryError("Cannot read addresses from stdin in serve mode.")
+    return args.func(args)
+
+
+def serve(infile, outfile):
+    """
+    Answers the queries in `infile`, one per line, writing one line per
+    query to `outfile`. Blank lines are skipped. Returns 1 if any query
+    failed, otherwise 0.
+    """
+    status = 0
+    for line in infile:
+        if not line.strip():
+            continue
+        try:
+            out = ' '.join(query(line))
+        except Exception as e:
+            # Whatever goes wrong, the query still gets its one line
+            out = "error: {}".format(e)
+            status = 1
+        outfile.write(out + '\n')
+        outfile.flush()
+    return status
+
+
+def main(argv = None):
+    if os.environ.get("CONVERTER_INSTRUMENT"):
+        import instrumentation
+        instrumentation.install_from_env()
+    args = _build_parser().parse_args(argv)
+    if args.func is _serve:
+        return _serve(args)
+    try:
+        out = args.func(args)
+    except (ValueError, OverflowError, ImportError, OSError) as e:
+        print(e, file = sys.stderr)
+        return 1
+    for line in out:
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
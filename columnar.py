@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+"""
+Conversion results as columns of flat buffers, for export to Arrow,
+Parquet or NumPy without a Python object per row.
+
+Each builder returns a Column whose buffers follow the Arrow layouts:
+
+    binary      `data` holds `length` records of `width` bytes each
+    float64     `data` holds `length` native doubles
+    int32       `data` holds `length` native 32-bit integers
+    string      `offsets` holds `length` + 1 offsets into the UTF-8 `data`,
+                as int32, or int64 (large_string) beyond 2 GiB
+
+A column may also have a validity bitmap, one bit per row in Arrow's
+least-significant-bit-first order, with 0 for a null row.
+
+The buffers are bytes, bytearrays or stdlib arrays, so nothing beyond the
+standard library is needed to build them. Column.to_numpy() and
+Column.to_arrow() wrap them without copying, and need NumPy or pyarrow
+respectively:
+
+    cols = {"address": columnar.address_column(tokens, 16, "hex")}
+    cols.update(columnar.exp_columns(values, 10))
+    table = columnar.to_arrow_table(cols)
+    columnar.write_parquet(cols, "out.parquet")
+"""
+
+import itertools
+import math
+from array import array
+
+import address_numpy
+import address_records
+import exp_notation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+# Largest data buffer a string column with int32 offsets can address
+_max_int32 = (1 << 31) - 1
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow export.")
+
+
+def _bitmap(valid):
+    """Packs a sequence of booleans into an Arrow validity bitmap."""
+    if np is not None:
+        return np.packbits(np.asarray(valid, dtype = bool), bitorder = 'little').tobytes()
+    valid = bytes(map(bool, valid))
+    out = bytearray((len(valid) + 7) // 8)
+    for i in itertools.compress(range(len(valid)), valid):
+        out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+class Column:
+    """
+    One column of `length` rows of `kind` ("binary", "float64", "int32" or
+    "string") held in flat buffers, as described in the module docstring.
+    """
+
+    def __init__(self, kind, length, data, width = None, offsets = None, validity = None):
+        self.kind = kind
+        self.length = length
+        self.data = data
+        self.width = width
+        self.offsets = offsets
+        self.validity = validity
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def null_count(self):
+        if self.validity is None:
+            return 0
+        ones = int.from_bytes(self.validity, 'little').bit_count()
+        return self.length - ones
+
+    def valid(self):
+        """Returns a list of booleans, True for each row that is not null."""
+        if self.validity is None:
+            return [True] * self.length
+        bits = int.from_bytes(self.validity, 'little')
+        return [bool(bits >> i & 1) for i in range(self.length)]
+
+    def to_numpy(self):
+        """
+        Returns the column as NumPy arrays over the same buffers: an (n,
+        width) uint8 array for binary, or a float64 or int32 array, as a
+        masked array if the column has nulls. A string column comes back as
+        a triple (offsets, data, mask): row i is data[offsets[i]:offsets[i +
+        1]], and is null where the boolean array `mask` is True. The offsets
+        are not masked, since each one also ends the row before.
+        """
+        address_numpy._require_numpy("NumPy export")
+        if self.kind == "binary":
+            values = np.frombuffer(self.data, dtype = np.uint8).reshape(self.length, self.width)
+        elif self.kind == "float64":
+            values = np.frombuffer(self.data, dtype = np.float64)
+        elif self.kind == "int32":
+            values = np.frombuffer(self.data, dtype = np.int32)
+        else:
+            offsets = np.frombuffer(self.offsets, dtype = np.dtype(self.offsets.typecode))
+            data = np.frombuffer(self.data, dtype = np.uint8)
+            if self.validity is None:
+                mask = np.zeros(self.length, dtype = bool)
+            else:
+                mask = self._mask()
+            return offsets, data, mask
+        if self.validity is not None:
+            values = np.ma.masked_array(values, self._mask() if values.ndim == 1 else
+                    np.repeat(self._mask(), self.width).reshape(values.shape))
+        return values
+
+    def _mask(self):
+        bits = np.unpackbits(np.frombuffer(self.validity, dtype = np.uint8),
+                count = self.length, bitorder = 'little')
+        return bits == 0
+
+    def to_arrow(self):
+        """Returns the column as a pyarrow Array over the same buffers."""
+        _require_pyarrow()
+        validity = None if self.validity is None else pa.py_buffer(self.validity)
+        if self.kind == "string":
+            kind = pa.large_string() if self.offsets.itemsize == 8 else pa.string()
+            buffers = [validity, pa.py_buffer(self.offsets), pa.py_buffer(self.data)]
+        else:
+            if self.kind == "binary":
+                kind = pa.binary(self.width)
+            else:
+                kind = pa.float64() if self.kind == "float64" else pa.int32()
+            buffers = [validity, pa.py_buffer(self.data)]
+        return pa.Array.from_buffers(kind, self.length, buffers, self.null_count)
+
+    def __repr__(self):
+        return "Column({:d} rows, kind={!r}{})".format(self.length, self.kind,
+                ", width={:d}".format(self.width) if self.kind == "binary" else '')
+
+
+def records_column(buf, width = 16):
+    """
+    Returns a binary column over a buffer of packed `width`-byte records,
+    e.g. AddressArray.view() or a mapped record file, without copying it.
+    """
+    if len(buf) % width:
+        raise ValueError("Buffer length is not a multiple of {:d}.".format(width))
+    return Column("binary", len(buf) // width, buf, width)
+
+
+def address_column(addresses, width = 16, style = "hex"):
+    """
+    Parses a list of text addresses in `style` (see address_records.styles)
+    into a binary column of `width`-byte records, right-aligned, with
+    address_records.pack_addresses(). Raises TokenError for a bad address.
+    """
+    return records_column(address_records.pack_addresses(addresses, width, style), width)
+
+
+def int_address_column(values, width = 16):
+    """
+    Returns a binary column of integer addresses, such as int_to_dd() takes,
+    as `width`-byte big-endian records.
+    """
+    return records_column(b''.join([n.to_bytes(width, 'big') for n in values]), width)
+
+
+def string_column(strings, valid = None):
+    """
+    Returns a string column of a list of str. Rows whose entry in `valid`
+    is false are null, and take no bytes.
+    """
+    if valid is not None:
+        valid = list(map(bool, valid))
+        strings = [s if v else '' for s, v in zip(strings, valid)]
+    text = ''.join(strings)
+    data = text.encode()
+    if len(data) == len(text):
+        # ASCII, so each string's length in characters is its length in bytes
+        lengths = map(len, strings)
+    else:
+        lengths = (len(s.encode()) for s in strings)
+    offsets = array('i' if len(data) <= _max_int32 else 'q', [0])
+    offsets.extend(itertools.accumulate(lengths))
+    return Column("string", len(strings), data, offsets = offsets,
+            validity = None if valid is None or all(valid) else _bitmap(valid))
+
+
+def address_string_column(buf, width = 16, style = "hex"):
+    """
+    Formats packed `width`-byte records, e.g. from address_column(), as a
+    string column in `style` with address_records.format_records().
+    """
+    return string_column(address_records.format_records(buf, width, style))
+
+
+def float64_column(values):
+    """Returns a float64 column of an iterable of numbers, or of a NumPy array."""
+    if np is not None and isinstance(values, np.ndarray):
+        return Column("float64", len(values), np.ascontiguousarray(values, dtype = np.float64))
+    data = array('d', values)
+    return Column("float64", len(data), data)
+
+
+def int32_column(values, valid = None):
+    """
+    Returns an int32 column of an iterable of integers, or of a NumPy array.
+    Rows whose entry in `valid` is false are null, with 0 stored.
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        data = np.ascontiguousarray(values, dtype = np.int32)
+    else:
+        data = array('i', values)
+    validity = None
+    if valid is not None:
+        if np is not None and isinstance(valid, np.ndarray):
+            complete = bool(valid.all())
+        else:
+            complete = all(valid)
+        if not complete:
+            validity = _bitmap(valid)
+    return Column("int32", len(data), data, validity = validity)
+
+
+def exp_columns(values, base = 10, normalize = False):
+    """
+    Returns {"mantissa": float64 column, "exponent": int32 column} of
+    exp_tuple(x, base, normalize) for each number in `values`. The exponent
+    is null where x is infinite or NaN, whose mantissa is x itself. With
+    NumPy installed, the whole list goes through exp_numpy at once, which
+    gives the same results for an integer base.
+    """
+    if np is not None:
+        import exp_numpy
+        m, n = exp_numpy.exp_tuple(np.asarray(values, dtype = np.float64), base, normalize)
+        finite = np.isfinite(n)
+        return {"mantissa": float64_column(m),
+                "exponent": int32_column(np.where(finite, n, 0), finite)}
+
+    ms = array('d')
+    ns = array('i')
+    valid = []
+    for x in values:
+        m, n, _ = exp_notation.exp_tuple(x, base, normalize)
+        ms.append(m)
+        ok = math.isfinite(n)
+        ns.append(n if ok else 0)
+        valid.append(ok)
+    return {"mantissa": float64_column(ms), "exponent": int32_column(ns, valid)}
+
+
+def hex_manip_columns(values, display_base = 16, normalize = True, alphabet = None):
+    """
+    Returns the parts of hex_manip(f, display_base, normalize, alphabet) for
+    each float in `values` as columns: "mantissa", a string column of
+    digits, and "numerator" and "denominator", int32 columns of the
+    exponent n/d on `display_base`. The exponent is kept as integers rather
+    than written out and parsed again. Rows for ±inf and NaN, which
+    hex_manip() cannot convert, are null in every column.
+    """
+    if display_base not in exp_notation.valid_radices:
+        raise exp_notation.RadixError
+    if alphabet is not None or display_base not in exp_notation.radix_formats:
+        exp_notation._signed_alphabet(display_base, alphabet)
+
+    mantissas = []
+    ns = array('i')
+    ds = array('i')
+    valid = []
+    for f in values:
+        if not math.isfinite(f):
+            mantissas.append('')
+            ns.append(0)
+            ds.append(0)
+            valid.append(False)
+            continue
+        parts = exp_notation._hex_parts(f, display_base, normalize)
+        mantissas.append(exp_notation._hex_mantissa(f, parts, display_base, alphabet))
+        ns.append(parts[5])
+        ds.append(parts[6])
+        valid.append(True)
+
+    validity = None if all(valid) else _bitmap(valid)
+    return {"mantissa": string_column(mantissas, None if validity is None else valid),
+            "numerator": Column("int32", len(ns), ns, validity = validity),
+            "denominator": Column("int32", len(ds), ds, validity = validity)}
+
+
+def _check_lengths(columns):
+    lengths = set(len(c) for c in columns.values())
+    if len(lengths) > 1:
+        raise ValueError("Columns differ in length: {}.".format(
+                ", ".join("{} {:d}".format(k, len(c)) for k, c in columns.items())))
+
+
+def to_numpy(columns):
+    """Returns a dict of Column.to_numpy() of each column in the dict `columns`."""
+    _check_lengths(columns)
+    return dict((name, c.to_numpy()) for name, c in columns.items())
+
+
+def to_arrow_table(columns):
+    """Returns the dict of columns `columns` as a pyarrow Table."""
+    _require_pyarrow()
+    _check_lengths(columns)
+    return pa.table(dict((name, c.to_arrow()) for name, c in columns.items()))
+
+
+def write_parquet(columns, path, **kwargs):
+    """Writes the dict of columns `columns` to a Parquet file with pyarrow."""
+    _require_pyarrow()
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(to_arrow_table(columns), path, **kwargs)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Bounded LRU caches in front of the conversion functions.
+
+memoize() wraps a function with an LRUCache keyed on its arguments. The
+cache counts hits, misses and evictions so it can be sized from a real
+workload, and takes a lock around every lookup so one wrapped function can
+be shared between threads. Results are computed outside the lock; two
+threads missing on the same key at once may both compute it.
+
+Ready-made cached versions of the common conversions are provided:
+
+    convert_token(token)                     address_converter.convert_token
+    dd_to_token(address, compress)           address_converter.dd_to_token
+    hex_manip(f, display_base, normalize)    exp_notation.hex_manip
+    exp_tuple(x, base, normalize)            exp_notation.exp_tuple
+
+Exceptions are not cached.
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+import address_converter
+import exp_notation
+
+
+# Default number of entries kept by each ready-made cache
+_maxsize = 4096
+
+
+class LRUCache:
+    """
+    A mapping of at most `maxsize` entries that evicts the least recently
+    used entry when full.
+    """
+
+    def __init__(self, maxsize = _maxsize):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default = None):
+        """Returns the value for `key` and marks it as recently used."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores `value` under `key`, evicting the oldest entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last = False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns a dict of hits, misses, evictions, size, maxsize and
+        hit_rate (hits over lookups, 0.0 before the first lookup).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "size": len(self._data),
+                    "maxsize": self.maxsize,
+                    "hit_rate": self.hits / lookups if lookups else 0.0
+                    }
+
+
+# Marks a miss, since None is a valid cached result
+_missing = object()
+
+
+def _typed(v):
+    # Floats are keyed on their exact bits so that 0.0 and -0.0 are kept
+    # apart and every NaN shares one key. Everything else is keyed with its
+    # type, so that 1, 1.0 and True are kept apart.
+    if type(v) is float:
+        return float, v.hex()
+    return type(v), v
+
+
+def make_key(args, kwargs):
+    """Returns a hashable cache key for a call with `args` and `kwargs`."""
+    key = tuple(_typed(a) for a in args)
+    if kwargs:
+        key += tuple((k, _typed(v)) for k, v in sorted(kwargs.items()))
+    return key
+
+
+def _binder(func):
+    """
+    Returns a function taking the `args` and `kwargs` of a call to `func`
+    and returning them bound to its signature with the defaults filled in,
+    as a pair (args, kwargs), so that f(x), f(x, 16) and f(x, base = 16)
+    share one key. Returns None if `func` has no signature to bind to.
+    """
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError):
+        return None
+    params = tuple(sig.parameters.values())
+    defaults = tuple(p.default for p in params)
+    required = sum(1 for d in defaults if d is inspect.Parameter.empty)
+    index = dict((p.name, i) for i, p in enumerate(params))
+    # Signatures of plain parameters with trailing defaults, as all the
+    # conversions have, are filled in directly, which is several times
+    # faster than binding
+    simple = (all(p.kind == p.POSITIONAL_OR_KEYWORD for p in params) and
+            inspect.Parameter.empty not in defaults[required:])
+
+    def bind(args, kwargs):
+        n = len(args)
+        if simple and required <= n <= len(params):
+            if not kwargs:
+                return args + defaults[n:], kwargs
+            values = list(args + defaults[n:])
+            for k, v in kwargs.items():
+                i = index.get(k, -1)
+                if i < n:
+                    break
+                values[i] = v
+            else:
+                return tuple(values), {}
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.args, bound.kwargs
+
+    return bind
+
+
+def memoize(maxsize = _maxsize):
+    """
+    Decorator caching the results of a function of hashable arguments in
+    an LRUCache of `maxsize` entries, available as the `cache` attribute.
+    Calls are keyed on their arguments bound to the function's signature,
+    defaults included, however they were passed.
+    """
+    def decorator(func):
+        cache = LRUCache(maxsize)
+        bind = _binder(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if bind is not None:
+                try:
+                    args, kwargs = bind(args, kwargs)
+                except TypeError:
+                    # Let the function report the bad call itself
+                    return func(*args, **kwargs)
+            key = make_key(args, kwargs)
+            result = cache.get(key, _missing)
+            if result is _missing:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+convert_token = memoize()(address_converter.convert_token)
+dd_to_token = memoize()(address_converter.dd_to_token)
+hex_manip = memoize()(exp_notation.hex_manip)
+exp_tuple = memoize()(exp_notation.exp_tuple)
+
+
+def stats():
+    """Returns the stats() of each ready-made cache, keyed by function name."""
+    return dict((f.__name__, f.cache.stats())
+            for f in (convert_token, dd_to_token, hex_manip, exp_tuple))
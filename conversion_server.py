@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+
+"""
+Conversions as a local service, over a Unix domain socket or TCP.
+
+The protocol is line-delimited JSON. Each request is one line,
+
+    {"id": 1, "op": "convert_token", "args": ["dead:beef"]}
+
+and is answered by one line with the same id and either a result or an
+error message:
+
+    {"id": 1, "result": "222.173.190.239"}
+    {"id": 2, "error": "TokenError: Bad hex token 'zz'."}
+
+Responses are strict JSON, so a result of ±inf or NaN, which JSON cannot
+hold, is written as the string "inf", "-inf" or "nan"; float() reads
+those back.
+
+Responses on a connection come back in the order of its requests, so a
+client may send many requests before reading. The operations are listed
+in `ops`; the "stats" operation takes no arguments and returns request
+and batch counts and latency percentiles.
+
+Requests from all connections are queued and run in micro-batches: each
+batch takes everything that arrived while the last one ran, up to
+`max_batch`, and runs the requests of each operation together through
+its bulk path where there is one, e.g. the NumPy token converter. The
+batches run one at a time on a worker thread, so the event loop keeps
+reading requests and writing answers while a batch runs. Both the shared
+queue and each connection's queue of unanswered requests are
+bounded, so a client sending faster than it is served stops being read
+from until the server catches up.
+
+    python3 conversion_server.py --unix /tmp/conversions.sock
+    python3 conversion_server.py --tcp 127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+
+import address_calculator
+import address_converter
+import address_numpy
+import exp_notation
+
+
+# Latencies kept for the percentiles, most recent first out
+_latency_window = 10000
+# Percentiles reported by stats()
+_percentiles = (50, 90, 99, 99.9)
+
+
+def _convert_tokens(args):
+    tokens = [a[0] for a in args]
+    if address_numpy.np is not None and len(tokens) >= address_numpy._numpy_min:
+        out = address_numpy.tokens_to_dd(tokens, strict = False)
+        if '' in out:
+            # Let the bad tokens fail one by one, with their own messages
+            raise address_converter.TokenError("Bad token in batch.")
+        return out
+    return [address_converter.convert_token(t) for t in tokens]
+
+
+def _dd_to_tokens(args):
+    compress = set(a[1] if len(a) > 1 else True for a in args)
+    if len(compress) != 1:
+        raise ValueError("Mixed compress arguments in batch.")
+    return address_converter.dd_to_tokens([a[0] for a in args], compress.pop())
+
+
+def _eng_format_many(args):
+    return exp_notation.eng_format_many([a[0] for a in args])
+
+
+# Operations by name, as (module, function name, bulk) where `bulk` takes
+# a list of argument lists and returns a list of results, or is None. The
+# function is looked up in its module for each batch, so instrumentation
+# installed after import is seen. A bulk path only serves batches whose
+# requests all have the arguments it expects, in number and type, so that
+# a batch gives the same results as its requests run one by one; if it
+# raises, the batch is run request by request.
+ops = {
+        "convert_token": (address_converter, "convert_token", _convert_tokens),
+        "dd_to_token": (address_converter, "dd_to_token", _dd_to_tokens),
+        "int_to_dd": (address_converter, "int_to_dd", None),
+        "num_addresses": (address_calculator, "num_addresses", None),
+        "eng_exponent": (address_calculator, "eng_exponent", None),
+        "prefix_info": (address_calculator, "prefix_info", None),
+        "exp_tuple": (exp_notation, "exp_tuple", None),
+        "normalize": (exp_notation, "normalize", None),
+        "hex_manip": (exp_notation, "hex_manip", None),
+        "from_hex": (exp_notation, "from_hex", None),
+        "eng_format": (exp_notation, "eng_format", _eng_format_many)
+        }
+
+# The argument lists each bulk path handles, by the exact type of each
+# argument, so that e.g. a number is not taken for a token or True for a
+# number
+_bulk_args = {
+        "convert_token": {(str,)},
+        "dd_to_token": {(str,), (str, bool)},
+        "eng_format": {(int,), (float,)}
+        }
+
+
+def percentiles(values, ps = _percentiles):
+    """
+    Returns a dict mapping each percentile in `ps` to its nearest-rank
+    value in `values`, or to None if `values` is empty.
+    """
+    s = sorted(values)
+    if not s:
+        return dict((p, None) for p in ps)
+    return dict((p, s[min(len(s), max(1, math.ceil(p * len(s) / 100))) - 1]) for p in ps)
+
+
+def _error(e):
+    return "error", "{}: {}".format(type(e).__name__, e)
+
+
+def _json_safe(value):
+    """
+    Returns `value` with every float that JSON cannot hold, ±inf and NaN,
+    replaced by its str(), in lists, tuples and dict values at any depth.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else str(value)
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _json_safe(v)) for k, v in value.items())
+    return value
+
+
+def _encode(response):
+    """Encodes a response dict as one line of strict JSON."""
+    try:
+        text = json.dumps(response, allow_nan = False)
+    except ValueError:
+        text = json.dumps(_json_safe(response), allow_nan = False)
+    return text.encode() + b'\n'
+
+
+def run_batch(batch):
+    """
+    Runs a batch of requests, a list of (op, args), and returns a list
+    with ("result", value) or ("error", message) for each, in order.
+    """
+    out = [None] * len(batch)
+    by_op = {}
+    for i, (op, args) in enumerate(batch):
+        by_op.setdefault(op, []).append((i, args))
+
+    for op, items in by_op.items():
+        module, name, bulk = ops[op]
+        func = getattr(module, name)
+        if bulk is not None and len(items) > 1 and all(
+                tuple(map(type, args)) in _bulk_args[op] for _, args in items):
+            try:
+                results = bulk([args for _, args in items])
+            except Exception:
+                pass
+            else:
+                for (i, _), r in zip(items, results):
+                    out[i] = "result", r
+                continue
+
+        for i, args in items:
+            try:
+                out[i] = "result", func(*args)
+            except Exception as e:
+                out[i] = _error(e)
+    return out
+
+
+class ConversionServer:
+    """
+    Serves `ops` to any number of connections, running queued requests in
+    batches of at most `max_batch`. At most `max_queue` requests wait for a
+    batch, and at most `max_pending` per connection wait to be answered. If
+    `max_delay` is above zero, each batch waits that many seconds for more
+    requests before it runs.
+    """
+
+    def __init__(self, max_batch = 512, max_delay = 0.0, max_queue = 4096, max_pending = 1024):
+        if max_batch < 1:
+            raise ValueError("Batch size must be at least 1.")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._queue = asyncio.Queue(max_queue)
+        self._latency = deque(maxlen = _latency_window)
+        self.requests = self.batches = self.errors = 0
+        self._server = None
+        self._batcher = None
+        # One thread, so batches still run one at a time and in order
+        self._executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    async def start_unix(self, path):
+        """Starts listening on the Unix domain socket `path`."""
+        self._server = await asyncio.start_unix_server(self._handle, path)
+        self._start()
+
+    async def start_tcp(self, host = "127.0.0.1", port = 0):
+        """
+        Starts listening on `host` and `port`, a free port if 0, and returns
+        the port.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._start()
+        return self._server.sockets[0].getsockname()[1]
+
+    def _start(self):
+        self._batcher = asyncio.get_running_loop().create_task(self._run_batches())
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stops listening and stops running batches."""
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown()
+
+    def stats(self):
+        """
+        Returns a dict of request, error and batch counts, the mean batch
+        size, and the latency percentiles in milliseconds from a request
+        being read to its response being written, over recent requests.
+        """
+        ps = percentiles(self._latency)
+        return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "mean_batch": self.requests / self.batches if self.batches else 0.0,
+                "latency_ms": dict(("p{:g}".format(p), v / 1e6 if v is not None else None)
+                    for p, v in ps.items())
+                }
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        q = self._queue
+        while True:
+            batch = [await q.get()]
+            # Let connections that are ready add their requests first
+            await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not q.empty():
+                batch.append(q.get_nowait())
+            self.batches += 1
+            self.requests += len(batch)
+            results = await loop.run_in_executor(self._executor, run_batch,
+                    [(op, args) for op, args, _ in batch])
+            for (_, _, fut), r in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(r)
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(self.max_pending)
+        responder = loop.create_task(self._respond(pending, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter_ns()
+                fut = loop.create_future()
+                rid = None
+                try:
+                    request = json.loads(line)
+                    rid = request.get("id")
+                    op = request["op"]
+                    args = request.get("args", [])
+                    if not isinstance(args, list):
+                        raise TypeError("args must be a list")
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    fut.set_result(_error(e))
+                else:
+                    if op == "stats":
+                        fut.set_result(("result", self.stats()))
+                    elif op not in ops:
+                        fut.set_result(("error", "Unknown op {!r}.".format(op)))
+                    else:
+                        # Both puts wait while their queue is full, which
+                        # stops this connection being read from
+                        await self._queue.put((op, args, fut))
+                await pending.put((rid, start, fut))
+        except (ConnectionError, ValueError):
+            # A reset connection, or a line longer than the stream limit
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+
+    async def _respond(self, pending, writer):
+        latency = self._latency
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            rid, start, fut = item
+            kind, value = await fut
+            if kind == "error":
+                self.errors += 1
+            try:
+                writer.write(_encode({"id": rid, kind: value}))
+                await writer.drain()
+            except ConnectionError:
+                continue
+            latency.append(time.perf_counter_ns() - start)
+
+
+class RemoteError(ValueError):
+    """Raised by Client.call() for a request the server answered with an error."""
+
+
+class Client:
+    """
+    A connection to a ConversionServer. Calls may be made concurrently from
+    several tasks; they are sent without waiting for earlier answers.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+
+    @classmethod
+    async def open_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    @classmethod
+    async def open_tcp(cls, host = "127.0.0.1", port = 8765):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def call(self, op, *args):
+        """
+        Runs `op` with `args` on the server and returns the result. Raises
+        RemoteError if the server answers with an error.
+        """
+        rid = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting[rid] = fut
+        self._writer.write(json.dumps({"id": rid, "op": op, "args": args}).encode() + b'\n')
+        await self._writer.drain()
+        kind, value = await fut
+        if kind == "error":
+            raise RemoteError(value)
+        return value
+
+    async def _receive(self):
+        try:
+            async for line in self._reader:
+                response = json.loads(line)
+                fut = self._waiting.pop(response["id"])
+                if "error" in response:
+                    fut.set_result(("error", response["error"]))
+                else:
+                    fut.set_result(("result", response["result"]))
+        finally:
+            for fut in self._waiting.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError("Connection to server closed."))
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._receiver
+
+
+def _parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Serve conversions over a local socket.")
+    where = parser.add_mutually_exclusive_group(required = True)
+    where.add_argument("--unix", metavar = "PATH", help = "listen on a Unix domain socket")
+    where.add_argument("--tcp", metavar = "HOST:PORT", help = "listen on TCP")
+    parser.add_argument("-b", "--max-batch", type = int, default = 512)
+    parser.add_argument("-d", "--max-delay", type = float, default = 0.0,
+            help = "seconds a batch waits for more requests (default: %(default)s)")
+    parser.add_argument("-q", "--max-queue", type = int, default = 4096)
+    return parser.parse_args(argv)
+
+
+async def _serve(args):
+    server = ConversionServer(args.max_batch, args.max_delay, args.max_queue)
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.unlink(args.unix)
+        await server.start_unix(args.unix)
+        where = args.unix
+    else:
+        host, _, port = args.tcp.rpartition(':')
+        port = await server.start_tcp(host or "127.0.0.1", int(port))
+        where = "{}:{:d}".format(host or "127.0.0.1", port)
+    print("Listening on {}".format(where), file = sys.stderr, flush = True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv = None):
+    args = _parse_args(argv)
+    if os.environ.get("CONVERTER_INSTRUMENT"):
+        import instrumentation
+        instrumentation.install_from_env()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,61 @@
 #!/usr/bin/env python3
 import math
-import re
-
-# TODO:
-#       Add a lookup table of SI prefixes, and convert from base 10
-#       to 1000 for engineering notation.
+import struct
 
 # Valid values for display_base other than 10
-valid_radices = (2, 8, 16)
-# Functions for converting an integer to a string in a new base, in order of above
+valid_radices = (2, 4, 8, 16, 32, 64)
+# Functions for converting an integer to a string in a new base, for the
+# radices the builtins cover
 int_convs = (bin, oct, hex)
 
 # Lookup table maps display_base as a key to conversion function as a value
-radix_conv_funcs = dict(zip(valid_radices, int_convs))
+radix_conv_funcs = dict(zip((2, 8, 16), int_convs))
+# Lookup table maps display_base as a key to its format() spec as a value,
+# for the radices format() can write
+radix_formats = dict(zip((2, 8, 16), ('b', 'o', 'x')))
+
+# Digit alphabets by name, each listing its digits in order of value.
+# "digits" continues the hex digits and serves every radix up to 32; the
+# others are from RFC 4648.
+alphabets = {
+        "digits": "0123456789abcdefghijklmnopqrstuvwxyz",
+        "base32": "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567",
+        "base32hex": "0123456789ABCDEFGHIJKLMNOPQRSTUV",
+        "base64": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+        "base64url": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+        }
+# Lookup table maps display_base as a key to the name of its alphabet when
+# none is given
+default_alphabets = dict((r, "base64" if r == 64 else "digits") for r in valid_radices)
+# Bytes encoded at a time by the digit encoders, the fewest that hold a
+# whole number of digits
+_group_bytes = {2: 1, 4: 1, 8: 3, 16: 1, 32: 5, 64: 3}
+# Digit encoders and decoding tables, keyed by (display_base, alphabet name),
+# built on first use
+_radix_codecs = {}
 # Lookup table maps int as a key to int(log(int, 2)) as a value
 # Valid for powers of 2 from 0 to 1024
 radix_bits = dict((2**n, n) for n in range(0, 11))
 
-def _radix_conv(n, radix):
+# Layout of an IEEE 754 binary64 float
+_float64 = struct.Struct('<d')
+_binary64 = struct.Struct('<Q')
+_frac_bits = 52
+_frac_mask = (1 << _frac_bits) - 1
+_exp_mask = 0x7ff
+_exp_bias = 1023
+# Largest finite float
+_float_max = 1.7976931348623157e+308
+
+# Integer powers base**k used by normalize(), keyed by (base, k), up to a
+# fixed number of entries
+_int_pows = {}
+_int_pows_max = 4096
+
+def _radix_conv(n, radix, alphabet = None):
+    if radix not in radix_conv_funcs or alphabet is not None:
+        _signed_alphabet(radix, alphabet)
+        return sign_str(n) + radix_digits(abs(n), radix, 1, alphabet)
     conv = radix_conv_funcs[radix]
     if n == 0:
         return '0'
@@ -25,11 +63,178 @@ def _radix_conv(n, radix):
         return '-' + conv(abs(n))[2:] if n < 0 else conv(n)[2:]
 
 
+def _radix_codec(display_base, alphabet = None):
+    """
+    Returns (digits, encode, decode) for `display_base` written in the named
+    `alphabet`, or in its default alphabet if None:
+
+        `digits` is the string of digits, in order of value
+        `encode` takes bytes of whole groups of `_group_bytes[display_base]`
+            and returns all their digits, most significant first
+        `decode` is a str.translate() table from the digits to the digits
+            int() reads, in base `display_base`, or in base 8 two to a digit
+            for base 64; anything else becomes '!', which int() rejects
+
+    Raises RadixError for a `display_base` not in `valid_radices` and
+    ValueError for an unknown alphabet or one too short for the radix.
+    """
+    key = display_base, alphabet
+    try:
+        return _radix_codecs[key]
+    except KeyError:
+        pass
+
+    if display_base not in valid_radices:
+        raise RadixError
+    name = default_alphabets[display_base] if alphabet is None else alphabet
+    try:
+        digits = alphabets[name]
+    except KeyError:
+        raise ValueError("Unknown alphabet {!r}.".format(name)) from None
+    if len(digits) < display_base:
+        raise ValueError("Alphabet {!r} has fewer than {:d} digits.".format(name, display_base))
+    digits = digits[:display_base]
+
+    # Each encoder writes the bit groups with a C routine in its standard
+    # digits, then one translate() puts them into `digits`. The codec
+    # modules are only imported by the radices that need them.
+    bits = radix_bits[display_base]
+    if display_base == 64:
+        import binascii
+        std = alphabets["base64"]
+        raw = lambda b: binascii.b2a_base64(b, newline = False)
+    elif display_base == 32:
+        # b32hexencode() works through 5 bytes, 8 digits, at a time with a
+        # table of digit pairs; binascii has no base 32 routine
+        import base64
+        std = alphabets["base32hex"]
+        raw = base64.b32hexencode
+    elif display_base == 4:
+        # Each hex digit is two base 4 digits
+        std = None
+        pairs = dict((ord(h), digits[v >> 2] + digits[v & 3])
+                for v, h in enumerate("0123456789abcdef"))
+        encode = lambda b: b.hex().translate(pairs)
+    else:
+        std = alphabets["digits"][:display_base]
+        spec = '0{{:d}}{}'.format(radix_formats[display_base])
+        raw = lambda b: format(int.from_bytes(b, 'big'), spec.format(len(b) * 8 // bits)).encode()
+    if std is not None:
+        table = bytes.maketrans(std.encode(), digits.encode())
+        if std == digits:
+            encode = lambda b: raw(b).decode()
+        else:
+            encode = lambda b: raw(b).translate(table).decode()
+
+    decode = dict.fromkeys(range(128), '!')
+    if display_base == 64:
+        decode.update((ord(c), format(v, '02o')) for v, c in enumerate(digits))
+    else:
+        decode.update((ord(c), alphabets["digits"][v]) for v, c in enumerate(digits))
+
+    _radix_codecs[key] = codec = digits, encode, decode
+    return codec
+
+
+def _signed_alphabet(display_base, alphabet):
+    """
+    Raises ValueError if the digits of the alphabet include '-' or '.', so
+    that it cannot write signed or fractional numbers, as base64url cannot.
+    """
+    digits = _radix_codec(display_base, alphabet)[0]
+    if '-' in digits or '.' in digits:
+        raise ValueError("Alphabet {!r} uses '-' or '.' as a digit.".format(alphabet))
+
+
+def radix_digits(n, display_base = 16, width = 1, alphabet = None):
+    """
+    Returns the integer `n` >= 0 as a string of digits in `display_base`,
+    zero-filled to at least `width` digits, e.g. radix_digits(1000, 32)
+    returns 'v8' and radix_digits(1000, 64) returns 'Po'. `alphabet` names
+    a set of digits in `alphabets`, or None for the radix's default.
+    """
+    if alphabet is None and display_base in radix_formats:
+        return format(n, '0{:d}{}'.format(width, radix_formats[display_base]))
+    digits, encode, _ = _radix_codec(display_base, alphabet)
+    if n < 0:
+        raise ValueError("Cannot write negative integers as plain digits.")
+    group = _group_bytes[display_base] * 8
+    nbits = -(-max(n.bit_length(), 1) // group) * group
+    zero = digits[0]
+    return encode(n.to_bytes(nbits // 8, 'big')).lstrip(zero).rjust(max(width, 1), zero)
+
+
+def radix_digits_many(ns, display_base = 16, width = 1, alphabet = None):
+    """
+    Returns a list of radix_digits() of each integer in `ns`. All of them
+    are written out to the same number of bytes and encoded together in one
+    pass, so no digit is handled on its own in Python.
+    """
+    digits, encode, _ = _radix_codec(display_base, alphabet)
+    if not ns:
+        return []
+    if min(ns) < 0:
+        raise ValueError("Cannot write negative integers as plain digits.")
+    bits = radix_bits[display_base]
+    group = _group_bytes[display_base]
+    top = max(max(ns).bit_length(), width * bits, 1)
+    nbytes = -(-top // (8 * group)) * group
+    size = nbytes * 8 // bits
+    text = encode(b''.join([n.to_bytes(nbytes, 'big') for n in ns]))
+    zero = digits[0]
+    width = max(width, 1)
+    return [text[i:i + size].lstrip(zero).rjust(width, zero) for i in range(0, len(text), size)]
+
+
+def radix_encode(data, display_base = 32, alphabet = None):
+    """
+    Returns the bytes-like `data`, read as one big-endian number, as a
+    string of digits in `display_base`, with as many digits as its bits
+    need, leading zero digits included, e.g. 26 digits for 16 bytes in
+    base 32.
+    """
+    return radix_encode_many(data, len(data), display_base, alphabet)[0] if data else ''
+
+
+def radix_encode_many(buf, width, display_base = 32, alphabet = None):
+    """
+    Returns a list of radix_encode() of each `width`-byte record of the
+    bytes-like `buf`, encoded together in one pass. Records that do not fill
+    a whole number of digit groups get zero bytes in front.
+    """
+    digits, encode, _ = _radix_codec(display_base, alphabet)
+    if len(buf) % width:
+        raise ValueError("Buffer length is not a multiple of {:d}.".format(width))
+    bits = radix_bits[display_base]
+    pad = -width % _group_bytes[display_base]
+    if pad:
+        view = memoryview(buf)
+        zeros = bytes(pad)
+        buf = zeros + zeros.join([view[i:i + width] for i in range(0, len(view), width)])
+    size = (width + pad) * 8 // bits
+    skip = size - -(-width * 8 // bits)
+    text = encode(buf)
+    return [text[i + skip:i + size] for i in range(0, len(text), size)]
+
+
+def parse_radix_int(s, display_base = 16, alphabet = None):
+    """
+    The inverse of radix_digits(): returns the integer written in the string
+    `s` of digits of `display_base`. Raises ValueError if `s` is empty or
+    has anything but digits of the alphabet.
+    """
+    digits, _, decode = _radix_codec(display_base, alphabet)
+    t = s.translate(decode)
+    if t and t.isascii() and t.isalnum():
+        return int(t, 8 if display_base == 64 else display_base)
+    raise ValueError("Invalid base {:d} number: {!r}.".format(display_base, s))
+
+
 def radix_conv(radix):
     return lambda x: _radix_conv(x, radix)
 
 
-class RadixError(Exception):
+class RadixError(ValueError):
     """Standard error message for a display_base not in valid_radices."""
     def __init__(self):
         radix_error = tuple(str(i) for i in sorted(valid_radices + (10,)))
@@ -85,6 +290,18 @@ class exponential:
         return
 
 
+# Prefix tables indexed by integer, built from the tables above. The SI
+# tables cover the powers of 1000 and are indexed by exponent // 3 - si_low,
+# the IEC tables by the power of 1024.
+_si_exponents = sorted(int(k) for k in exponential.si_prefixes if int(k) % 3 == 0)
+si_low, si_high = _si_exponents[0] // 3, _si_exponents[-1] // 3
+si_names = tuple(exponential.si_prefixes[str(k * 3)][0] for k in range(si_low, si_high + 1))
+si_symbols = tuple(exponential.si_prefixes[str(k * 3)][1] for k in range(si_low, si_high + 1))
+bi_high = max(int(k) for k in exponential.bi_prefixes)
+bi_names = tuple(exponential.bi_prefixes[str(k)][0] for k in range(bi_high + 1))
+bi_symbols = tuple(exponential.bi_prefixes[str(k)][1] for k in range(bi_high + 1))
+
+
 def sign(x):
     """
     Returns -1 or 1 based on the numeric sign of x.
@@ -114,66 +331,73 @@ def split_float(x):
         return x, 0
 
 
+def _int_pow(base, k):
+    try:
+        return _int_pows[base, k]
+    except KeyError:
+        p = base**k
+        if len(_int_pows) < _int_pows_max:
+            _int_pows[base, k] = p
+        return p
+
+
 def normalize(x, base = 10):
     """
     Converts a number to “normalized” or “standard” form, i.e. where
-    there is exactly one decimal digit before the decimal point. This is the
-    expected default of scientific notation output.
+    there is exactly one digit in `base` before the point. This is the
+    expected default of scientific notation output when `base` is 10.
 
-    Returns a pair (x_n, shift, base) where x_n is the normalized number
-    and shift is the base 10 exponent to return to the original x.
+    Returns a tuple (x_n, shift, base) where x_n is the normalized number
+    and shift is the exponent on `base` to return to the original x.
+    x_n is the exact value of x / base**shift, correctly rounded to a float.
 
-    If x is ±inf it will return (x, x, base) rather than throw an exception.
+    If 1 <= |x| < base or x == 0, x is returned as is with a shift of 0.
+    If x is ±inf or NaN it will return (x, x, base) rather than throw an exception.
+    `base` must be an integer greater than 1, or a ValueError will be raised.
     """
 
     # Implementation detail:
     #
-    # This is the algorithm for perfect normalization which relies on
-    # string conversion to eliminate rounding error, but is very, very slightly
-    # slower than using normalize = True with exp_tuple() (~5.5 µs on a
-    # Pentium N3700 @ 1.60GHz) and currently only works for base 10.
+    # |x| is taken as the exact ratio p/q of two integers. The shift is
+    # estimated from a float logarithm, then corrected with integer
+    # comparisons until base**shift <= p/q < base**(shift + 1), so no
+    # rounding happens before the final division.
+
+    if type(base) is not int:
+        if base != int(base):
+            raise ValueError("Base must be an integer greater than 1.")
+        base = int(base)
+    if base <= 1:
+        raise ValueError("Base must be an integer greater than 1.")
 
     x_abs = abs(x)
-
-    # Nothing further needed if the whole part of |x| is in [1, 10).
-    # Zero added to this case because it returned an exponent of -2
-    # when caught by the |x| < 1 case.
-    if 1 <= x_abs < 10 or x == 0:
+    if 1 <= x_abs < base or x == 0:
         return x, 0, base
-    elif x_abs < 1:
-        # Dealing exclusively with floats in this case.
-
-        # Check if x is in e notation. Since |x| < 1 is true, if the
-        # output of split_float() has an exponent, nothing more is needed.
-        x_m, x_n = split_float(x)
-        if x_n != 0:
-            return x_m, x_n, base
-
+    # If x is ±inf or NaN return x, x, base
+    if x_abs == math.inf or x != x:
+        return x, x, base
+
+    p, q = x_abs.as_integer_ratio()
+    shift = math.floor(math.log(x_abs, base))
+    if shift >= 0:
+        num, den = p, q * _int_pow(base, shift)
+    else:
+        num, den = p * _int_pow(base, -shift), q
 
-        # Last case here is to make a temp string after the decimal point,
-        # count the number of zeroes until the first non-zero, and shift
-        #the decimal point to the right by that count plus one.
-        else:
-            post_dec = str(x_abs)[2:]
-            shift = re.search("0*", post_dec).end() + 1
-            return sign(x) * float(post_dec[shift - 1] + "." + post_dec[shift:]), -1 * shift, base
+    # The logarithm can be off by one either way near a power of `base`
+    while num < den:
+        num *= base
+        shift -= 1
+    while num >= den * base:
+        den *= base
+        shift += 1
 
-
-    # Final case is for x > 10. Count the length of the whole part of |x|,
-    # subtract one, and shift the decimal point to the left.
-    # TODO:
-    #       Check for split_float and adjust accordingly.
-    #       Rewrite to use temp string construction for exactness.
-    else:
-        print("Case: x > 10")
-        try:
-            shift = len(str(int(x_abs))) - 1
-        # If x is ±inf or NaN return x, x, base
-        except (OverflowError, ValueError):
-            return x, x, base
-        #post_dec = str(x_abs).split('.')[1]
-        return x / 10**(shift), shift, base
-        #return sign(x) * float(post_dec[shift - 1] + "." + post_dec[shift:]), -1 * shift
+    x_n = num / den
+    # Rounding can carry a mantissa just below `base` up to `base` itself
+    if x_n == base:
+        x_n = 1.0
+        shift += 1
+    return (-x_n if x < 0 else x_n), shift, base
 
 
 def exp_tuple(x, base = 10, normalize = False):
@@ -220,12 +444,161 @@ def exp_tuple(x, base = 10, normalize = False):
         m = x
     else:
         # Conditional added here to mitigate rounding errors observed during testing.
-        m = x / pow(base, n) if n >= 1 else x * pow(base, -n)
+        try:
+            m = x / pow(base, n) if n >= 1 else x * pow(base, -n)
+        except OverflowError:
+            # base**|n| is beyond a float, for x near the bottom of the
+            # subnormal range or rounded up to the top of the float range
+            m = _scale_split(x, n, base)
 
     return m, n, base
 
 
-def hex_manip(f, display_base = 16, normalize = True):
+def _scale_split(x, n, base):
+    """
+    Returns x / base**n, as exp_tuple() computes it, where base**|n| is
+    beyond a float. The scaling is done in two steps as exp_numpy does it:
+    for an integer base, by the largest power that is a float and then the
+    rest, and otherwise by two halves of the power.
+    """
+    k = abs(n)
+    if float(base).is_integer():
+        base = int(base)
+        top = int(math.log(_float_max, base))
+        while base ** (top + 1) <= _float_max:
+            top += 1
+        while base ** top > _float_max:
+            top -= 1
+        p1, p2 = float(base ** top), float(base ** (k - top))
+    else:
+        h = k // 2
+        p1, p2 = base ** h, base ** (k - h)
+    return x / p1 / p2 if n >= 1 else x * p1 * p2
+
+
+def _place_point(digits, point):
+    """Puts a decimal point after the first `point` characters of `digits`."""
+    if point <= 0:
+        return '0.' + '0' * -point + digits
+    if point >= len(digits):
+        return digits + '0' * (point - len(digits))
+    return digits[:point] + '.' + digits[point:]
+
+
+def _sci_digits(x_abs, precision):
+    """
+    Returns the first `precision` significant digits of `x_abs`, correctly
+    rounded, as a string, and the decimal exponent of the first digit.
+    """
+    # '%e' gives d.ddde±xx, or de±xx for a single digit
+    s = '%.*e' % (precision - 1, x_abs)
+    if precision > 1:
+        return s[0] + s[2:precision + 1], int(s[precision + 2:])
+    return s[0], int(s[2:])
+
+
+def _eng_abs(x):
+    """
+    Returns abs(x) as a float for the engineering formatters, and whether
+    x is negative, including -0.0.
+    """
+    try:
+        x_abs = float(abs(x))
+    except OverflowError:
+        raise ValueError("Number too large to format: {:d} bits.".format(abs(x).bit_length())) from None
+    return x_abs, x < 0 or x == 0 and math.copysign(1.0, x) < 0
+
+
+def _eng_si(x, precision, prefixes, unit, sep):
+    if x != x or abs(x) == math.inf:
+        return str(x) + sep + unit if unit else str(x)
+    x_abs, negative = _eng_abs(x)
+    # Rounding to significant digits happens once, before the prefix is
+    # chosen, so a carry such as 999.96 -> 1.00e+03 has already moved the
+    # exponent.
+    digits, e = _sci_digits(x_abs, precision)
+    k = min(max(e // 3, si_low), si_high)
+    text = _place_point(digits, e - 3 * k + 1)
+    suffix = prefixes[k - si_low] + unit
+    if negative:
+        text = '-' + text
+    return text + sep + suffix if suffix else text
+
+
+def _eng_bi(x, precision, prefixes, unit, sep):
+    if x != x or abs(x) == math.inf:
+        return str(x) + sep + unit if unit else str(x)
+    x_abs, negative = _eng_abs(x)
+    k = 0
+    if x_abs >= 1024:
+        # Dividing by a power of two is exact
+        k = min((math.frexp(x_abs)[1] - 1) // 10, bi_high)
+        x_abs = x_abs / (1 << 10 * k)
+    digits, e = _sci_digits(x_abs, precision)
+    # The prefix is chosen again after rounding: a carry of 1023.96 up to
+    # 1024 takes the next prefix, and so does a mantissa from 1000 to 1023
+    # with fewer than 4 significant digits, which could only be written as
+    # 1020 or 1000.
+    if e == 3 and k < bi_high and (len(digits) < 4 or int(digits[:4]) >= 1024):
+        k += 1
+        digits, e = _sci_digits(x_abs / 1024, precision)
+    text = _place_point(digits, e + 1)
+    suffix = prefixes[k] + unit
+    if negative:
+        text = '-' + text
+    return text + sep + suffix if suffix else text
+
+
+def eng_format(x, precision = 3, binary = False, unit = '', names = False, sep = ' '):
+    """
+    Formats a number in engineering notation, as a mantissa rounded to
+    `precision` significant digits followed by a prefix, e.g. 4.56e-6 as
+    '4.56 µ' or 12345678 as '12.3 M'.
+
+    If `binary` is True, IEC prefixes for powers of 1024 are used instead of
+    SI prefixes for powers of 1000, e.g. 12.3 * 2**20 as '12.3 Mi', and
+    numbers below 1000 have no prefix. `unit` is appended to the prefix,
+    and `names` spells the prefix out, e.g. '12.3 mebibytes' for names=True
+    and unit='bytes'. The number is joined to the prefix by `sep` if there
+    is a prefix or unit.
+
+    Numbers beyond the largest or smallest prefix keep the extra digits in
+    the mantissa. ±inf and NaN are formatted as str(x), and -0.0 keeps its
+    sign. Integers too large for a float raise ValueError.
+    """
+
+    if precision < 1:
+        raise ValueError("Precision must be at least 1.")
+    if binary:
+        return _eng_bi(x, precision, bi_names if names else bi_symbols, unit, sep)
+    return _eng_si(x, precision, si_names if names else si_symbols, unit, sep)
+
+
+def eng_format_many(xs, precision = 3, binary = False, unit = '', names = False, sep = ' '):
+    """
+    Returns a list with eng_format() applied to each number in `xs` with the
+    same options, checking them only once.
+    """
+
+    if precision < 1:
+        raise ValueError("Precision must be at least 1.")
+    if binary:
+        fmt, prefixes = _eng_bi, bi_names if names else bi_symbols
+    else:
+        fmt, prefixes = _eng_si, si_names if names else si_symbols
+    return [fmt(x, precision, prefixes, unit, sep) for x in xs]
+
+
+def _float_bits(f):
+    """
+    Returns (sign, exponent, fraction) of the float `f`, as the integer bit
+    fields of its IEEE 754 binary64 encoding.
+    """
+    b = _binary64.unpack(_float64.pack(f))[0]
+    return b >> 63, (b >> _frac_bits) & _exp_mask, b & _frac_mask
+
+
+def hex_manip(f, display_base = 16, normalize = True, alphabet = None):
     """
     Converts a float `f` to a tuple (m, (n, d), base, display_base), where:
 
@@ -239,133 +612,283 @@ def hex_manip(f, display_base = 16, normalize = True):
 
     If `normalize` == True and `display_base` != 2, there is a chance the exponent will not be an
     integer. In this case, the denominator `d` is equal to the base 2 logarithm of `display_base`.
+
+    Digits are taken from the named `alphabet` in `alphabets`, by default "digits" (the builtin
+    bin/oct/hex digits and their continuation) for radices up to 32 and "base64" for 64.
     """
 
     if display_base not in valid_radices:
         raise RadixError
+    if alphabet is not None or display_base not in radix_formats:
+        _signed_alphabet(display_base, alphabet)
+
+    parts = _hex_parts(f, display_base, normalize)
+    n, d = parts[5:]
+    # Return the mantissa, exponent (with denominator, even if denom is 1), and display base
+    return (_hex_mantissa(f, parts, display_base, alphabet),
+            (_radix_conv(n, display_base, alphabet), str(d)), '10', display_base)
+
 
-    # Get the hex literal for `f`, described at:
+def _hex_parts(f, display_base, normalize):
+    """
+    Returns the fields of hex_manip(f, display_base, normalize) as integers,
+    (negative, head, head_len, tail, tail_len, n, d): the mantissa is the
+    `head_len` bits of `head` before the point and the `tail_len` bits of
+    `tail` after it, and the exponent is n/d.
+    """
+
+    # Pull the sign, exponent and fraction out of the float as integers.
+    # These are the same fields `float.hex()` shows, described at:
     # https://docs.python.org/3/library/stdtypes.html#float.hex
-    # https://docs.oracle.com/javase/7/docs/api/java/lang/Double.html#toHexString(double)
-    f_hex = f.hex()
-    # Capture a negative sign if present
-    sign_f = '-' if f_hex[0] != '0' else ''
-    # Determine how many places to skip the sign character and '0x'
-    skip = 3 if f < 0 else 2
-    # `mantissa` is the absolute value, `p` is to base 2
-    mantissa, p = f_hex[skip:].split('p')
-    p = int(p)
-    # `whole` is 1 for normal floats, 0 for subnormal or zero
-    # `fraction` is in hex; each digit will be converted to int if display_base != 16
-    whole, fraction = mantissa.split('.')
+    negative, e, fraction = _float_bits(f)
+    if e == _exp_mask:
+        raise ValueError("Cannot convert {!r} to display base {:d}.".format(f, display_base))
+    # `whole` is 1 for normal floats, 0 for subnormal or zero, and `p` is the
+    # exponent to base 2
+    if e:
+        whole, p = 1, e - _exp_bias
+    elif fraction:
+        whole, p = 0, 1 - _exp_bias
+    else:
+        whole, p = 0, 0
 
     # Base 2 logarithm of `display_base`, equivalent to the number of bits a radix
     # can display in a single digit.
     bits = radix_bits[display_base]
-    # Determine builtin function for final conversion
-    conv = radix_conv(display_base)
 
-    # Convert each hex digit in `fraction` to a sequence of integers…
-    f_frac = (int(x, 16) for x in iter(fraction))
-    # …and combine the sequence into an MSB-first bitstring, four bits per, removing trailing zeroes
-    fraction = re.sub('0*$', '', ''.join(bin(x)[2:].zfill(4) for x in f_frac))
+    # The working set is `whole` followed by the fraction with its trailing
+    # zero bits removed, held as an integer `ws` of `ws_len` bits.
+    if fraction:
+        trailing = (fraction & -fraction).bit_length() - 1
+        fraction >>= trailing
+        frac_len = _frac_bits - trailing
+    else:
+        frac_len = 0
+    ws = whole << frac_len | fraction
+    ws_len = frac_len + 1
 
+    # Split the working set into the whole part of the new mantissa, `head`,
+    # of `head_len` bits, and its fractional part, `tail`, of `tail_len` bits.
     if normalize == True:
-        working_set = whole + fraction
-        s = working_set.find('1')
-        whole_new, fraction_new = working_set[s:s+bits], working_set[s+bits:]
+        if not ws:
+            # Zero has no leading one to normalize on. In base 2 it has no
+            # whole part, a single zero bit after the point, and 2**-1;
+            # otherwise it is a zero digit and display_base**0.
+            if display_base == 2:
+                return negative, 0, 0, 0, 1, -1, 1
+            return negative, 0, 1, 0, 0, 0, 1
+        # `s` is the number of zero bits before the leading one; the whole part
+        # is the `bits` bits from there, padded with zero bits if the working
+        # set runs out, as for 1.0 in base 16, which is 8 * 16**(-3/4).
+        s = ws_len - ws.bit_length()
+        if ws_len - s < bits:
+            ws <<= bits - (ws_len - s)
+            ws_len = s + bits
+        head_len = bits
+        tail_len = ws_len - s - head_len
         n_new = p - s - bits + 1
-        n_new, denom = (n_new // bits, 1) if n_new % bits == 0 else (n_new, bits)
-
-        n_conv = '-' + conv(abs(n_new)), str(denom)
-        #n = n_new/denom
+        n, denom = (n_new // bits, 1) if n_new % bits == 0 else (n_new, bits)
     else:
-        # `n` will be the integer part of the original exponent divided by `bits`
-        # This new exponent will be for `display_base`, as `display_base**(p/bits)`
-        # is equal to `2**p`.
-        n = p // bits
-        # `s` will be the remainder of `p/bits`, the derivation of which is explained
-        # at [] and serves as the amount to shift left (for positive `n`) or right
-        # (for negative `n`). This corrects for the fractional part of `p/bits`.
+        # `n` will be the integer part of the original exponent divided by `bits`,
+        # rounded towards zero. This new exponent will be for `display_base`, as
+        # `display_base**(p/bits)` is equal to `2**p`.
+        n = p // bits if p >= 0 else -(-p // bits)
+        # `s` will be the remainder of `p/bits`, and serves as the amount to
+        # shift left (for positive `p`) or right (for negative `p`). This
+        # corrects for the fractional part of `p/bits`.
         s = abs(p) % bits
-        n_conv = conv(abs(n)), '1'
-        if n < 0:
-            # Perform a string version of unsigned bitwise right shift
-            working_set = whole.zfill(s+1) + fraction
-            whole_new, fraction_new = working_set[0], working_set[1:]
+        denom = 1
+        if p < 0:
+            # Unsigned right shift: `s` zero bits enter above the working set
+            # and the whole part is the single top bit.
+            ws_len += s
+            head_len = 1
         else:
-            # Perform a string version of unsigned bitwise left shift
-            working_set = whole + fraction
-            whole_new, fraction_new = working_set[:s+1], working_set[s+1:]
-
-
-    ## Showing that sign + whole_new + fraction_new is equal (within float rounding error) to input `f`
-    #f_frac_gen = (int(x)/2**i for i,x in enumerate(fraction_new,1))
-    #f_new = sign(f) * (int(whole_new, 2) + sum(f_frac_gen)) * display_base**n
-    #print("\nf = " + str(f))
-    #print("f_new = " + str(f_new))
-    #print("Percent difference = {:%}\n" .format(f_new / f - 1))
-
+            # Left shift: the whole part takes the top `s` + 1 bits, padded
+            # with zero bits if the working set runs out, as for 1024.0 in
+            # base 16, which is 4 * 16**2.
+            if ws_len < s + 1:
+                ws <<= s + 1 - ws_len
+                ws_len = s + 1
+            head_len = s + 1
+        tail_len = ws_len - head_len
+
+    head = ws >> tail_len
+    tail = ws & ((1 << tail_len) - 1)
+    return negative, head, head_len, tail, tail_len, n, denom
+
+
+def _hex_mantissa(f, parts, display_base, alphabet):
+    """Writes the mantissa of _hex_parts() in digits of `display_base`."""
+    negative, head, head_len, tail, tail_len = parts[:5]
+    sign_f = '-' if negative else ''
+    bits = radix_bits[display_base]
 
-    # If `display_base` is 2, nothing further is needed.
+    # If `display_base` is 2, the bits are the digits.
     if display_base == 2:
-        final = sign_f + whole_new + '.' + fraction_new
-        return final, n_conv, '10', display_base
-
-    if int(fraction_new) == 0:
-        # A '0' in a 1-tuple is sufficient when there is zero fractional part
-        frac_groups = '0',
+        final = sign_f + (radix_digits(head, 2, head_len, alphabet) if head_len else '') + '.'
+        if tail_len:
+            final += radix_digits(tail, 2, tail_len, alphabet)
+        return final
+
+    if tail_len:
+        # Pad the fraction with trailing zero bits to a whole number of digits,
+        # then format it as that many digits, keeping leading zeroes.
+        pad = -tail_len % bits
+        fraction_final = radix_digits(tail << pad, display_base, (tail_len + pad) // bits, alphabet)
     else:
-        # Pad `fraction` with trailing zeroes if the length of `fraction` is not divisible by `bits`
-        frac_length = len(fraction_new) % bits
-        if frac_length != 0:
-            fraction_new += ''.zfill(bits - frac_length)
-        # Helpers for frac_groups
-        #
-        # The expression inside the zip creates a tuple of length `bits` where each element is a reference
-        # to `frac_iter`, with the star operator allowing zip to use `frac_iter` to create the groups
-        frac_iter = iter(fraction_new)
-        frac_group_zip = zip(*( (frac_iter,)*bits ))
-        # Get the groups of `fraction_new` of `bits` length as big endian binary strings
-        frac_groups = (''.join(t) for t in frac_group_zip)
+        # The whole digit took every bit, as for 1.0 or 1.5 in base 16
+        fraction_final = radix_digits(0, display_base, 1, alphabet)
+    # Finally, assemble the whole signed mantissa
+    return sign_f + radix_digits(head, display_base, 1, alphabet) + '.' + fraction_final
 
 
-    # Final converstion for `fraction`, giving a string of characters in the display base
-    fraction_final = ''.join(conv(int(g,2)) for g in frac_groups)
-    # Finally, assemble the whole signed mantissa…
-    final = sign_f + conv(int(whole_new,2)) + '.' + fraction_final
-    # …and return the mantissa, exponent (with denominator, even if denom is 1), and display base
-    return final, n_conv, '10', display_base
+def radix_float(x, display_base = 16, alphabet = None):
+    """
+    Returns the exact value of a finite float or integer `x` as a string of
+    digits in `display_base`, with a point if it has a fractional part,
+    e.g. '-1.8' for -1.5 in base 16, in digits of the named `alphabet`.
+    """
+
+    if display_base not in valid_radices:
+        raise RadixError
+    if alphabet is not None or display_base not in radix_formats:
+        _signed_alphabet(display_base, alphabet)
+    p, q = abs(x).as_integer_ratio()
+    whole = sign_str(x) + radix_digits(p // q, display_base, 1, alphabet)
+    if q == 1:
+        return whole
+    # `q` is a power of two, so the fraction is a whole number of bits,
+    # padded with zero bits to a whole number of digits.
+    bits = radix_bits[display_base]
+    t = q.bit_length() - 1
+    pad = -t % bits
+    return whole + '.' + radix_digits((p % q) << pad, display_base, (t + pad) // bits, alphabet)
 
 
-def radix_base(t, display_base = 16, raw_hex = False):
+def radix_base(t, display_base = 16, raw_hex = False, alphabet = None):
     """
     Make a new exp_tuple with each element as a string of radix representation, e.g.
     if display_base is 16, convert m to a hex string. This is limited in scope to the
-    "common" bases, i.e. 2, 8, 10, 16.
+    power-of-two bases in `valid_radices`, and 10.
     """
 
     if raw_hex == True:
         return tuple(float(_t).hex() for _t in t)
     if display_base == 10:
         return tuple(str(f) for f in t)
-    else:
-        m_t, n_t, b_t = t
-
-    int_conv_func = int_conv_funcs[display_base]
-    n = int_conv_func(n_t)
+    if display_base not in valid_radices:
+        raise RadixError
 
+    m_t, n_t, b_t = t
+    m = radix_float(m_t, display_base, alphabet)
+    n = _radix_conv(n_t, display_base, alphabet)
+    # A non-integer base, e.g. math.e, is written out like the mantissa
     if type(b_t) == int:
-        b = int_conv_func(b_t)
+        b = _radix_conv(b_t, display_base, alphabet)
     else:
-        None
+        b = radix_float(b_t, display_base, alphabet)
 
+    return m, n, b
 
 
-    #f.hex(), float.fromhex()
+def _ldexp_exact(m, e):
+    """Returns the float nearest to m * 2**e for integers m >= 0 and e."""
+    # ldexp() rounds once, which is exact while `m` fits in a float.
+    # Otherwise the integer arithmetic rounds correctly instead.
+    if m.bit_length() <= 53:
+        return math.ldexp(m, e)
+    if e >= 0:
+        return float(m << e)
+    return m / (1 << -e)
 
 
-    return m, n, b
+def _parse_radix(s, display_base, alphabet = None):
+    """
+    Parses a signed string of `display_base` digits with an optional point
+    and returns (negative, digits, k) for the value digits / display_base**k.
+    """
+    negative = s[:1] == '-'
+    whole, _, fraction = s[negative:].partition('.')
+    digits = whole + fraction
+    if alphabet is not None or display_base not in radix_formats:
+        _signed_alphabet(display_base, alphabet)
+        try:
+            return negative, parse_radix_int(digits, display_base, alphabet), len(fraction)
+        except ValueError:
+            pass
+    # int() would also take signs, spaces, underscores and non-ASCII digits
+    elif digits.isascii() and digits.isalnum():
+        try:
+            return negative, int(digits, display_base), len(fraction)
+        except ValueError:
+            pass
+    raise ValueError("Invalid base {:d} number: {!r}.".format(display_base, s))
+
+
+def parse_radix_float(s, display_base = 16, alphabet = None):
+    """
+    Converts a string from radix_float(), or the mantissa of a hex_manip()
+    tuple, back to a float. The result is exact, or correctly rounded if
+    `s` has more digits than a float can hold.
+    """
+
+    if display_base not in valid_radices:
+        raise RadixError
+    negative, digits, k = _parse_radix(s, display_base, alphabet)
+    f = _ldexp_exact(digits, -radix_bits[display_base] * k)
+    return -f if negative else f
+
+
+def hex_unmanip(t, alphabet = None):
+    """
+    The inverse of hex_manip(): converts a tuple (m, (n, d), base, display_base)
+    back to the float m * display_base**(n/d), where `m` and `n` are strings
+    of `display_base` digits, from the same `alphabet` hex_manip() was given,
+    and `d` is a string of decimal digits. The result is exact for every
+    output of hex_manip(), including -0.0 and subnormals.
+
+    Raises ValueError if the tuple is malformed, or if n/d is not a whole number
+    of bits, and RadixError for a `display_base` not in `valid_radices`.
+    """
+
+    m, (n, d), base, display_base = t
+    if display_base not in valid_radices:
+        raise RadixError
+    if base != '10':
+        raise ValueError("Base must be '10', not {!r}.".format(base))
+
+    bits = radix_bits[display_base]
+    negative, digits, k = _parse_radix(m, display_base, alphabet)
+    n_neg, n, _ = _parse_radix(n, display_base, alphabet)
+    # The denominator is written in decimal, like `base`
+    if not (d.isascii() and d.isdigit()):
+        raise ValueError("Invalid exponent denominator: {!r}.".format(d))
+    d = int(d)
+    # display_base**(n/d) is 2**(bits*n/d), which must be a whole power of two
+    e, r = divmod(-bits * n if n_neg else bits * n, d)
+    if r:
+        raise ValueError("Exponent {!r} is not a whole number of bits.".format(t[1]))
+
+    f = _ldexp_exact(digits, e - bits * k)
+    return -f if negative else f
+
+
+def from_hex(x):
+    """
+    Converts either a hex_manip() tuple or a float.hex() string, e.g.
+    '-0x1.8p+3', back to the float it came from.
+    """
+
+    if isinstance(x, str):
+        return float.fromhex(x)
+    return hex_unmanip(x)
+
+
+def from_hex_many(xs):
+    """Returns a list with from_hex() applied to each item of `xs`."""
+    fromhex = float.fromhex
+    return [fromhex(x) if isinstance(x, str) else hex_unmanip(x) for x in xs]
 
 
 #if __name__ == "__main__":
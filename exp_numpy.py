@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+NumPy versions of exp_notation.exp_tuple() and normalize() that take a
+whole array of floats at once.
+
+Both return a pair of float64 arrays (m, n) with x = m * base**n. `n` is
+float64 rather than an integer type so that it can carry the special
+cases of the scalar functions:
+
+    x = 0           m = 0, n = 0
+    x = ±inf, NaN   m = x, n = x
+
+For an integer base, the powers of the base are looked up in a table of
+float(base**k), so results are the same as exp_tuple() gives for the same
+x. Where base**-n is beyond a float for a very small x, e.g. subnormals
+in base 10, the scaling is done in two steps, as in exp_tuple(). For
+other bases the powers come from np.power(), also in two steps where a
+single power would overflow, and `m` may differ from the scalar result
+in the last bit.
+"""
+
+import math
+
+import address_numpy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Tables of float(base**k), keyed by integer base, built on first use
+_pow_tables = {}
+
+
+def _pow_table(base):
+    """
+    Returns an array of float(base**k) for k from 0 until the power no
+    longer fits in a float, which is the last entry.
+    """
+    try:
+        return _pow_tables[base]
+    except KeyError:
+        powers = []
+        p = 1
+        while True:
+            try:
+                powers.append(float(p))
+            except OverflowError:
+                break
+            p *= base
+        table = np.array(powers)
+        _pow_tables[base] = table
+        return table
+
+
+def _scale(x, n, base):
+    """
+    Returns x / base**n elementwise for integer-valued float64 `n`, where
+    the division happens as exp_tuple() does it: as x / b**n for n >= 1
+    and as x * b**-n for n < 0. Entries where `n` is not finite are
+    scaled by 1.
+    """
+    n = np.where(np.isfinite(n), n, 0.0)
+    if float(base).is_integer():
+        table = _pow_table(int(base))
+        top = len(table) - 1
+        k = np.abs(n).astype(np.intp)
+        # Split |n| into two table lookups when it runs off the table
+        k1 = np.minimum(k, top)
+        k2 = k - k1
+        p1 = table[k1]
+        p2 = table[np.minimum(k2, top)]
+        return np.where(n >= 1, x / p1 / p2, x * p1 * p2)
+
+    k = np.abs(n)
+    with np.errstate(over = 'ignore'):
+        p = np.power(float(base), k)
+    # Split base**|n| into two half powers where it overflows, as for x
+    # near the bottom of the subnormal range
+    split = ~np.isfinite(p)
+    if split.any():
+        h = np.floor(k / 2)
+        p1 = np.where(split, np.power(float(base), h), p)
+        p2 = np.where(split, np.power(float(base), k - h), 1.0)
+        return np.where(n >= 1, x / p1 / p2, x * p1 * p2)
+    return np.where(n >= 1, x / p, x * p)
+
+
+def exp_tuple(x, base = 10, normalize = False):
+    """
+    For an array of numbers x and a base b > 1, returns arrays (m, n) where
+    m = x / b^n and n = int(log_b(|x|)), elementwise, as
+    exp_notation.exp_tuple() does for one number.
+
+    If normalize is True, n is lowered by one wherever log_b(|x|) has a
+    negative fractional part, so that 1 <= |m| < b up to rounding.
+
+    Raises ValueError if b <= 1.
+    """
+    address_numpy._require_numpy()
+    if base <= 1:
+        raise ValueError("Base must be greater than 1.")
+
+    x = np.asarray(x, dtype = np.float64)
+    finite = np.isfinite(x)
+    regular = finite & (x != 0)
+    a = np.where(regular, np.abs(x), 1.0)
+
+    x_log = np.log(a) / math.log(base)
+    # trunc() rounds towards zero like int() does in the scalar version
+    n = np.trunc(x_log)
+    if normalize:
+        n -= (x_log - n) < 0
+
+    with np.errstate(over = 'ignore', invalid = 'ignore'):
+        m = np.where(n == 0, x, _scale(x, n, base))
+
+    m = np.where(regular, m, np.where(finite, 0.0, x))
+    n = np.where(regular, n, np.where(finite, 0.0, x))
+    return m, n
+
+
+def normalize(x, base = 10):
+    """
+    For an array of numbers x and a base b > 1, returns arrays (m, n) with
+    1 <= |m| < b and x = m * b^n, elementwise, keeping the special cases
+    of exp_tuple().
+
+    This is exp_tuple() with normalize=True, followed by a correction of
+    one step wherever rounding in the logarithm left |m| just outside
+    [1, b).
+    """
+    m, n = exp_tuple(x, base, True)
+    regular = np.isfinite(m) & (m != 0)
+    a = np.abs(m)
+
+    high = regular & (a >= base)
+    low = regular & (a < 1)
+    if high.any() or low.any():
+        x = np.asarray(x, dtype = np.float64)
+        with np.errstate(invalid = 'ignore'):
+            n = n + high - low
+        with np.errstate(over = 'ignore', invalid = 'ignore'):
+            m = np.where(high | low, _scale(x, n, base), m)
+    return m, n
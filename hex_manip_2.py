@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import exp_notation
-import math
 import re
 import sys
 
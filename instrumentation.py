@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+"""
+Opt-in call counters, timings and input-size histograms for the
+conversion functions.
+
+Nothing is measured until install() is called. It replaces each target
+function in its module with a wrapper that counts calls and errors, adds
+up the time spent, and counts the size of the first argument in
+power-of-two buckets. uninstall() puts the original functions back, so
+when instrumentation is off there is no wrapper and no cost at all.
+
+Where a function returns a generator, as split_and_fill() does, the
+time spent producing its items is added to it as they are consumed. That
+time is then also inside the consumer's time, e.g. int_to_dd() of a
+hex_to_int() generator.
+
+Only calls made through the module attribute are seen, e.g.
+address_converter.int_to_dd(...). A reference taken before install(), as
+by `from address_converter import int_to_dd`, by conversion_cache or by
+the default `convert` of convert_stream(), keeps calling the original.
+The default targets include the parse and format steps that
+convert_token() and dd_to_token() call through their module, so those
+are seen whichever way the conversion is reached.
+
+The entry points (address_converter.py, cli.py and conversion_server.py)
+call install_from_env() when the environment variable
+CONVERTER_INSTRUMENT is set to anything but "" or "0". With
+CONVERTER_INSTRUMENT_OUTPUT set to a path, the stats are then written
+there on SIGUSR1 and at exit, as JSON if the path ends in .json and as
+Prometheus text otherwise. Without it, SIGUSR1 writes the Prometheus text
+to stderr.
+
+    import instrumentation
+    instrumentation.install()
+    ...
+    print(instrumentation.to_prometheus())
+"""
+
+import atexit
+import functools
+import importlib
+import json
+import math
+import os
+import signal
+import sys
+import threading
+import types
+from time import perf_counter_ns
+
+
+_env = "CONVERTER_INSTRUMENT"
+_env_output = "CONVERTER_INSTRUMENT_OUTPUT"
+
+# Functions instrumented by default, as (module, function name)
+targets = (
+        ("address_converter", "convert_token"),
+        ("address_converter", "parse_token"),
+        ("address_converter", "bytes_to_dd"),
+        ("address_converter", "dd_to_token"),
+        ("address_converter", "dd_to_tokens"),
+        ("address_converter", "parse_dd"),
+        ("address_converter", "split_and_fill"),
+        ("address_converter", "split_in_pairs"),
+        ("address_converter", "hex_to_int"),
+        ("address_converter", "int_to_dd"),
+        ("address_numpy", "tokens_to_dd"),
+        ("exp_notation", "exp_tuple"),
+        ("exp_notation", "normalize"),
+        ("exp_notation", "hex_manip"),
+        ("address_calculator", "num_addresses")
+        )
+
+# Upper bounds of the size histogram buckets: 0, 1, 2, 4, ... 2**16
+_bounds = (0,) + tuple(1 << i for i in range(17))
+
+
+def input_size(x):
+    """
+    Returns the size counted for an argument: its length if it has one,
+    the bit length of an integer, or the magnitude of the binary exponent
+    of a float. Returns None for anything else, e.g. a generator.
+    """
+    if isinstance(x, float):
+        return abs(math.frexp(x)[1]) if math.isfinite(x) else None
+    if isinstance(x, int):
+        return x.bit_length()
+    try:
+        return len(x)
+    except TypeError:
+        return None
+
+
+class FunctionStats:
+    """Counters for one instrumented function."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = self.errors = self.ns = 0
+        # buckets[i] counts sizes <= _bounds[i] and above the bound before;
+        # the last entry counts sizes above every bound
+        self.buckets = [0] * (len(_bounds) + 1)
+        self.unsized = self.size_sum = 0
+        self._lock = threading.Lock()
+
+    def record(self, ns, size, error = False):
+        with self._lock:
+            self.calls += 1
+            self.ns += ns
+            if error:
+                self.errors += 1
+            if size is None:
+                self.unsized += 1
+            else:
+                self.buckets[_bucket(size)] += 1
+                self.size_sum += size
+
+    def reset(self):
+        with self._lock:
+            self.calls = self.errors = self.ns = 0
+            self.buckets = [0] * (len(_bounds) + 1)
+            self.unsized = self.size_sum = 0
+
+    def add_time(self, ns):
+        with self._lock:
+            self.ns += ns
+
+    def snapshot(self):
+        """Returns the counters as a dict of plain values."""
+        with self._lock:
+            cumulative = []
+            total = 0
+            for b, n in zip(_bounds, self.buckets):
+                total += n
+                cumulative.append((str(b), total))
+            cumulative.append(("+Inf", total + self.buckets[-1]))
+            return {
+                    "calls": self.calls,
+                    "errors": self.errors,
+                    "seconds": self.ns / 1e9,
+                    "size_buckets": dict(cumulative),
+                    "size_sum": self.size_sum,
+                    "unsized": self.unsized
+                    }
+
+
+def _bucket(size):
+    if size <= 0:
+        return 0
+    # The bucket of bound 2**k holds sizes in (2**(k-1), 2**k]
+    return min((size - 1).bit_length() + 1, len(_bounds))
+
+
+# Installed wrappers, keyed by "module.function", as (module, name, original, stats)
+_installed = {}
+
+
+def _timed(gen, stats):
+    """Yields from the generator `gen`, adding the time spent in it to `stats`."""
+    while True:
+        start = perf_counter_ns()
+        try:
+            x = next(gen)
+        except StopIteration:
+            stats.add_time(perf_counter_ns() - start)
+            return
+        stats.add_time(perf_counter_ns() - start)
+        yield x
+
+
+def _wrap(func, stats):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        size = input_size(args[0]) if args else None
+        start = perf_counter_ns()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            stats.record(perf_counter_ns() - start, size, True)
+            raise
+        stats.record(perf_counter_ns() - start, size)
+        # Functions returning a generator do their work as it is consumed
+        if isinstance(result, types.GeneratorType):
+            return _timed(result, stats)
+        return result
+
+    return wrapper
+
+
+def install(functions = targets):
+    """
+    Instruments each (module, function name) in `functions`, importing the
+    modules as needed. Functions already instrumented are left as they are.
+    """
+    for module_name, name in functions:
+        key = module_name + "." + name
+        if key in _installed:
+            continue
+        module = importlib.import_module(module_name)
+        original = getattr(module, name)
+        stats = FunctionStats(key)
+        setattr(module, name, _wrap(original, stats))
+        _installed[key] = (module, name, original, stats)
+
+
+def uninstall():
+    """Restores every instrumented function and discards its stats."""
+    for module, name, original, _ in _installed.values():
+        setattr(module, name, original)
+    _installed.clear()
+
+
+def installed():
+    return bool(_installed)
+
+
+def reset():
+    """Zeroes the stats of every instrumented function."""
+    for _, _, _, stats in _installed.values():
+        stats.reset()
+
+
+def snapshot():
+    """Returns a dict of FunctionStats.snapshot() keyed by "module.function"."""
+    return dict((key, v[3].snapshot()) for key, v in _installed.items())
+
+
+def to_json():
+    return json.dumps(snapshot(), indent = 2)
+
+
+def _escape(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(prefix = "converter"):
+    """Returns the stats in the Prometheus text exposition format."""
+    snap = snapshot()
+    lines = []
+
+    def metric(name, kind, help_text, field):
+        lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+        lines.append("# TYPE {}_{} {}".format(prefix, name, kind))
+        for key, s in snap.items():
+            lines.append('{}_{}{{function="{}"}} {}'.format(prefix, name, _escape(key), s[field]))
+
+    metric("calls_total", "counter", "Calls to the function.", "calls")
+    metric("errors_total", "counter", "Calls that raised an exception.", "errors")
+    metric("seconds_total", "counter", "Time spent in the function.", "seconds")
+
+    name = prefix + "_input_size"
+    lines.append("# HELP {} Size of the first argument of each call.".format(name))
+    lines.append("# TYPE {} histogram".format(name))
+    for key, s in snap.items():
+        label = _escape(key)
+        for le, n in s["size_buckets"].items():
+            lines.append('{}_bucket{{function="{}",le="{}"}} {:d}'.format(name, label, le, n))
+        lines.append('{}_sum{{function="{}"}} {:d}'.format(name, label, s["size_sum"]))
+        lines.append('{}_count{{function="{}"}} {:d}'.format(name, label, s["size_buckets"]["+Inf"]))
+    return "\n".join(lines) + "\n"
+
+
+def dump(path = None):
+    """
+    Writes the stats to `path`, as JSON if it ends in .json and as
+    Prometheus text otherwise, or as Prometheus text to stderr.
+    """
+    if path is None:
+        sys.stderr.write(to_prometheus())
+        sys.stderr.flush()
+        return
+    text = to_json() + "\n" if path.endswith(".json") else to_prometheus()
+    # Written whole and renamed, so a reader never sees a partial dump
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def install_signal_handler(signum = getattr(signal, "SIGUSR1", None), path = None):
+    """Makes signal `signum` write the stats with dump(path)."""
+    if signum is None:
+        raise ValueError("No signal given, and this platform has no SIGUSR1.")
+    signal.signal(signum, lambda *_: dump(path))
+
+
+def install_from_env():
+    """
+    Installs the default instrumentation if CONVERTER_INSTRUMENT is set
+    and not "0", with a SIGUSR1 handler and, given
+    CONVERTER_INSTRUMENT_OUTPUT, a dump at exit. Returns True if installed.
+    """
+    if os.environ.get(_env, "") in ("", "0"):
+        return False
+    install()
+    path = os.environ.get(_env_output) or None
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        install_signal_handler(signal.SIGUSR1, path)
+    if path:
+        atexit.register(dump, path)
+    return True
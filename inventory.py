@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+Sorting, deduplicating and comparing address inventories larger than
+memory.
+
+An inventory is a text file of addresses, one per line, such as the
+tokens collected from `ip token` on many hosts. Each address is parsed once
+into a fixed-width binary record (see address_records), right-aligned, so
+that comparing records as bytes compares the addresses as integers.
+
+sort_file() collects records into a set until `memory` bytes' worth are
+held, then writes them sorted to a temporary spill file and starts
+another. The spill files are merged, at most `_fanin` at a time, into one
+sorted file of distinct records. If the whole inventory fits in memory
+nothing is spilled.
+
+diff() walks two sorted streams of distinct records side by side and
+tags each record as added, removed or unchanged, in a single pass.
+diff_files() does both for two text inventories and writes each stream as
+text:
+
+    with open("monday.txt") as old, open("tuesday.txt") as new, \\
+            open("added.txt", 'w') as added:
+        counts = inventory.diff_files(old, new, added = added)
+"""
+
+import heapq
+import os
+import tempfile
+
+import address_records
+from address_array import AddressArray
+
+
+# Default memory budget for the records held while sorting, in bytes
+_memory = 64 << 20
+# Bytes of memory a record costs while held for sorting, on top of its own
+# width: the bytes object itself and its set and list entries
+_record_overhead = 100
+# Most spill files merged at once
+_fanin = 64
+# Records formatted or written at a time
+_block = 4096
+
+
+def _records(data, width):
+    return (data[i:i + width] for i in range(0, len(data), width))
+
+
+def _iter_file(path, width):
+    """Yields the records of a record file, read from the mapped file."""
+    with AddressArray.load(path, width) as a:
+        yield from a.records()
+
+
+def _unique(records):
+    """Yields the distinct records of a sorted stream."""
+    prev = None
+    for r in records:
+        if r != prev:
+            yield r
+            prev = r
+
+
+def _write_records(records, path):
+    """Writes a stream of records to `path` and returns their number."""
+    count = 0
+    block = []
+    with open(path, 'wb') as f:
+        for r in records:
+            block.append(r)
+            if len(block) >= _block:
+                f.write(b''.join(block))
+                count += len(block)
+                block.clear()
+        f.write(b''.join(block))
+    return count + len(block)
+
+
+def _merge(paths, path, width):
+    """Merges sorted record files into one sorted file of distinct records."""
+    return _write_records(_unique(heapq.merge(*[_iter_file(p, width) for p in paths])), path)
+
+
+def sort_records(chunks, path, width = 16, memory = _memory, tmpdir = None):
+    """
+    Takes an iterable of bytes objects of packed `width`-byte records and
+    writes the distinct records, in numeric order, to the record file
+    `path`, spilling to temporary files in `tmpdir` when they do not fit in
+    `memory` bytes. Returns the number of records written.
+    """
+    per_run = max(1, memory // (width + _record_overhead))
+    with tempfile.TemporaryDirectory(dir = tmpdir) as d:
+        runs = []
+        held = set()
+        for data in chunks:
+            held.update(_records(data, width))
+            if len(held) >= per_run:
+                runs.append(os.path.join(d, "run{:d}".format(len(runs))))
+                _write_records(sorted(held), runs[-1])
+                held.clear()
+        if not runs:
+            return _write_records(sorted(held), path)
+        if held:
+            runs.append(os.path.join(d, "run{:d}".format(len(runs))))
+            _write_records(sorted(held), runs[-1])
+        del held
+
+        merged = 0
+        while len(runs) > _fanin:
+            group, runs = runs[:_fanin], runs[_fanin:]
+            runs.append(os.path.join(d, "merge{:d}".format(merged)))
+            merged += 1
+            _merge(group, runs[-1], width)
+            for p in group:
+                os.unlink(p)
+        return _merge(runs, path, width)
+
+
+def sort_file(infile, path, width = 16, style = "hex", memory = _memory, tmpdir = None,
+        errfile = None):
+    """
+    Reads a text inventory from `infile`, parsed according to `style`, and
+    writes its distinct addresses in numeric order to the record file
+    `path` with sort_records(). Bad lines are reported to `errfile` as in
+    address_records.pack_chunks() and left out.
+
+    Returns a pair (distinct addresses, bad lines).
+    """
+    errors = 0
+
+    def chunks():
+        nonlocal errors
+        for data, _, bad in address_records.pack_chunks(infile, width, style, errfile):
+            errors += bad
+            yield data
+
+    count = sort_records(chunks(), path, width, memory, tmpdir)
+    return count, errors
+
+
+def diff(old, new):
+    """
+    Takes two iterables of distinct records in sorted order and yields a
+    pair (tag, record) for every record in either, in order, where `tag` is
+    "removed" for a record only in `old`, "added" for one only in `new`,
+    and "unchanged" for one in both.
+    """
+    old = iter(old)
+    new = iter(new)
+    a = next(old, None)
+    b = next(new, None)
+    while a is not None and b is not None:
+        if a < b:
+            yield "removed", a
+            a = next(old, None)
+        elif b < a:
+            yield "added", b
+            b = next(new, None)
+        else:
+            yield "unchanged", a
+            a = next(old, None)
+            b = next(new, None)
+    while a is not None:
+        yield "removed", a
+        a = next(old, None)
+    while b is not None:
+        yield "added", b
+        b = next(new, None)
+
+
+class _TextSink:
+    """Formats records a block at a time and writes them one per line."""
+
+    def __init__(self, outfile, width, style):
+        self._f = outfile
+        self._width = width
+        self._style = style
+        self._block = []
+
+    def add(self, record):
+        self._block.append(record)
+        if len(self._block) >= _block:
+            self.flush()
+
+    def flush(self):
+        if self._block:
+            out = address_records.format_records(b''.join(self._block), self._width, self._style)
+            out.append('')
+            self._f.write('\n'.join(out))
+            self._block.clear()
+
+
+def diff_files(old, new, added = None, removed = None, unchanged = None, width = 16,
+        style = "hex", out_style = None, memory = _memory, tmpdir = None, errfile = None):
+    """
+    Compares the text inventories read from `old` and `new`, parsed
+    according to `style`, and writes the added, removed and unchanged
+    addresses, in numeric order, to the text files given for them, as
+    `out_style` (`style` by default). Streams given as None are only
+    counted. Each inventory is sorted with sort_file(), within `memory`
+    bytes each; bad lines are reported to `errfile` and left out.
+
+    Returns a dict of counts: "added", "removed", "unchanged" and "errors".
+    """
+    if out_style is None:
+        out_style = style
+    counts = {"added": 0, "removed": 0, "unchanged": 0, "errors": 0}
+    sinks = {}
+    for tag, f in (("added", added), ("removed", removed), ("unchanged", unchanged)):
+        if f is not None:
+            sinks[tag] = _TextSink(f, width, out_style)
+
+    with tempfile.TemporaryDirectory(dir = tmpdir) as d:
+        paths = os.path.join(d, "old"), os.path.join(d, "new")
+        for f, path in zip((old, new), paths):
+            counts["errors"] += sort_file(f, path, width, style, memory, d, errfile)[1]
+        for tag, record in diff(_iter_file(paths[0], width), _iter_file(paths[1], width)):
+            counts[tag] += 1
+            sink = sinks.get(tag)
+            if sink is not None:
+                sink.add(record)
+    for sink in sinks.values():
+        sink.flush()
+    return counts
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+"""
+Follows a growing log of tokens, converting only what has been appended.
+
+A Follower remembers the device, inode and byte offset of the data it has
+consumed in a small checkpoint file, so each poll reads from that offset
+to the end of the file and nothing before it. Only complete lines are
+returned; a partial last line is left for the next poll.
+
+Rotation is noticed when the path names a new file. The rest of the old
+file is read first, a chunk per poll, then following moves to the start
+of the new one. On
+restart, a checkpoint whose file has been rotated away is found again
+under the rotated names (`path`.1 by default), so lines appended between
+the last poll and the rotation are not lost. The last bytes before the
+offset are kept as well, and checked before each read: a file that has
+shrunk below the offset, or whose bytes there have changed, as after
+copytruncate and new writes, is read again from the start.
+
+Lines are counted from the start of the file being followed, and the
+count is kept in the checkpoint, so errors can name the line they are on.
+
+The checkpoint is written only by commit(), after the caller has handled
+what poll() returned, so a crash between the two repeats a batch rather
+than dropping one.
+
+    python3 log_follow.py /var/log/tokens.log -c tokens.ckpt >> converted.txt
+"""
+
+import json
+import os
+import sys
+import time
+
+import address_converter
+
+
+# Seconds between polls once the end of the file is reached
+_interval = 1.0
+# Bytes before the offset kept to recognise the file again
+_tail_size = 64
+
+
+def _file_id(st):
+    return st.st_dev, st.st_ino
+
+
+class Follower:
+    """
+    Follows the file at `path`, resuming from the checkpoint file
+    `checkpoint` if given and present. `rotated` lists the names the file
+    may have been rotated to, searched on restart. Each poll returns at
+    most about `chunk_size` bytes of lines, all from one file, and sets
+    `lineno` to the number of lines in that file before them.
+    """
+
+    def __init__(self, path, checkpoint = None, rotated = None,
+            chunk_size = address_converter._chunk_size):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        if rotated is None:
+            rotated = [path + ".1"]
+        self._f = None
+        self._id = None
+        self.offset = 0
+        self.lineno = 0
+        self._lines = 0
+        self._tail = b''
+
+        state = self._load()
+        if state is not None:
+            for p in [path] + list(rotated):
+                try:
+                    f = open(p, 'rb')
+                except FileNotFoundError:
+                    continue
+                st = os.fstat(f.fileno())
+                if _file_id(st) == state[:2] and st.st_size >= state[2]:
+                    self._use(f, st, *state[2:])
+                    if not self._moved():
+                        break
+                    self._f = None
+                f.close()
+        if self._f is None:
+            self._open_path()
+
+    def _load(self):
+        if self.checkpoint is None:
+            return None
+        try:
+            with open(self.checkpoint) as f:
+                c = json.load(f)
+            # Checkpoints without a line count number lines from there
+            return c["dev"], c["inode"], c["offset"], bytes.fromhex(c["tail"]), c.get("line", 0)
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError("Bad checkpoint file {!r}: {}".format(self.checkpoint, e)) from None
+
+    def _use(self, f, st, offset, tail = b'', lines = 0):
+        if self._f is not None and self._f is not f:
+            self._f.close()
+        self._f = f
+        self._id = _file_id(st)
+        self.offset = offset
+        self._tail = tail
+        self._lines = lines
+        f.seek(offset)
+
+    def _moved(self):
+        """Whether the bytes before the offset are no longer the ones read."""
+        n = len(self._tail)
+        return n and os.pread(self._f.fileno(), n, self.offset - n) != self._tail
+
+    def _open_path(self):
+        """Starts following the file now at `path` from its start, if there is one."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        self._use(f, os.fstat(f.fileno()), 0)
+        return True
+
+    def _read(self, partial = False):
+        """
+        Reads about `chunk_size` bytes of lines. A partial last line is left
+        for the next poll unless `partial` is True.
+        """
+        lines = self._f.readlines(self.chunk_size)
+        if lines and not partial and not lines[-1].endswith(b'\n'):
+            # Leave a partial line for the next poll
+            self._f.seek(-len(lines.pop()), os.SEEK_CUR)
+        if lines:
+            data = b''.join(lines[-_tail_size:])
+            self.offset += sum(map(len, lines))
+            self._lines += len(lines)
+            self._tail = (self._tail + data[-_tail_size:])[-_tail_size:]
+        return lines
+
+    def poll(self):
+        """
+        Returns the complete lines appended since the last poll, as str with
+        their line endings, or an empty list if there are none yet.
+        """
+        if self._f is None and not self._open_path():
+            return []
+        if self._moved():
+            # Truncated and written again
+            self._use(self._f, os.fstat(self._f.fileno()), 0)
+        start = self._lines
+        lines = self._read()
+        if not lines:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                # Rotated, and the new file not created yet
+                return []
+            if _file_id(st) != self._id:
+                # Rotated: the old file is finished a chunk at a time,
+                # including any last line without a newline, and then
+                # following moves to the new one
+                lines = self._read(True)
+                if not lines and self._open_path():
+                    start = 0
+                    lines = self._read()
+            elif st.st_size < self.offset:
+                # Truncated in place
+                self._use(self._f, st, 0)
+                start = 0
+                lines = self._read()
+        self.lineno = start
+        return [line.decode('ascii', 'replace') for line in lines]
+
+    def state(self):
+        """Returns the checkpoint as a dict: path, dev, inode, offset, tail and line."""
+        dev, inode = self._id if self._id is not None else (None, None)
+        return {"path": self.path, "dev": dev, "inode": inode, "offset": self.offset,
+                "tail": self._tail.hex(), "line": self._lines}
+
+    def commit(self):
+        """Writes the position after the last poll to the checkpoint file, if there is one."""
+        if self.checkpoint is None or self._id is None:
+            return
+        # Written whole and renamed, so a crash never leaves a partial checkpoint
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, self.checkpoint)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def follow(path, outfile, checkpoint = None, errfile = None, convert = address_converter.convert_token,
+        interval = _interval, once = False, rotated = None):
+    """
+    Converts the lines appended to the file at `path` with `convert`, a
+    batch per poll, writing and flushing the results to `outfile` and
+    reporting bad lines to `errfile` as convert_stream() does, after
+    `path`, then
+    committing the checkpoint. Polls every `interval` seconds at the end of
+    the file; with `once`, returns there instead of waiting for more.
+
+    Returns a pair (converted, errors) of line counts.
+    """
+    if errfile is None:
+        errfile = sys.stderr
+
+    converted = errors = 0
+    with Follower(path, checkpoint, rotated) as f:
+        while True:
+            lines = f.poll()
+            if not lines:
+                if once:
+                    break
+                time.sleep(interval)
+                continue
+
+            out, bad = address_converter.convert_lines(lines, convert)
+            for i, token, e in bad:
+                errfile.write("{}: ".format(path)
+                        + address_converter._error_format.format(f.lineno + i + 1, token, e))
+            errors += len(bad)
+            if out:
+                converted += len(out)
+                out.append('')
+                outfile.write('\n'.join(out))
+            outfile.flush()
+            errfile.flush()
+            f.commit()
+    return converted, errors
+
+
+def _parse_args(argv = None):
+    import argparse
+    parser = argparse.ArgumentParser(description = "Convert the tokens appended to a log file.")
+    parser.add_argument("path", help = "log file with one token per line")
+    parser.add_argument("-c", "--checkpoint", help = "file recording how far the log has been read")
+    parser.add_argument("-r", "--reverse", action = 'store_true',
+            help = "convert dot-decimal addresses to colon-hex")
+    parser.add_argument("-i", "--interval", type = float, default = _interval,
+            help = "seconds between polls at the end of the log (default: %(default)s)")
+    parser.add_argument("--once", action = 'store_true',
+            help = "stop at the end of the log instead of waiting for more")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = _parse_args(argv)
+    convert = address_converter.dd_to_token if args.reverse else address_converter.convert_token
+    try:
+        _, errors = follow(args.path, sys.stdout, args.checkpoint, convert = convert,
+                interval = args.interval, once = args.once)
+    except KeyboardInterrupt:
+        return 0
+    except ValueError as e:
+        print(e, file = sys.stderr)
+        return 1
+    return 1 if errors and args.once else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
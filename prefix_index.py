@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Longest-prefix-match index over a table of IPv4 and IPv6 prefixes.
+
+The prefixes of each version are flattened into sorted, non-overlapping
+address intervals, each owned by the longest prefix that covers it (or by
+none). A lookup is then a single bisect over the interval starts, so the
+cost is O(log n) however deeply the prefixes nest.
+
+The index can be saved to a flat file and loaded again with mmap, so a
+large table is used straight from the page cache instead of being rebuilt:
+
+    index = PrefixIndex(["10.0.0.0/8", "10.1.0.0/16", "2001:db8::/32"])
+    index.lookup("10.1.2.3")            # "10.1.0.0/16"
+    index.save("prefixes.idx")
+    index = PrefixIndex.load("prefixes.idx")
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+import address_calculator
+
+
+_magic = b'LPMIDX\x00\x01'
+# Magic, then interval and prefix counts for IPv4 and for IPv6
+_header = struct.Struct('<8s4Q')
+# Sections are padded to this many bytes so every array starts aligned
+_align = 8
+# Bytes per IPv6 address
+_wide = 16
+
+
+class _WideArray:
+    """
+    A read-only sequence of integers stored as 16-byte big-endian records
+    in a buffer, indexable by bisect.
+    """
+
+    def __init__(self, buf):
+        self._buf = memoryview(buf)
+
+    def __len__(self):
+        return len(self._buf) // _wide
+
+    def __getitem__(self, i):
+        return int.from_bytes(self._buf[i * _wide:(i + 1) * _wide], 'big')
+
+
+class _Table:
+    """The flattened intervals and the prefix table of one IP version."""
+
+    def __init__(self, version, starts, owners, networks, lengths):
+        self.version = version
+        # starts[i] is the first address of interval i, owned by prefix
+        # owners[i] (-1 for none), which is networks[j]/lengths[j].
+        self.starts = starts
+        self.owners = owners
+        self.networks = networks
+        self.lengths = lengths
+
+    def owner(self, n):
+        """Returns the index of the longest prefix covering `n`, or -1."""
+        return self.owners[bisect_right(self.starts, n) - 1]
+
+
+def _flatten(prefixes, address_length):
+    """
+    Takes a list of (network, prefix_length) and returns lists (starts,
+    owners) of the intervals they divide the address space into, where
+    owners[i] is the index in `prefixes` of the longest prefix covering
+    interval i, or -1. Of two identical prefixes, the later one wins.
+    """
+    top = 1 << address_length
+    order = sorted(range(len(prefixes)), key = lambda i: (prefixes[i][0], prefixes[i][1], i))
+    starts = []
+    owners = []
+
+    def emit(start, owner):
+        if starts and starts[-1] == start:
+            starts.pop()
+            owners.pop()
+        if not (owners and owners[-1] == owner) and start < top:
+            starts.append(start)
+            owners.append(owner)
+
+    emit(0, -1)
+    # Prefixes nest or are disjoint, so the open ones form a stack of
+    # (last address, index), innermost on top.
+    stack = []
+    for i in order:
+        network, length = prefixes[i]
+        while stack and stack[-1][0] < network:
+            last, _ = stack.pop()
+            emit(last + 1, stack[-1][1] if stack else -1)
+        emit(network, i)
+        stack.append((network + (1 << (address_length - length)) - 1, i))
+    while stack:
+        last, _ = stack.pop()
+        emit(last + 1, stack[-1][1] if stack else -1)
+
+    return starts, owners
+
+
+def _wide_bytes(values):
+    return b''.join(n.to_bytes(_wide, 'big') for n in values)
+
+
+def _build(version, prefixes):
+    address_length = address_calculator._address_lengths[version]
+    starts, owners = _flatten(prefixes, address_length)
+    networks = [p[0] for p in prefixes]
+    lengths = array('B', (p[1] for p in prefixes))
+    if version == 4:
+        return _Table(version, array('I', starts), array('i', owners),
+                array('I', networks), lengths)
+    return _Table(version, _WideArray(_wide_bytes(starts)), array('i', owners),
+            _WideArray(_wide_bytes(networks)), lengths)
+
+
+class PrefixIndex:
+    """
+    Answers longest-prefix-match queries against a fixed table of CIDR
+    prefixes. Prefixes with host bits set raise PrefixError unless `strict`
+    is False, in which case the host bits are cleared.
+    """
+
+    def __init__(self, prefixes = (), strict = True):
+        table = {4: [], 6: []}
+        for cidr in prefixes:
+            network, length, version = address_calculator.parse_prefix(cidr, strict)
+            table[version].append((network, length))
+        self._tables = dict((v, _build(v, p)) for v, p in table.items())
+        self._mmap = None
+
+    def __len__(self):
+        return sum(len(t.lengths) for t in self._tables.values())
+
+    def _prefix(self, table, j):
+        if j < 0:
+            return None
+        return address_calculator.format_prefix(table.networks[j], table.lengths[j], table.version)
+
+    def lookup_int(self, n, version):
+        """
+        Returns the (network, prefix_length) of the longest prefix covering
+        the integer address `n`, or None.
+        """
+        table = self._tables[version]
+        j = table.owner(n)
+        if j < 0:
+            return None
+        return table.networks[j], table.lengths[j]
+
+    def lookup(self, address):
+        """
+        Returns the longest prefix covering `address` as a CIDR string, or
+        None if no prefix covers it.
+        """
+        n, version = address_calculator.parse_address(address)
+        table = self._tables[version]
+        return self._prefix(table, table.owner(n))
+
+    def lookup_many(self, addresses):
+        """Returns a list with the result of lookup() for each address."""
+        parse = address_calculator.parse_address
+        tables = self._tables
+        out = []
+        for address in addresses:
+            n, version = parse(address)
+            table = tables[version]
+            out.append(self._prefix(table, table.owner(n)))
+        return out
+
+    def save(self, path):
+        """
+        Writes the index to `path` in a flat little-endian layout that
+        load() can memory-map.
+        """
+        t4, t6 = self._tables[4], self._tables[6]
+        sections = [
+                array('I', t4.starts), array('i', t4.owners),
+                array('I', t4.networks), t4.lengths,
+                _wide_bytes(t6.starts[i] for i in range(len(t6.starts))),
+                array('i', t6.owners),
+                _wide_bytes(t6.networks[i] for i in range(len(t6.networks))),
+                t6.lengths
+                ]
+        with open(path, 'wb') as f:
+            f.write(_header.pack(_magic, len(t4.starts), len(t4.lengths),
+                    len(t6.owners), len(t6.lengths)))
+            for s in sections:
+                if isinstance(s, array) and s.itemsize > 1 and sys.byteorder != 'little':
+                    s = array(s.typecode, s)
+                    s.byteswap()
+                data = bytes(s)
+                f.write(data)
+                f.write(bytes(-len(data) % _align))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Maps an index written by save() into memory. The arrays are used in
+        place from the mapped file; call close() to release it.
+        """
+        self = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < _header.size:
+                raise ValueError("Not a prefix index file: {!r}.".format(path))
+            mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        view = memoryview(mm)
+        magic, n4, p4, n6, p6 = _header.unpack_from(view)
+        sizes = (n4 * 4, n4 * 4, p4 * 4, p4, n6 * _wide, n6 * 4, p6 * _wide, p6)
+        if magic != _magic:
+            error = "Not a prefix index file: {!r}."
+        elif _header.size + sum(n + (-n % _align) for n in sizes) > len(view):
+            error = "Truncated prefix index file: {!r}."
+        else:
+            error = None
+        if error is not None:
+            # The view must go before the map can be closed
+            view.release()
+            mm.close()
+            raise ValueError(error.format(path))
+
+        offset = _header.size
+
+        def take(count, itemsize, fmt = None):
+            nonlocal offset
+            size = count * itemsize
+            section = view[offset:offset + size]
+            offset += size + (-size % _align)
+            if fmt is None:
+                return section
+            if itemsize > 1 and sys.byteorder != 'little':
+                a = array(fmt, section)
+                a.byteswap()
+                return a
+            return section.cast(fmt)
+
+        t4 = _Table(4, take(n4, 4, 'I'), take(n4, 4, 'i'), take(p4, 4, 'I'), take(p4, 1, 'B'))
+        t6 = _Table(6, _WideArray(take(n6, _wide)), take(n6, 4, 'i'),
+                _WideArray(take(p6, _wide)), take(p6, 1, 'B'))
+        self._tables = {4: t4, 6: t6}
+        self._mmap = (mm, view)
+        return self
+
+    def close(self):
+        """Releases the mapped file of an index returned by load()."""
+        if self._mmap is not None:
+            mm, view = self._mmap
+            self._tables = {}
+            view.release()
+            mm.close()
+            self._mmap = None
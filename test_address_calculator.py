@@ -0,0 +1,101 @@
+"""
+Tests of range_to_prefixes(), summarize() and prefix_info() against the
+ipaddress module.
+
+    python3 -m pytest test_address_calculator.py
+"""
+
+import ipaddress
+import random
+
+import pytest
+
+import address_calculator
+
+
+_rng = random.Random(0)
+
+_networks = {4: ipaddress.IPv4Network, 6: ipaddress.IPv6Network}
+_addresses = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+_lengths = {4: 32, 6: 128}
+
+
+def _random_prefix(rng, version):
+    address_length = _lengths[version]
+    # Mostly long prefixes, so that random ones overlap and touch
+    prefix_length = rng.randrange(address_length - 12, address_length + 1)
+    # A few fixed high bits and random low ones
+    n = rng.randrange(4) << (address_length - 8) | rng.getrandbits(12)
+    n &= address_calculator.netmask(prefix_length, address_length)
+    return _networks[version]((n, prefix_length))
+
+
+@pytest.mark.parametrize("version", [4, 6])
+def test_range_to_prefixes(version):
+    address_length = _lengths[version]
+    ranges = [(0, (1 << address_length) - 1), (0, 0), (1, 1), ((1 << address_length) - 1,) * 2]
+    for _ in range(2000):
+        first = _rng.getrandbits(address_length)
+        last = first + _rng.getrandbits(_rng.randrange(1, 40))
+        ranges.append((first, min(last, (1 << address_length) - 1)))
+
+    address = _addresses[version]
+    for first, last in ranges:
+        expected = [(int(p.network_address), p.prefixlen) for p in
+                ipaddress.summarize_address_range(address(first), address(last))]
+        assert list(address_calculator.range_to_prefixes(first, last, address_length)) == expected
+
+
+def test_summarize():
+    for _ in range(300):
+        prefixes = [_random_prefix(_rng, _rng.choice((4, 6))) for _ in range(_rng.randrange(1, 40))]
+        # Split a few prefixes in two, so adjacent halves must be merged back
+        for p in list(prefixes[:3]):
+            if p.prefixlen < p.max_prefixlen:
+                prefixes.extend(p.subnets())
+        _rng.shuffle(prefixes)
+
+        expected = [str(p) for v in (4, 6) for p in ipaddress.collapse_addresses(
+                q for q in prefixes if q.version == v)]
+        assert address_calculator.summarize(str(p) for p in prefixes) == expected
+
+
+def test_summarize_host_bits():
+    assert address_calculator.summarize(["10.0.0.1/24", "10.0.1.0/24"], False) == ["10.0.0.0/23"]
+    with pytest.raises(address_calculator.PrefixError):
+        address_calculator.summarize(["10.0.0.1/24"])
+
+
+@pytest.mark.parametrize("version", [4, 6])
+def test_prefix_info(version):
+    address_length = _lengths[version]
+    prefixes = [_random_prefix(_rng, version) for _ in range(1000)]
+    prefixes += [_networks[version]((0, n)) for n in (0, 1, address_length - 2,
+            address_length - 1, address_length)]
+    for p in prefixes:
+        info = address_calculator.prefix_info(str(p))
+        assert info["network"] == str(p.network_address)
+        assert info["netmask"] == str(p.netmask)
+        assert info["prefix_length"] == p.prefixlen
+        assert info["version"] == version
+        assert info["num_addresses"] == p.num_addresses
+        if version == 4:
+            # ipaddress follows RFC 3021 for a /31, and a /32 is one host
+            hosts = list(p.hosts()) if p.num_addresses <= 4 else [
+                    p.network_address + 1, p.broadcast_address - 1]
+            assert info["broadcast"] == str(p.broadcast_address)
+            assert info["first"] == str(hosts[0])
+            assert info["last"] == str(hosts[-1])
+        else:
+            # Every IPv6 address in the prefix is usable here, where
+            # ipaddress leaves out the Subnet-Router anycast address
+            assert info["broadcast"] is None
+            assert info["first"] == str(p.network_address)
+            assert info["last"] == str(p.broadcast_address)
+
+
+def test_prefix_info_strict():
+    assert address_calculator.prefix_info("10.1.2.3/8", False)["network"] == "10.0.0.0"
+    for bad in ("10.1.2.3/8", "10.0.0.0/33", "10.0.0/8", "::1/129", "10.0.0.0/", "10.0.0.0/-1"):
+        with pytest.raises(address_calculator.PrefixError):
+            address_calculator.prefix_info(bad)
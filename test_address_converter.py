@@ -0,0 +1,72 @@
+"""
+Tests of the dot-decimal to colon-hex direction of address_converter
+against the ipaddress module.
+
+    python3 -m pytest test_address_converter.py
+"""
+
+import ipaddress
+import random
+
+import pytest
+
+import address_converter
+
+
+_rng = random.Random(0)
+
+
+def _v6_bytes(rng):
+    """16 random octets with runs of zero groups, as real addresses have."""
+    groups = [rng.getrandbits(16) if rng.random() < 0.5 else 0 for _ in range(8)]
+    return b''.join(g.to_bytes(2, 'big') for g in groups)
+
+
+v6 = [_v6_bytes(_rng) for _ in range(3000)] + [bytes(16), b'\x00' * 15 + b'\x01',
+        b'\x00\x01' + bytes(14), bytes(range(16))]
+v4 = [_rng.getrandbits(32).to_bytes(4, 'big') for _ in range(1000)] + [bytes(4), b'\xff' * 4]
+
+
+def test_dd_to_token_matches_ipaddress():
+    for b in v6:
+        dd = address_converter.bytes_to_dd(b)
+        address = ipaddress.IPv6Address(b)
+        assert address_converter.dd_to_token(dd) == address.compressed
+        # Uncompressed, the groups are written without leading zeroes
+        expected = ':'.join("{:x}".format(int(g, 16)) for g in address.exploded.split(':'))
+        assert address_converter.dd_to_token(dd, False) == expected
+
+
+def test_dd_to_token_v4():
+    for b in v4:
+        dd = address_converter.bytes_to_dd(b)
+        assert dd == str(ipaddress.IPv4Address(b))
+        n = int.from_bytes(b, 'big')
+        assert address_converter.dd_to_token(dd) == "{:x}:{:x}".format(n >> 16, n & 0xffff)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_dd_to_tokens_matches_dd_to_token(compress):
+    for group in (v6, v4):
+        addresses = [address_converter.bytes_to_dd(b) for b in group]
+        assert address_converter.dd_to_tokens(addresses, compress) == [
+                address_converter.dd_to_token(a, compress) for a in addresses]
+    mixed = [address_converter.bytes_to_dd(b) for b in v6[:50] + v4[:50]]
+    _rng.shuffle(mixed)
+    assert address_converter.dd_to_tokens(mixed, compress) == [
+            address_converter.dd_to_token(a, compress) for a in mixed]
+
+
+def test_round_trip():
+    for b in v6 + v4:
+        dd = address_converter.bytes_to_dd(b)
+        for compress in (True, False):
+            assert address_converter.convert_token(address_converter.dd_to_token(dd, compress)) == dd
+
+
+def test_bad_addresses():
+    for bad in ("", "256.0.0.1", "1.2.3.4.", "1..2.3", "a.b.c.d", "01.2.3.4x", " 1.2.3.4"):
+        with pytest.raises(address_converter.TokenError):
+            address_converter.dd_to_token(bad)
+        with pytest.raises(address_converter.TokenError):
+            address_converter.dd_to_tokens(["1.2.3.4", bad])
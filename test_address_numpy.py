@@ -0,0 +1,107 @@
+"""
+Tests of the NumPy token backend against address_converter.parse_token()
+and int_to_dd(), which must accept and reject the same tokens.
+
+    python3 -m pytest test_address_numpy.py
+"""
+
+import random
+
+import pytest
+
+import address_converter
+import address_numpy
+
+np = pytest.importorskip("numpy")
+
+
+_rng = random.Random(0)
+
+
+def _group(rng):
+    return ''.join(rng.choice("0123456789abcdefABCDEF") for _ in range(rng.randrange(5)))
+
+
+def _valid_tokens(rng, count = 2000):
+    """Random tokens, mostly valid; an empty group can add a second '::'."""
+    tokens = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            tokens.append(':'.join(_group(rng) for _ in range(rng.randrange(1, 9))))
+        else:
+            # A '::' with up to 7 groups around it
+            head = rng.randrange(8)
+            tail = rng.randrange(8 - head)
+            tokens.append(':'.join(_group(rng) or '0' for _ in range(head)) + "::"
+                    + ':'.join(_group(rng) or '0' for _ in range(tail)))
+    return tokens
+
+
+valid = _valid_tokens(_rng) + [
+        "", "0", "dead:beef", "DEAD:BEEF", "::", "::1", "1::", "fe80::1:2", "1:2:3:4:5:6:7:8",
+        "1:2:3:4:5:6::7", "::2:3:4:5:6:7:8", "1:2:3:4:5:6:7::", ":", ":a", "a:"]
+
+invalid = [
+        # Bad characters, including non-ASCII digits and NULs anywhere
+        "g", "dead:beeg", "de ad", "1.2", "-1", "dead:beef ", "٣", "café",
+        "de\x00ad:beef", "\x00dead", "dead:beef\x00", "\x00", "::\x001",
+        # Groups of more than 4 digits
+        "12345", "1:12345", "0dead:beef",
+        # '::' that cannot be expanded
+        ":::", "a::b::c", "1:2:3:4::5:6:7:8", "1:2:3:4:5:6:7:8::", "::1:2:3:4:5:6:7:8",
+        ":1::2", "1::2:", "a" * 40]
+
+# More than 8 groups do not fit the backend's 16-octet rows, but are valid
+# tokens for parse_token()
+long_tokens = ["1:2:3:4:5:6:7:8:9", "abcd:" * 8 + "1", ':'.join(["ffff"] * 12)]
+
+
+def _reference(token):
+    try:
+        return address_converter.int_to_dd(address_converter.parse_token(token))
+    except address_converter.TokenError:
+        return ''
+
+
+@pytest.mark.parametrize("tokens", [valid, invalid, long_tokens, valid + invalid + long_tokens])
+def test_tokens_to_dd_matches_parse_token(tokens):
+    expected = [_reference(t) for t in tokens]
+    assert address_numpy.tokens_to_dd(tokens, strict = False) == expected
+
+
+def test_parse_tokens_matches_parse_token():
+    # Random groups may be empty, which makes some tokens bad
+    accepted = [t for t in valid if _reference(t)]
+    assert len(accepted) > len(valid) // 2
+    matrix, nbytes = address_numpy.parse_tokens(accepted)
+    for t, row, n in zip(accepted, matrix, nbytes):
+        octets = address_converter.parse_token(t)
+        assert int(n) == len(octets)
+        assert row[16 - len(octets):].tobytes() == octets
+        assert not row[:16 - len(octets)].any()
+
+    matrix, nbytes = address_numpy.parse_tokens(invalid + long_tokens, strict = False)
+    assert not nbytes.any()
+    assert not matrix.any()
+
+
+def test_bytes_tokens():
+    tokens = [t.encode('latin-1') for t in valid + invalid if t.isascii()]
+    expected = [_reference(t.decode('latin-1')) for t in tokens]
+    assert address_numpy.tokens_to_dd(tokens, strict = False) == expected
+
+
+def test_strict():
+    for bad in invalid:
+        with pytest.raises(address_converter.TokenError):
+            address_numpy.tokens_to_dd(["dead:beef", bad, "::1"])
+        with pytest.raises(address_converter.TokenError):
+            address_numpy.parse_tokens(["dead:beef", bad])
+    assert address_numpy.tokens_to_dd(long_tokens) == [_reference(t) for t in long_tokens]
+
+
+def test_without_numpy(monkeypatch):
+    tokens = valid + invalid + long_tokens
+    expected = address_numpy.tokens_to_dd(tokens, strict = False)
+    monkeypatch.setattr(address_numpy, "np", None)
+    assert address_numpy.tokens_to_dd(tokens, strict = False) == expected
@@ -0,0 +1,84 @@
+"""
+Tests of the columnar export of exp_tuple() and hex_manip() results, with
+and without NumPy.
+
+    python3 -m pytest test_columnar.py
+"""
+
+import math
+import random
+import struct
+
+import pytest
+
+import columnar
+import exp_notation
+
+np = pytest.importorskip("numpy")
+
+
+def _floats(rng):
+    out = [struct.unpack('<d', rng.getrandbits(64).to_bytes(8, 'little'))[0] for _ in range(2000)]
+    out += [math.ldexp(rng.random(), rng.randrange(-1100, 1024)) for _ in range(500)]
+    # Subnormals, zeros, the top of the range, and the values with short mantissas
+    out += [5e-324, -5e-324, 1e-320, 2.2250738585072014e-308 / 3, 0.0, -0.0,
+            1.7976931348623157e+308, 1.0, 1.5, 3.0, 1024.0, math.inf, -math.inf, math.nan]
+    return out
+
+
+floats = _floats(random.Random(0))
+
+
+def _columns(func, *args, **kwargs):
+    """Runs `func` with NumPy, then without, and returns both results."""
+    with_numpy = func(*args, **kwargs)
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(columnar, "np", None)
+        without = func(*args, **kwargs)
+    return with_numpy, without
+
+
+def _same_column(a, b):
+    assert (a.kind, len(a), a.valid()) == (b.kind, len(b), b.valid())
+    if a.kind == "string":
+        assert (bytes(a.data), list(a.offsets)) == (bytes(b.data), list(b.offsets))
+    else:
+        # Null rows store 0 on both paths
+        assert bytes(a.data) == bytes(b.data)
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+@pytest.mark.parametrize("base", [2, 10, 16, 1000])
+def test_exp_columns_paths_agree(base, normalize):
+    with_numpy, without = _columns(columnar.exp_columns, floats, base, normalize)
+    for name in ("mantissa", "exponent"):
+        _same_column(with_numpy[name], without[name])
+
+    valid = with_numpy["exponent"].valid()
+    mantissas = with_numpy["mantissa"].to_numpy()
+    for x, ok, m in zip(floats, valid, mantissas.tolist()):
+        assert ok == math.isfinite(x)
+        expected = exp_notation.exp_tuple(x, base, normalize)[0]
+        assert m == expected or m != m and expected != expected
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+@pytest.mark.parametrize("display_base", [2, 8, 16, 32, 64])
+def test_hex_manip_columns(display_base, normalize):
+    with_numpy, without = _columns(columnar.hex_manip_columns, floats, display_base, normalize)
+    for name in ("mantissa", "numerator", "denominator"):
+        _same_column(with_numpy[name], without[name])
+
+    cols = with_numpy
+    offsets, data, mask = cols["mantissa"].to_numpy()
+    numerators = cols["numerator"].to_numpy()
+    denominators = cols["denominator"].to_numpy()
+    for i, f in enumerate(floats):
+        # Only ±inf and NaN are null
+        assert mask[i] == (not math.isfinite(f))
+        if mask[i]:
+            continue
+        m, (n, d), _, _ = exp_notation.hex_manip(f, display_base, normalize)
+        assert data[offsets[i]:offsets[i + 1]].tobytes().decode() == m
+        assert exp_notation._radix_conv(int(numerators[i]), display_base) == n
+        assert str(denominators[i]) == d
@@ -0,0 +1,232 @@
+"""
+Tests of conversion_server.py over TCP on the loopback interface, with
+Client and with raw protocol lines.
+
+    python3 -m pytest test_conversion_server.py
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import address_converter
+import conversion_server
+import exp_notation
+from conversion_server import Client, ConversionServer, RemoteError
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+async def _start(**kwargs):
+    server = ConversionServer(**kwargs)
+    port = await server.start_tcp(port = 0)
+    return server, port
+
+
+async def _exchange(port, requests):
+    """Sends request dicts (or raw lines) all at once, then reads one response each."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b''.join((r if isinstance(r, bytes) else json.dumps(r).encode()) + b'\n'
+            for r in requests))
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def _tokens(n):
+    return ["{:x}:{:x}".format(i, i * 7 & 0xffff) for i in range(n)]
+
+
+def test_client_calls():
+    async def main():
+        server, port = await _start()
+        client = await Client.open_tcp(port = port)
+        try:
+            assert await client.call("convert_token", "dead:beef") == "222.173.190.239"
+            assert await client.call("dd_to_token", "222.173.190.239") == "dead:beef"
+            assert await client.call("num_addresses", 24, 32) == 256
+            assert await client.call("normalize", 1500.0) == [1.5, 3, 10]
+            results = await asyncio.gather(*[client.call("convert_token", t) for t in _tokens(300)])
+            assert results == [address_converter.convert_token(t) for t in _tokens(300)]
+        finally:
+            await client.close()
+            await server.close()
+
+    _run(main())
+
+
+def test_pipelined_responses_in_order():
+    async def main():
+        server, port = await _start(max_batch = 64)
+        ops = []
+        for i, t in enumerate(_tokens(500)):
+            if i % 3 == 0:
+                ops.append(("convert_token", [t]))
+            elif i % 3 == 1:
+                ops.append(("eng_format", [i * 1000.0]))
+            else:
+                ops.append(("exp_tuple", [i + 0.5, 10]))
+        try:
+            responses = await _exchange(port, [{"id": i, "op": op, "args": args}
+                    for i, (op, args) in enumerate(ops)])
+        finally:
+            await server.close()
+        assert [r["id"] for r in responses] == list(range(len(ops)))
+        assert all("result" in r for r in responses)
+        assert server.batches < server.requests
+
+    _run(main())
+
+
+def test_error_responses():
+    async def main():
+        server, port = await _start()
+        client = await Client.open_tcp(port = port)
+        try:
+            with pytest.raises(RemoteError, match = "TokenError"):
+                await client.call("convert_token", "zz")
+            with pytest.raises(RemoteError, match = "Unknown op"):
+                await client.call("no_such_op")
+            with pytest.raises(RemoteError, match = "TypeError"):
+                await client.call("convert_token", 123)
+            # The connection is still usable after errors
+            assert await client.call("convert_token", "a:b") == "0.10.0.11"
+            stats = await client.call("stats")
+            assert stats["errors"] >= 3
+        finally:
+            await client.close()
+
+        responses = await _exchange(port, [b'not json', {"id": 7, "args": []},
+                {"id": 8, "op": "convert_token", "args": "a:b"},
+                {"id": 9, "op": "convert_token", "args": ["a:b"]}])
+        await server.close()
+        assert [r.get("id") for r in responses] == [None, 7, 8, 9]
+        assert all("error" in r for r in responses[:3])
+        assert responses[3]["result"] == "0.10.0.11"
+
+    _run(main())
+
+
+def test_bulk_fallback():
+    async def main():
+        server, port = await _start(max_delay = 0.05)
+        tokens = _tokens(200)
+        tokens[57] = "zz"
+        requests = [{"id": i, "op": "convert_token", "args": [t]} for i, t in enumerate(tokens)]
+        # Arguments the bulk paths do not take run one by one, as if alone
+        others = [{"id": 1000 + i, "op": "convert_token", "args": [123]} for i in range(100)]
+        others += [{"id": 2000 + i, "op": "dd_to_token", "args": ["10.0.0.1", i % 2 == 0]}
+                for i in range(100)]
+        others += [{"id": 3000, "op": "dd_to_token", "args": ["10.0.0.1", 0]}]
+        try:
+            responses = await _exchange(port, requests)
+            responses += await _exchange(port, others)
+        finally:
+            await server.close()
+        by_id = dict((r["id"], r) for r in responses)
+
+        for i, t in enumerate(tokens):
+            if i == 57:
+                assert "TokenError" in by_id[i]["error"]
+            else:
+                assert by_id[i]["result"] == address_converter.convert_token(t)
+        for i in range(100):
+            assert "TypeError" in by_id[1000 + i]["error"]
+            assert by_id[2000 + i]["result"] == address_converter.dd_to_token("10.0.0.1", i % 2 == 0)
+        assert by_id[3000]["result"] == address_converter.dd_to_token("10.0.0.1", 0)
+        assert server.batches < server.requests
+
+    _run(main())
+
+
+def test_backpressure():
+    async def main():
+        server, port = await _start(max_queue = 4, max_pending = 4)
+        # Each answer repeats its 60 KB token, so a client that does not
+        # read soon fills the socket buffers
+        token = "z" * 60000
+        count = 400
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b''.join(json.dumps({"id": i, "op": "convert_token", "args": [token]}).encode()
+                + b'\n' for i in range(count)))
+        try:
+            await asyncio.sleep(0.5)
+            # The server stopped reading requests it could not answer
+            stalled = server.requests
+            assert stalled < count
+            await asyncio.sleep(0.2)
+            assert server.requests == stalled
+
+            ids = []
+            for _ in range(count):
+                line = await reader.readline()
+                ids.append(json.loads(line)["id"])
+            assert ids == list(range(count))
+            assert server.requests == count
+        finally:
+            writer.close()
+            await server.close()
+
+    _run(main())
+
+
+def _strict_json(line):
+    def reject(name):
+        raise ValueError("Not strict JSON: {}".format(name))
+    return json.loads(line, parse_constant = reject)
+
+
+def test_non_finite_results():
+    async def main():
+        server, port = await _start()
+        requests = [{"id": 0, "op": "exp_tuple", "args": [1e308 * 10]},
+                {"id": 1, "op": "normalize", "args": [-1e308 * 10]},
+                {"id": 2, "op": "from_hex", "args": ["nan"]},
+                {"id": 3, "op": "exp_tuple", "args": [1500.0]}]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b''.join(json.dumps(r).encode() + b'\n' for r in requests))
+        lines = [await reader.readline() for _ in requests]
+        writer.close()
+        await server.close()
+        responses = [_strict_json(line) for line in lines]
+        assert responses[0]["result"] == ["inf", "inf", 10]
+        assert responses[1]["result"] == ["-inf", "-inf", 10]
+        assert responses[2]["result"] == "nan"
+        assert responses[3]["result"] == list(exp_notation.exp_tuple(1500.0))
+
+    _run(main())
+
+
+def test_loop_runs_during_batch(monkeypatch):
+    normalize = exp_notation.normalize
+
+    def slow_normalize(x, base = 10):
+        time.sleep(1.0)
+        return normalize(x, base)
+
+    async def main():
+        server, port = await _start()
+        monkeypatch.setattr(conversion_server.exp_notation, "normalize", slow_normalize)
+        slow = await Client.open_tcp(port = port)
+        fast = await Client.open_tcp(port = port)
+        try:
+            pending = asyncio.ensure_future(slow.call("normalize", 1500.0))
+            await asyncio.sleep(0.1)
+            # Answered while the batch holding the slow call runs
+            start = time.perf_counter()
+            assert (await fast.call("stats"))["batches"] == 1
+            assert time.perf_counter() - start < 0.5
+            assert not pending.done()
+            assert await pending == [1.5, 3, 10]
+        finally:
+            await slow.close()
+            await fast.close()
+            await server.close()
+
+    _run(main())
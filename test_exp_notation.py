@@ -0,0 +1,156 @@
+"""
+Tests of exp_notation.normalize() against exp_tuple(x, base, True) and
+against exact rational arithmetic, and of eng_format().
+
+    python3 -m pytest test_exp_notation.py
+"""
+
+import math
+import random
+import sys
+from fractions import Fraction
+
+import pytest
+
+import exp_notation
+
+
+bases = (2, 7, 10, 16)
+
+_rng = random.Random(0)
+
+# Regular inputs: ordinary, subnormal and huge floats of both signs
+regular = (
+        [1.0, -1.0, 0.5, 3.0, 123.456, -0.001, 1e-300, 1e300, 2.0 ** -1022]
+        + [5e-324, -5e-324, sys.float_info.min * (1 - 2.0 ** -52), sys.float_info.max,
+            -sys.float_info.max, 1.5e308]
+        + [_rng.randrange(1, 1 << 52) * 5e-324 for _ in range(50)]
+        + [_rng.choice((-1, 1)) * _rng.random() * 10.0 ** _rng.randrange(-320, 309)
+            for _ in range(300)]
+        )
+
+
+def _near_powers(base):
+    """Powers of `base` that are floats, and their neighbours on either side."""
+    xs = []
+    k = -1100
+    while True:
+        try:
+            p = float(Fraction(base) ** k)
+        except OverflowError:
+            break
+        if p:
+            xs += [p, math.nextafter(p, 0), math.nextafter(p, math.inf)]
+        k += 1
+    return [x for x in xs if 0 < x < math.inf]
+
+
+def _check_exact(x, base):
+    """Checks normalize(x, base) against the exact value of x / base**shift."""
+    m, shift, b = exp_notation.normalize(x, base)
+    assert b == base
+    assert isinstance(shift, int)
+    assert 1 <= abs(m) < base
+    assert (m < 0) == (x < 0)
+    r = abs(Fraction(x)) / Fraction(base) ** shift
+    if 1 <= r < base:
+        assert abs(m) == float(r)
+    else:
+        # The exact mantissa was just below `base` and rounded up to it
+        assert abs(m) == 1.0 and float(r * base) == base
+
+
+@pytest.mark.parametrize("base", bases)
+def test_normalize_exact(base):
+    for x in regular:
+        _check_exact(x, base)
+
+
+@pytest.mark.parametrize("base", bases)
+def test_normalize_near_powers(base):
+    for x in _near_powers(base):
+        _check_exact(x, base)
+        _check_exact(-x, base)
+
+
+@pytest.mark.parametrize("base", bases)
+def test_normalize_matches_exp_tuple(base):
+    for x in regular + _near_powers(base):
+        m0, n0, _ = exp_notation.exp_tuple(x, base, True)
+        m, n, _ = exp_notation.normalize(x, base)
+        # Near a power of the base, exp_tuple()'s float logarithm and
+        # rounding can land on the neighbouring exponent, e.g. m = 1.0
+        # where the exact mantissa is just below `base`
+        assert abs(n - n0) <= 1
+        assert math.isclose(m, m0 * float(base) ** (n0 - n), rel_tol = 1e-12)
+
+
+@pytest.mark.parametrize("base", bases)
+def test_normalize_special(base):
+    assert exp_notation.normalize(0.0, base) == (0.0, 0, base)
+    assert exp_notation.normalize(0, base) == (0, 0, base)
+    assert exp_notation.normalize(math.inf, base) == (math.inf, math.inf, base)
+    assert exp_notation.normalize(-math.inf, base) == (-math.inf, -math.inf, base)
+    m, n, b = exp_notation.normalize(math.nan, base)
+    assert math.isnan(m) and math.isnan(n) and b == base
+    for x in (0.0, math.inf, -math.inf):
+        assert exp_notation.normalize(x, base)[:2] == exp_notation.exp_tuple(x, base, True)[:2]
+
+
+def test_normalize_in_range_unchanged():
+    for base in bases:
+        for x in (1.0, -1.0, base - 1e-9, 1.5):
+            assert exp_notation.normalize(x, base) == (x, 0, base)
+
+
+def test_normalize_bad_base():
+    for base in (1, 0, -10, 2.5):
+        with pytest.raises(ValueError):
+            exp_notation.normalize(3.0, base)
+    assert exp_notation.normalize(300.0, 10.0) == (3.0, 2, 10)
+
+
+def _eng_parts(text, binary):
+    """Splits eng_format() output into the mantissa and the power of the prefix."""
+    m, _, prefix = text.partition(' ')
+    if binary:
+        return m, 1024 ** exp_notation.bi_symbols.index(prefix)
+    return m, Fraction(1000) ** (exp_notation.si_symbols.index(prefix) + exp_notation.si_low)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("precision", [1, 2, 3, 4, 6])
+def test_eng_format_rounding(binary, precision):
+    xs = [_rng.random() * 10.0 ** _rng.randrange(-20, 25) for _ in range(500)]
+    xs += [1023.96, 1023.4, 1000.0, 999.96, 999.4, 1048575.9, 1024.0 ** 3 - 1, 1e21 - 1]
+    for x in xs:
+        m, scale = _eng_parts(exp_notation.eng_format(x, precision, binary), binary)
+        # 1000 to 1023 only fit without a prefix in 4 or more digits
+        assert Fraction(m) < (1024 if binary and precision >= 4 else 1000)
+        # x rounded to `precision` significant digits
+        error = abs(Fraction(m) * scale - Fraction(x))
+        assert error <= Fraction(x) * Fraction(10) ** (1 - precision) / 2
+
+
+def test_eng_format_carry():
+    assert exp_notation.eng_format(999.96) == '1.00 k'
+    assert exp_notation.eng_format(1023.96, binary = True) == '1.00 Ki'
+    assert exp_notation.eng_format(1023.96, 4, binary = True) == '1.000 Ki'
+    assert exp_notation.eng_format(1023.4, 4, binary = True) == '1023'
+    assert exp_notation.eng_format(1023.4, binary = True) == '0.999 Ki'
+    assert exp_notation.eng_format(1048575.9, binary = True) == '1.00 Mi'
+    assert exp_notation.eng_format(999, binary = True) == '999'
+
+
+def test_eng_format_special():
+    for binary in (False, True):
+        assert exp_notation.eng_format(-0.0, binary = binary) == '-0.00'
+        assert exp_notation.eng_format(0, binary = binary) == '0.00'
+        assert exp_notation.eng_format(-0.0, unit = 'B', binary = binary) == '-0.00 B'
+        assert exp_notation.eng_format(math.nan, binary = binary) == 'nan'
+        assert exp_notation.eng_format(-math.inf, unit = 'B', binary = binary) == '-inf B'
+        assert exp_notation.eng_format(10 ** 300, binary = binary)
+        with pytest.raises(ValueError):
+            exp_notation.eng_format(10 ** 400, binary = binary)
+        with pytest.raises(ValueError):
+            exp_notation.eng_format_many([1, -10 ** 400], binary = binary)
@@ -0,0 +1,72 @@
+"""
+Tests of exp_numpy against the scalar exp_notation.exp_tuple() and
+normalize().
+
+    python3 -m pytest test_exp_numpy.py
+"""
+
+import math
+import random
+import struct
+from fractions import Fraction
+
+import pytest
+
+import exp_notation
+import exp_numpy
+
+np = pytest.importorskip("numpy")
+
+
+def _floats(rng):
+    out = [struct.unpack('<d', rng.getrandbits(64).to_bytes(8, 'little'))[0] for _ in range(5000)]
+    out += [math.ldexp(rng.random(), rng.randrange(-1100, 1024)) for _ in range(2000)]
+    out += [0.0, -0.0, math.inf, -math.inf, math.nan, 5e-324, -5e-324, 1.0, 10.0, 1000.0,
+            1e-300, 1.7976931348623157e+308]
+    return out
+
+
+floats = _floats(random.Random(0))
+
+
+def _same(a, b):
+    return a == b or a != a and b != b
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+@pytest.mark.parametrize("base", [2, 3, 10, 16, 1000, 2.5, math.e])
+def test_exp_tuple(base, normalize):
+    m, n = exp_numpy.exp_tuple(np.array(floats), base, normalize)
+    for x, mi, ni in zip(floats, m.tolist(), n.tolist()):
+        sm, sn, _ = exp_notation.exp_tuple(x, base, normalize)
+        assert _same(ni, sn)
+        if float(base).is_integer():
+            # Powers from the table, so the division is the same one
+            assert _same(mi, sm)
+            if math.isfinite(sn) and abs(sn) > 300:
+                # Scaled in two steps where base**|n| is beyond a float,
+                # still close to the exact quotient
+                exact = float(Fraction(x) / Fraction(int(base)) ** int(sn))
+                assert abs(mi - exact) <= 2 * math.ulp(exact)
+        else:
+            # np.power() and pow() may round differently, twice for tiny x
+            assert _same(mi, sm) or abs(mi - sm) <= 4 * math.ulp(sm)
+
+
+@pytest.mark.parametrize("base", [2, 3, 10, 16, 1000])
+def test_normalize(base):
+    m, n = exp_numpy.normalize(np.array(floats), base)
+    for x, mi, ni in zip(floats, m.tolist(), n.tolist()):
+        sm, sn, _ = exp_notation.normalize(x, base)
+        assert _same(ni, sn)
+        if not math.isfinite(sm) or sm == 0:
+            assert _same(mi, sm)
+        else:
+            # The scalar result is exact, the array one within a rounding
+            assert abs(mi - sm) <= math.ulp(sm)
+            assert 1 <= abs(mi) < base
+
+
+def test_base():
+    with pytest.raises(ValueError):
+        exp_numpy.exp_tuple(np.array([1.0]), 1)
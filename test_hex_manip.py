@@ -0,0 +1,120 @@
+"""
+Tests of exp_notation.hex_manip() against the original string-based
+implementation, kept here as _reference_hex_manip().
+
+    python3 -m pytest test_hex_manip.py
+"""
+
+import math
+import random
+import re
+import struct
+
+import pytest
+
+import exp_notation
+
+
+def _reference_hex_manip(f, display_base = 16, normalize = True):
+    """
+    The original hex_manip(), which worked on the '0'/'1' string of the
+    digits of float.hex(). Its exponents are unsigned, except that the
+    normalized ones always start with '-'.
+    """
+    conv = lambda x: format(x, 'box'[(2, 8, 16).index(display_base)])
+    f_hex = f.hex()
+    sign_f = '-' if f_hex[0] != '0' else ''
+    skip = 3 if f < 0 else 2
+    mantissa, p = f_hex[skip:].split('p')
+    p = int(p)
+    whole, fraction = mantissa.split('.')
+    bits = exp_notation.radix_bits[display_base]
+    fraction = re.sub('0*$', '', ''.join(bin(int(x, 16))[2:].zfill(4) for x in fraction))
+
+    if normalize == True:
+        working_set = whole + fraction
+        s = working_set.find('1')
+        whole_new, fraction_new = working_set[s:s+bits], working_set[s+bits:]
+        n_new = p - s - bits + 1
+        n_new, denom = (n_new // bits, 1) if n_new % bits == 0 else (n_new, bits)
+        n_conv = '-' + conv(abs(n_new)), str(denom)
+    else:
+        n = p // bits
+        s = abs(p) % bits
+        n_conv = conv(abs(n)), '1'
+        if n < 0:
+            working_set = whole.zfill(s+1) + fraction
+            whole_new, fraction_new = working_set[0], working_set[1:]
+        else:
+            working_set = whole + fraction
+            whole_new, fraction_new = working_set[:s+1], working_set[s+1:]
+
+    if display_base == 2:
+        return sign_f + whole_new + '.' + fraction_new, n_conv, '10', display_base
+
+    if int(fraction_new) == 0:
+        frac_groups = '0',
+    else:
+        fraction_new += '0' * (-len(fraction_new) % bits)
+        frac_iter = iter(fraction_new)
+        frac_groups = (''.join(t) for t in zip(*((frac_iter,) * bits)))
+    fraction_final = ''.join(conv(int(g, 2)) for g in frac_groups)
+    return sign_f + conv(int(whole_new, 2)) + '.' + fraction_final, n_conv, '10', display_base
+
+
+def _floats(rng):
+    out = [struct.unpack('<d', rng.getrandbits(64).to_bytes(8, 'little'))[0] for _ in range(5000)]
+    out += [math.ldexp(rng.random(), rng.randrange(-1100, 1024)) for _ in range(2000)]
+    out += [float(rng.randrange(1 << 60)) * rng.choice((1, -1)) for _ in range(500)]
+    out += [math.ldexp(rng.getrandbits(rng.randrange(1, 53)), -1074) for _ in range(500)]
+    out += [0.0, 1.0, -1.0, 0.5, 1.5, 3.0, 1024.0, 0.1, 5e-324, 2.2250738585072014e-308,
+            1.7976931348623157e+308]
+    return [x for x in out if math.isfinite(x)]
+
+
+floats = _floats(random.Random(0))
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+@pytest.mark.parametrize("display_base", [2, 8, 16])
+def test_matches_reference(display_base, normalize):
+    bits = exp_notation.radix_bits[display_base]
+    for f in floats:
+        m, (n, d), base, b = exp_notation.hex_manip(f, display_base, normalize)
+        try:
+            expected = _reference_hex_manip(f, display_base, normalize)
+        except ValueError:
+            # The reference failed on an empty fraction, where the whole
+            # digit takes every bit, e.g. 1.5 as 'c.0'
+            assert m.endswith('.0')
+            assert exp_notation.hex_unmanip((m, (n, d), base, b)) == f
+            continue
+
+        assert (m, d, base, b) == (expected[0], expected[1][1], '10', display_base)
+        # The reference dropped the sign of the exponent, and rounded it
+        # down rather than towards zero when not normalizing, so check its
+        # magnitude where it was right and the value everywhere.
+        p = int(f.hex().partition('p')[2])
+        if normalize or p >= 0 or not p % bits:
+            assert n.lstrip('-') == expected[1][0].lstrip('-')
+        assert exp_notation.hex_unmanip((m, (n, d), base, b)) == f
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+@pytest.mark.parametrize("display_base", [2, 4, 8, 16, 32, 64])
+def test_short_mantissas(display_base, normalize):
+    for f in (1.0, 1.25, 1.5, 3.0, 1024.0, 0.5, 2.0 ** 1023, 5e-324, 0.0, -0.0, -1.5):
+        t = exp_notation.hex_manip(f, display_base, normalize)
+        # Base 2 keeps the reference's empty fraction, e.g. '1.'
+        assert display_base == 2 or not t[0].endswith('.')
+        r = exp_notation.hex_unmanip(t)
+        assert r == f and math.copysign(1, r) == math.copysign(1, f)
+    assert exp_notation.hex_manip(1.5, 16) == ('c.0', ('-3', '4'), '10', 16)
+    assert exp_notation.hex_manip(1024.0, 16, False) == ('4.0', ('2', '1'), '10', 16)
+
+
+def test_negative_zero():
+    # The reference leaked the 'x' of '-0x0.0p+0' into its mantissa
+    assert exp_notation.hex_manip(-0.0, 2, False)[0] == '-0.'
+    assert exp_notation.hex_manip(-0.0, 2)[0] == '-.0'
+    assert math.copysign(1, exp_notation.hex_unmanip(exp_notation.hex_manip(-0.0, 2))) == -1
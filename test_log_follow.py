@@ -0,0 +1,191 @@
+"""
+Tests of log_follow.py against temporary files being appended to,
+rotated and truncated.
+
+    python3 -m pytest test_log_follow.py
+"""
+
+import io
+import os
+import shutil
+
+import log_follow
+from log_follow import Follower
+
+
+def _append(path, text):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+def _drain(follower):
+    """Polls until nothing more is returned, and returns every line."""
+    lines = []
+    while True:
+        batch = follower.poll()
+        if not batch:
+            return lines
+        lines += batch
+
+
+def test_append(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    _append(log, "a:b\nc:d\n")
+    with Follower(log) as f:
+        assert _drain(f) == ["a:b\n", "c:d\n"]
+        assert f.poll() == []
+        _append(log, "e:f\n")
+        assert _drain(f) == ["e:f\n"]
+
+
+def test_missing_file(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    with Follower(log) as f:
+        assert f.poll() == []
+        _append(log, "a:b\n")
+        assert _drain(f) == ["a:b\n"]
+
+
+def test_partial_last_line(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    _append(log, "a:b\nc:")
+    with Follower(log) as f:
+        assert _drain(f) == ["a:b\n"]
+        _append(log, "d")
+        assert f.poll() == []
+        _append(log, "\n")
+        assert _drain(f) == ["c:d\n"]
+
+
+def test_restart_from_checkpoint(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    ckpt = str(tmp_path / "tokens.ckpt")
+    _append(log, "a:b\nc:d\n")
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["a:b\n", "c:d\n"]
+        f.commit()
+    _append(log, "e:f\n")
+
+    with Follower(log, ckpt) as f:
+        # Not committed, so read again after the next restart
+        assert _drain(f) == ["e:f\n"]
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["e:f\n"]
+        f.commit()
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == []
+
+
+def test_rotation_while_stopped(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    ckpt = str(tmp_path / "tokens.ckpt")
+    _append(log, "a:b\n")
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["a:b\n"]
+        f.commit()
+
+    # Lines appended before the rotation are found under the rotated name
+    _append(log, "c:d\nlast")
+    os.rename(log, log + ".1")
+    _append(log, "e:f\n")
+
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["c:d\n", "last", "e:f\n"]
+        f.commit()
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == []
+        _append(log, "1:2\n")
+        assert _drain(f) == ["1:2\n"]
+
+
+def test_rotation_while_running(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    _append(log, "a:b\n")
+    with Follower(log) as f:
+        assert _drain(f) == ["a:b\n"]
+        _append(log, "c:d\n")
+        os.rename(log, log + ".1")
+        # Rotated, and the new file not created yet
+        assert _drain(f) == ["c:d\n"]
+        assert f.poll() == []
+        _append(log, "e:f\n")
+        assert _drain(f) == ["e:f\n"]
+
+
+def test_copytruncate(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    ckpt = str(tmp_path / "tokens.ckpt")
+    _append(log, "a:b\nc:d\n")
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["a:b\n", "c:d\n"]
+        f.commit()
+
+        # Truncated below the offset
+        shutil.copy(log, log + ".1")
+        open(log, 'w').close()
+        _append(log, "e:f\n")
+        assert _drain(f) == ["e:f\n"]
+
+        # Truncated and written again past the offset before the next poll
+        shutil.copy(log, log + ".1")
+        open(log, 'w').close()
+        _append(log, "1:2\n3:4\n")
+        assert _drain(f) == ["1:2\n", "3:4\n"]
+        f.commit()
+
+    # The same while stopped, to exactly the old size
+    open(log, 'w').close()
+    _append(log, "5:6\n7:8\n")
+    with Follower(log, ckpt) as f:
+        assert _drain(f) == ["5:6\n", "7:8\n"]
+
+
+def test_follow_once(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    ckpt = str(tmp_path / "tokens.ckpt")
+    _append(log, "dead:beef\nzz\n")
+    out = io.StringIO()
+    err = io.StringIO()
+    assert log_follow.follow(log, out, ckpt, err, once = True) == (1, 1)
+    assert out.getvalue() == "222.173.190.239\n"
+    assert "'zz'" in err.getvalue()
+
+    _append(log, "a:b\n")
+    out = io.StringIO()
+    assert log_follow.follow(log, out, ckpt, err, once = True) == (1, 0)
+    assert out.getvalue() == "0.10.0.11\n"
+
+
+def test_rotated_file_read_in_chunks(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    _append(log, "a:b\n")
+    with Follower(log, chunk_size = 16) as f:
+        assert _drain(f) == ["a:b\n"]
+        # Written to the old file after the rotation, as before a reopen
+        os.rename(log, log + ".1")
+        _append(log + ".1", "".join("{:x}:0\n".format(i) for i in range(100)))
+        _append(log, "e:f\n")
+        batches = []
+        while True:
+            batch = f.poll()
+            if not batch:
+                break
+            batches.append((f.lineno, batch))
+    assert all(sum(map(len, b)) <= 16 + 8 for _, b in batches)
+    lines = [line for _, b in batches for line in b]
+    assert lines == ["{:x}:0\n".format(i) for i in range(100)] + ["e:f\n"]
+    # Numbered within each file
+    assert batches[0][0] == 1
+    assert batches[-1] == (0, ["e:f\n"])
+
+
+def test_follow_line_numbers(tmp_path):
+    log = str(tmp_path / "tokens.log")
+    ckpt = str(tmp_path / "tokens.ckpt")
+    _append(log, "dead:beef\nzz\n\na:b\n")
+    err = io.StringIO()
+    log_follow.follow(log, io.StringIO(), ckpt, err, once = True)
+    _append(log, "a:b\nyy\n")
+    log_follow.follow(log, io.StringIO(), ckpt, err, once = True)
+    assert [line.split(": ")[:3] for line in err.getvalue().splitlines()] == [
+            [log, "line 2", "'zz'"], [log, "line 6", "'yy'"]]
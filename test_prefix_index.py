@@ -0,0 +1,94 @@
+"""
+Tests of PrefixIndex lookups against a brute-force longest-prefix match,
+both on a freshly built index and on one saved and loaded again.
+
+    python3 -m pytest test_prefix_index.py
+"""
+
+import ipaddress
+import random
+
+import pytest
+
+import address_calculator
+from prefix_index import PrefixIndex
+
+
+_rng = random.Random(0)
+
+
+def _random_prefixes(rng, version, count):
+    """Nested and overlapping prefixes in a small part of the address space."""
+    address_length = 32 if version == 4 else 128
+    out = []
+    for _ in range(count):
+        prefix_length = rng.randrange(address_length - 16, address_length + 1)
+        n = 10 << (address_length - 8) | rng.getrandbits(16)
+        n &= address_calculator.netmask(prefix_length, address_length)
+        out.append(ipaddress.ip_network((n, prefix_length)))
+    # The whole space, and a duplicate
+    out += [ipaddress.ip_network((0, 0) if version == 4 else "::/0"), out[0]]
+    return out
+
+
+def _queries(rng, prefixes):
+    """Random addresses near the prefixes, and each prefix's edges."""
+    out = []
+    for p in prefixes:
+        first, last = int(p.network_address), int(p.broadcast_address)
+        top = (1 << p.max_prefixlen) - 1
+        out += [first, last, max(first - 1, 0), min(last + 1, top)]
+        out.append(first | rng.getrandbits(p.max_prefixlen - p.prefixlen))
+    address = ipaddress.IPv4Address if prefixes[0].version == 4 else ipaddress.IPv6Address
+    return [str(address(n)) for n in out] + [str(address(0)), str(address(top))]
+
+
+def _brute_force(prefixes, address):
+    a = ipaddress.ip_address(address)
+    covering = [p for p in prefixes if p.version == a.version and a in p]
+    if not covering:
+        return None
+    return str(max(covering, key = lambda p: p.prefixlen))
+
+
+@pytest.fixture(params = ["memory", "file"])
+def index(request, tmp_path):
+    def build(prefixes):
+        index = PrefixIndex(str(p) for p in prefixes)
+        if request.param == "file":
+            path = str(tmp_path / "prefixes.idx")
+            index.save(path)
+            index = PrefixIndex.load(path)
+            request.addfinalizer(index.close)
+        return index
+    return build
+
+
+@pytest.mark.parametrize("count", [1, 10, 300])
+def test_lookup(index, count):
+    prefixes = _random_prefixes(_rng, 4, count) + _random_prefixes(_rng, 6, count)
+    # Without the /0 prefixes, so some addresses match nothing
+    for table in (prefixes, [p for p in prefixes if p.prefixlen]):
+        queries = _queries(_rng, [p for p in table if p.version == 4]) + \
+                _queries(_rng, [p for p in table if p.version == 6])
+        idx = index(table)
+        assert len(idx) == len(table)
+        expected = [_brute_force(table, q) for q in queries]
+        assert [idx.lookup(q) for q in queries] == expected
+        assert idx.lookup_many(queries) == expected
+
+
+def test_empty(index):
+    idx = index([])
+    assert len(idx) == 0
+    assert idx.lookup_many(["10.0.0.1", "::1"]) == [None, None]
+
+
+def test_bad_file(tmp_path):
+    path = tmp_path / "prefixes.idx"
+    PrefixIndex(["10.0.0.0/8", "2001:db8::/32"]).save(str(path))
+    data = path.read_bytes()
+    for bad in (b'', data[:10], b'X' + data[1:], data[:-8]):
+        path.write_bytes(bad)
+        with pytest.raises(ValueError):
+            PrefixIndex.load(str(path))